@@ -24,9 +24,10 @@ THE SOFTWARE.
 
 import os
 import sys
-import wx
+import time
 
-from forsteri import gui
+# The time the client was loaded, used when profiling start up.
+LOADED = time.time()
 
 class ForsteriClient(object):
     """
@@ -38,7 +39,52 @@ class ForsteriClient(object):
         self.PATH = path
 
     def run(self):
+        # Check if the watch flag was given, if so import without the GUI.
+        if "--watch" in sys.argv:
+            return self.watch()
+
+        # Check if the import flag was given, if so import a single file.
+        if "--import" in sys.argv:
+            return self.importFile()
+
+        # Check if the archive flag was given, if so print an archived import
+        # or list the archives.
+        if "--archive" in sys.argv:
+            return self.printArchive()
+
+        # Check if the archive legacy flag was given, if so convert the plain
+        # copies of earlier imports into archives.
+        if "--archive-legacy" in sys.argv:
+            return self.archiveLegacy()
+
+        # Check if the tune flag was given, if so tune the models without the
+        # GUI.
+        if "--tune" in sys.argv:
+            return self.tune()
+
+        # Check if the models flag was given, if so run the models without
+        # the GUI.
+        if "--models" in sys.argv:
+            return self.runModels()
+
+        # Check if the profile flag was given, if so time every import.
+        profile = "--profile-startup" in sys.argv
+        if profile:
+            from forsteri.process import timing as pt
+            timer = pt.StageTimer()
+            imports = pt.ImportTimer()
+            imports.start()
+
+        # Import the GUI only when it is used, so the flags above do not
+        # load it.
+        started = time.time()
+        import wx
+        from forsteri import gui
+        if profile:
+            timer.record("Import", started, time.time())
+
         # Create the application.
+        started = time.time()
         app = wx.App()
 
         # Check if the splash screen flag was given.
@@ -51,13 +97,185 @@ class ForsteriClient(object):
             # Create the splash screen.
             splash = wx.SplashScreen(bitmap,
                 wx.SPLASH_CENTRE_ON_SCREEN|wx.SPLASH_TIMEOUT, 1000, None)
+        if profile:
+            timer.record("Create app", started, time.time())
 
         # Create the main frame.
+        started = time.time()
         gui.Main(None, style=wx.DEFAULT_FRAME_STYLE^wx.RESIZE_BORDER)
+        if profile:
+            timer.record("Create frame", started, time.time())
+
+            # Report once the main loop has handled the first events.
+            wx.CallAfter(self.reportStartup, timer, imports, time.time())
 
         # Start the application main loop.
         app.MainLoop()
 
+    def reportStartup(self, timer, imports, started):
+        """
+        Print the time spent in each stage of start up and the slowest
+        imports.
+
+        Args:
+          timer (forsteri.process.timing.StageTimer): The start up stages.
+          imports (forsteri.process.timing.ImportTimer): The imports made.
+          started (float): The time the main loop was entered.
+
+        Returns:
+          None
+        """
+
+        # Stop timing imports.
+        imports.stop()
+        timer.record("First events", started, time.time())
+
+        # Print the stages and imports.
+        for line in timer.report():
+            print(line)
+        print("Ready {:.3f} seconds after the client loaded.".format(\
+            time.time() - LOADED))
+        print('')
+        for line in imports.report():
+            print(line)
+
+    def watch(self):
+        """
+        Watch a drop directory for files to import. The directory may follow
+        the flag, otherwise the default drop directory is used.
+        """
+
+        from forsteri.process import watch
+
+        # Find the directory given after the flag.
+        index = sys.argv.index("--watch") + 1
+        if index < len(sys.argv) and not sys.argv[index].startswith('-'):
+            directory = sys.argv[index]
+        else:
+            directory = watch.DROP
+
+        return watch.main(directory)
+
+    def importFile(self):
+        """
+        Import the file given after the flag without the GUI and print the
+        time spent in each stage. A file in a subdirectory of the drop
+        directory is imported as a timeseries of that variable.
+        """
+
+        from forsteri.process import watch
+
+        # Find the file given after the flag.
+        index = sys.argv.index("--import") + 1
+        if index >= len(sys.argv):
+            print("No file given to import.")
+            return False
+        location = os.path.abspath(sys.argv[index])
+
+        # Import the file relative to the drop directory if it is inside it.
+        if os.path.dirname(os.path.dirname(location)) ==\
+            os.path.abspath(watch.DROP):
+            watcher = watch.Watcher(watch.DROP)
+        else:
+            watcher = watch.Watcher(os.path.dirname(location))
+
+        return watcher.importFile(location)
+
+    def printArchive(self):
+        """
+        Print the rows of the import whose id follows the flag from its
+        archive, in the CSV format files are imported in, so a past import can
+        be audited or imported again. Without an id every archive is listed.
+        """
+
+        import csv
+
+        from forsteri.interface import archive
+
+        # Find the import id given after the flag.
+        index = sys.argv.index("--archive") + 1
+        if index >= len(sys.argv) or sys.argv[index].startswith('-'):
+            # List each archive with the size of its import.
+            for importID in archive.getArchives():
+                info = archive.readHeader(importID)
+                print("{i:6d} {r:9d} rows {c:4d} columns".format(i=importID,
+                    r=info["rows"], c=len(info["columns"])))
+            return True
+
+        # Make sure the import has an archive.
+        if not sys.argv[index].isdigit() or\
+            int(sys.argv[index]) not in archive.getArchives():
+            print("No archive of import " + sys.argv[index] + ".")
+            return False
+
+        # Stream the rows out a block at a time.
+        writer = csv.writer(sys.stdout, delimiter=',', quotechar='|')
+        for row in archive.readArchive(int(sys.argv[index])):
+            writer.writerow(row)
+
+        return True
+
+    def archiveLegacy(self):
+        """
+        Convert the plain CSV copies written by earlier versions into
+        archives and remove the copies.
+        """
+
+        from forsteri.interface import archive
+
+        converted = archive.archiveLegacy(remove=True)
+        print("Archived " + str(len(converted)) + " imported file copies.")
+
+        return True
+
+    def tune(self):
+        """
+        Tune the models of every product and choose the drivers of its
+        regression without the GUI, printing the progress, so it can be run
+        overnight.
+        """
+
+        from forsteri.process import driver
+        from forsteri.process import tune
+
+        return tune.runTune(progress=printProgress) and\
+            driver.runDrivers(progress=printProgress)
+
+    def runModels(self):
+        """
+        Run every model for every product without the GUI, reconciling the
+        forecasts as set in the preferences and printing the progress.
+        """
+
+        from forsteri.interface import data as idata
+        from forsteri.process import model as pm
+
+        # Find the way to reconcile the forecasts and the method reported,
+        # whose forecasts are reconciled, the method selected for each
+        # product if the reconciled forecasts are reported.
+        pref = idata.getPreferences()
+        reconcile = pref.get("reconcile", "None").lower()
+        if reconcile == "none":
+            reconcile = None
+        base = pref.get("report_type", "Auto").lower()
+        if base in ["auto", "reconciled"]:
+            base = None
+
+        return pm.runAll(progress=printProgress, reconcile=reconcile,
+            base=base)
+
+"""
+Helper Functions
+"""
+def printProgress(percent, message):
+    """
+    A progress callback that prints each step and never stops the job.
+    """
+
+    print("{p:3.0f}% {m}".format(p=percent, m=message))
+
+    return True
+
 if __name__ == "__main__":
     CLIENT = ForsteriClient()
     CLIENT.run()
@@ -25,21 +25,14 @@ THE SOFTWARE.
 # Import python modules.
 import os
 import subprocess as sp
-import threading as td
 import webbrowser as wb
 import wx
 
-# Import forsteri modules.
-from forsteri.gui.window import assign_missing as am
-from forsteri.gui.window import data_manager as dm
-from forsteri.gui.window import import_data as imd
-from forsteri.gui.window import link_products as lp
-from forsteri.gui.window import new_item as nif
-from forsteri.gui.window import open_product as omp
-from forsteri.gui.window import preferences as pref
+# Import forsteri modules. The other windows and the process modules are
+# imported when first used, so start up only loads what the main frame shows.
 from forsteri.gui.window import product as pr
 from forsteri.interface import data as idata
-from forsteri.process import model as pm
+from forsteri.process import job as pj
 
 class Main(wx.Frame):
     """
@@ -76,23 +69,46 @@ class Main(wx.Frame):
         # Create the master panel.
         self.masterPanel = pr.ProductPanel(self)
 
-        # Create the icon.
-        self.icon = wx.Icon(os.path.join(idata.DATA, "Forsteri", "img",
-            "forsteri.ico"), wx.BITMAP_TYPE_ICO)
+        # The drop directory watcher is created when first turned on.
+        self.watcher = None
+
+        # Create the job manager and show job progress in the status bar.
+        self.jobs = pj.JobManager()
+        self.jobs.listen(lambda job: wx.CallAfter(self.on_job, job))
+        self.CreateStatusBar()
 
         ## Frame Operations
         # Set the menu bar
         self.SetMenuBar(self.create_menu_bar())
 
-        # Set the icon.
-        self.SetIcon(self.icon)
-
         # Set window properties.
-        self.SetSize((1030, 585))
+        self.SetSize((1190, 585))
         self.SetTitle("Forsteri")
         self.Centre()
         self.Show(True)
 
+        # Set the icon once the frame is shown, as it is read from the
+        # network drive.
+        wx.CallAfter(self.set_icon)
+
+    def set_icon(self):
+        """
+        Load the icon and set it on the frame.
+
+        Args:
+          None
+
+        Returns:
+          None
+        """
+
+        # Create the icon.
+        self.icon = wx.Icon(os.path.join(idata.DATA, "Forsteri", "img",
+            "forsteri.ico"), wx.BITMAP_TYPE_ICO)
+
+        # Set the icon.
+        self.SetIcon(self.icon)
+
     def create_menu_bar(self):
         """
         Create the manu bar.
@@ -114,6 +130,7 @@ class Main(wx.Frame):
         openProducts = wx.MenuItem(fileMenu, wx.ID_OPEN,
             "&Open/Manage Products")
         newForecast = wx.MenuItem(fileMenu, wx.ID_NEW, "&New Item Forecast")
+        totals = wx.MenuItem(fileMenu, wx.ID_ANY, "&Hierarchy Totals")
         importData = wx.MenuItem(fileMenu, wx.ID_ADD, "&Import Data")
         quit = wx.MenuItem(fileMenu, wx.ID_EXIT)
 
@@ -126,33 +143,54 @@ class Main(wx.Frame):
         linkProducts = wx.MenuItem(utilities, wx.ID_CONVERT, "&Link Products")
         systematizeDB = wx.MenuItem(utilities, wx.ID_SORT_ASCENDING,
             "&Systematize Database")
+        tuneModels = wx.MenuItem(utilities, wx.ID_ANY, "&Tune Models")
         runModels = wx.MenuItem(utilities, wx.ID_EXECUTE, "&Run Models")
         updateErrors = wx.MenuItem(utilities, wx.ID_UP, "&Update Errors")
+        backtestModels = wx.MenuItem(utilities, wx.ID_ANY,
+            "&Backtest Models")
+        findIntervals = wx.MenuItem(utilities, wx.ID_ANY,
+            "&Prediction Intervals")
+        watchFolder = wx.MenuItem(utilities, wx.ID_ANY, "&Watch Drop Folder",
+            kind=wx.ITEM_CHECK)
+        showJobs = wx.MenuItem(utilities, wx.ID_ANY, "&Jobs")
 
         # Bind the utilities menu items to actions.
         self.Bind(wx.EVT_MENU, self.on_assign, assignMissing)
         self.Bind(wx.EVT_MENU, self.on_link, linkProducts)
         self.Bind(wx.EVT_MENU, self.on_systematize, systematizeDB)
+        self.Bind(wx.EVT_MENU, self.on_tune, tuneModels)
         self.Bind(wx.EVT_MENU, self.on_model, runModels)
         self.Bind(wx.EVT_MENU, self.on_update, updateErrors)
+        self.Bind(wx.EVT_MENU, self.on_backtest, backtestModels)
+        self.Bind(wx.EVT_MENU, self.on_intervals, findIntervals)
+        self.Bind(wx.EVT_MENU, self.on_watch, watchFolder)
+        self.Bind(wx.EVT_MENU, self.on_jobs, showJobs)
 
         # Add the items to the utilities menu.
         utilities.AppendItem(assignMissing)
         utilities.AppendItem(linkProducts)
         utilities.AppendSeparator()
         utilities.AppendItem(systematizeDB)
+        utilities.AppendItem(tuneModels)
         utilities.AppendItem(runModels)
         utilities.AppendItem(updateErrors)
+        utilities.AppendItem(backtestModels)
+        utilities.AppendItem(findIntervals)
+        utilities.AppendSeparator()
+        utilities.AppendItem(watchFolder)
+        utilities.AppendItem(showJobs)
 
         # Bind the file menu items to actions.
         self.Bind(wx.EVT_MENU, self.on_open, openProducts)
         self.Bind(wx.EVT_MENU, self.on_new_forecast, newForecast)
+        self.Bind(wx.EVT_MENU, self.on_totals, totals)
         self.Bind(wx.EVT_MENU, self.on_import, importData)
         self.Bind(wx.EVT_MENU, self.on_quit, quit)
 
         # Add the items to the file menu.
         fileMenu.AppendItem(openProducts)
         fileMenu.AppendItem(newForecast)
+        fileMenu.AppendItem(totals)
         fileMenu.AppendItem(importData)
         fileMenu.AppendSeparator()
         fileMenu.AppendSubMenu(utilities, "&Utilities")
@@ -217,6 +255,8 @@ class Main(wx.Frame):
           None
         """
 
+        from forsteri.gui.window import open_product as omp
+
         # Create the open product dialog.
         openProd = omp.OpenDialog(self,
             style=wx.DEFAULT_FRAME_STYLE^wx.RESIZE_BORDER)
@@ -242,9 +282,28 @@ class Main(wx.Frame):
         """
         """
 
+        from forsteri.gui.window import new_item as nif
+
         # Create the new item forecast frame.
         nif.NewItemFrame(self, style=wx.DEFAULT_FRAME_STYLE^wx.RESIZE_BORDER)
 
+    def on_totals(self, event):
+        """
+        What to do when the hierarchy totals menu item has been selected.
+
+        Args:
+          event(wx._core.CommandEvent): The triggered event when the
+            hierarchy totals menu item is selected.
+
+        Returns:
+          None
+        """
+
+        from forsteri.gui.window import hierarchy_totals as ht
+
+        # Create the hierarchy totals frame.
+        ht.TotalsFrame(self, style=wx.DEFAULT_FRAME_STYLE^wx.RESIZE_BORDER)
+
     def on_import(self, event):
         """
         What to do when the import menu item has been selected.
@@ -257,6 +316,8 @@ class Main(wx.Frame):
           None
         """
 
+        from forsteri.gui.window import import_data as imd
+
         # Create the import data frame.
         imd.ImportFrame(self, style=wx.DEFAULT_FRAME_STYLE^wx.RESIZE_BORDER)
 
@@ -272,6 +333,8 @@ class Main(wx.Frame):
           None
         """
 
+        from forsteri.gui.window import assign_missing as am
+
         # Create the assign missing frame.
         am.AssignFrame(self, style=wx.DEFAULT_FRAME_STYLE^wx.RESIZE_BORDER)
 
@@ -287,6 +350,8 @@ class Main(wx.Frame):
           None
         """
 
+        from forsteri.gui.window import link_products as lp
+
         # Create the link products frame.
         lp.LinkFrame(self, style=wx.DEFAULT_FRAME_STYLE^wx.RESIZE_BORDER)
 
@@ -302,25 +367,147 @@ class Main(wx.Frame):
           None
         """
 
-        # Systematize the database.
-        systematizeThread = td.Thread(target=idata.systematize)
-        systematizeThread.start()
+        from forsteri.process import similar as ps
+
+        # Systematize the database after any imports.
+        self.jobs.submit("Systematize", idata.systematize,
+            after=self.jobs.before("Systematize"), resources=["data"])
+
+        # Then reprofile the products whose history changed.
+        self.jobs.submit("Profiles", ps.runProfiles,
+            after=self.jobs.before("Profiles"), resources=["data"])
 
     def on_model(self, event):
         """
         """
 
-        # Run the models.
-        modelThread = td.Thread(target=pm.runAll)
-        modelThread.start()
+        from forsteri.process import model as pm
+
+        # Find the reconciliation chosen in the preferences and the method
+        # reported, whose forecasts are reconciled, the method selected for
+        # each product if the reconciled forecasts are reported.
+        pref = idata.getPreferences()
+        reconcile = pref.get("reconcile", "None").lower()
+        if reconcile == "none":
+            reconcile = None
+        base = pref.get("report_type", "Auto").lower()
+        if base in ["auto", "reconciled"]:
+            base = None
+
+        # Run the models after any imports and systematizing.
+        self.jobs.submit("Run Models", pm.runAll,
+            kwargs={"reconcile": reconcile, "base": base},
+            after=self.jobs.before("Run Models"), resources=["data"])
 
     def on_update(self, event):
         """
         """
 
-        # Create the update error threads.
-        updateThread = td.Thread(target=pm.runAllErrors)
-        updateThread.start()
+        from forsteri.process import model as pm
+
+        # Update the errors after any jobs feeding the models.
+        self.jobs.submit("Update Errors", pm.runAllErrors,
+            after=self.jobs.before("Update Errors"), resources=["data"])
+
+    def on_tune(self, event):
+        """
+        """
+
+        from forsteri.process import driver as pd
+        from forsteri.process import tune as pt
+
+        # Tune the models after any jobs feeding them.
+        self.jobs.submit("Tune Models", pt.runTune,
+            after=self.jobs.before("Tune Models"), resources=["data"])
+
+        # Then choose the drivers of the regression.
+        self.jobs.submit("Select Drivers", pd.runDrivers,
+            after=self.jobs.before("Select Drivers"), resources=["data"])
+
+    def on_backtest(self, event):
+        """
+        """
+
+        from forsteri.process import backtest as pb
+
+        # Backtest the models once every job feeding them has finished.
+        self.jobs.submit("Backtest", pb.runBacktest,
+            after=self.jobs.before("Backtest"), resources=["data"])
+
+    def on_intervals(self, event):
+        """
+        """
+
+        from forsteri.process import interval as pi
+
+        # Find the quantiles of the interval set in the preferences.
+        quantiles = pi.toQuantiles(idata.getPreferences().get("interval",
+            "80%"))
+
+        # Find the intervals once the errors they are drawn from are found.
+        self.jobs.submit("Intervals", pi.runIntervals,
+            kwargs={"quantiles": quantiles},
+            after=self.jobs.before("Intervals"), resources=["data"])
+
+    def on_job(self, job):
+        """
+        What to do when a job changes, called on the GUI thread.
+
+        Args:
+          job (forsteri.process.job.Job): The job that changed.
+
+        Returns:
+          None
+        """
+
+        # Show the state of the job in the status bar.
+        if job.state == pj.RUNNING:
+            self.SetStatusText("{n}: {p:.0f}% {m}".format(n=job.name,
+                p=job.percent, m=job.message))
+        else:
+            self.SetStatusText(job.name + ": " + job.state + ". " +\
+                job.message)
+
+    def on_jobs(self, event):
+        """
+        What to do when the jobs menu item has been selected.
+
+        Args:
+          event(wx._core.CommandEvent): The triggered event when the jobs
+            menu item is selected.
+
+        Returns:
+          None
+        """
+
+        from forsteri.gui.window import jobs as jb
+
+        # Create the job frame.
+        jb.JobFrame(self.jobs, self)
+
+    def on_watch(self, event):
+        """
+        What to do when the watch drop folder menu item has been toggled.
+
+        Args:
+          event(wx._core.CommandEvent): The triggered event when the watch
+            drop folder menu item is toggled.
+
+        Returns:
+          None
+        """
+
+        from forsteri.process import watch as pw
+
+        # Create the watcher the first time, importing through the jobs.
+        if self.watcher is None:
+            self.watcher = pw.Watcher(jobs=self.jobs)
+
+        # Start or stop watching the drop directory.
+        if event.IsChecked():
+            self.watcher.start()
+        else:
+            self.watcher.stop()
 
     def on_quit(self, event):
         """
@@ -348,6 +535,8 @@ class Main(wx.Frame):
           None
         """
 
+        from forsteri.gui.window import data_manager as dm
+
         # Create the data manager frame.
         dm.ManagerFrame(self, style=wx.DEFAULT_FRAME_STYLE^wx.RESIZE_BORDER)
 
@@ -377,6 +566,8 @@ class Main(wx.Frame):
           None
         """
 
+        from forsteri.gui.window import preferences as pref
+
         pref.PreferencesFrame(self,
             style=wx.DEFAULT_FRAME_STYLE^wx.RESIZE_BORDER)
 
@@ -27,6 +27,7 @@ import sqlite3
 import wx
 
 # Import forsteri modules.
+from forsteri.interface import cache
 from forsteri.interface import sql as isql
 
 class AssignFrame(wx.Frame):
@@ -189,8 +190,10 @@ class AssignFrame(wx.Frame):
         """
         """
 
-        # Commit the changes to the database.
+        # Commit the changes to the database, dropping the cached views of
+        # products.
         self.connection.commit()
+        cache.invalidate()
 
         self.Close()
 
@@ -30,6 +30,7 @@ Import Declarations
 import sqlite3
 import wx
 
+from forsteri.interface import cache
 from forsteri.interface import sql as isql
 
 """
@@ -573,9 +574,11 @@ class ManagerFrame(wx.Frame):
           None
         """
 
-        # Commit and close the database.
+        # Commit and close the database, dropping the cached views of
+        # products.
         self.connection.commit()
         self.connection.close()
+        cache.invalidate()
 
         # Close the window.
         self.Close()
@@ -593,8 +596,9 @@ class ManagerFrame(wx.Frame):
           None
         """
 
-        # Commit the database.
+        # Commit the database, dropping the cached views of products.
         self.connection.commit()
+        cache.invalidate()
 
     def onCancel(self, event):
         """
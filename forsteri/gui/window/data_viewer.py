@@ -25,15 +25,22 @@ THE SOFTWARE.
 """
 Import Declarations
 """
+import sqlite3
 import wx
 import wx.grid
 
+import numpy as np
+
 from forsteri.interface import data as idata
 
 """
 Constant Declarations
 """
+# The number of observations read from the database at a time.
+PAGE = 2000
 
+# The most pages kept in memory for a long series.
+PAGES = 16
 
 """
 Frame Class
@@ -56,10 +63,6 @@ class DataViewer(wx.Frame):
           DataViewer
         """
 
-        ## Initial Operations
-        # Get the data.
-        data = idata.getData(product, idata.toSQLName(variable))
-
         ## Frame
         # Initialize by the parent's constructor.
         super(DataViewer, self).__init__(*args, **kwargs)
@@ -79,29 +82,12 @@ class DataViewer(wx.Frame):
         # Initialize the grid.
         grid = wx.grid.Grid(masterPanel)
 
-        # Create the grid.
-        grid.CreateGrid(len(data), 2)
-
-        # Set the column labels.
-        grid.SetColLabelValue(0, "Date")
-        grid.SetColLabelValue(1, "Value")
-
-        # Populate the grid with data.
-        index = 0
-        for row in data:
-            # Add the data to the grid.
-            grid.SetCellValue(index, 0, row[0])
-            grid.SetCellValue(index, 1, str(row[1]))
-
-            # Set the date column to be read only.
-            grid.SetReadOnly(index, 0)
-
-            # Increment the index.
-            index += 1
+        # Create the table of data and give it to the grid.
+        self.table = DataTable(product, idata.toSQLName(variable))
+        grid.SetTable(self.table, True)
 
         # Find the grid width.
-        gridWidth = sum([grid.GetColSize(i) for i in range(0, len(data[0]))]) \
-            + 130
+        gridWidth = sum([grid.GetColSize(i) for i in range(0, 2)]) + 130
 
         ## Frame Operations
         # Add the grid to the master sizer.
@@ -112,18 +98,206 @@ class DataViewer(wx.Frame):
         # Set the sizer for the master panel.
         masterPanel.SetSizer(masterSizer)
 
+        # Bind the window close to a function.
+        self.Bind(wx.EVT_CLOSE, self.onClose)
+
         # Set window properties.
         self.SetSize((gridWidth, 565))
         self.SetTitle("Data Viewer")
         self.Centre()
         self.Show(True)
 
-    def populate(data):
+    """
+    Event Handler Functions
+    """
+    def onClose(self, event):
+        """
+        """
+
+        # Close the table's database connection.
+        self.table.close()
+
+        # Continue closing the frame.
+        event.Skip()
+
+"""
+Table Class
+"""
+class DataTable(wx.grid.PyGridTableBase):
+    """
+    A grid table of the dates and values of a variable for a product. Only
+    the number of observations is read when the table is created; pages of
+    observations are read into NumPy arrays the first time a row on them is
+    drawn and the least recently drawn pages are dropped, so a series of any
+    length opens at once and uses bounded memory. Edited values are kept
+    apart from the pages and put back on a page whenever it is read again.
+
+    Extends:
+      wx.grid.PyGridTableBase
+    """
+
+    def __init__(self, product, variable, page=PAGE, pages=PAGES):
+        """
+        Initialize the table.
+
+        Args:
+          product (str): The name of the product.
+          variable (str): The SQL name of the variable.
+          page (int, optional): The number of observations in a page.
+          pages (int, optional): The most pages kept in memory.
+
+        Returns:
+          DataTable
         """
+
+        # Initialize by the parent's constructor.
+        super(DataTable, self).__init__()
+
+        # Define the inputs.
+        self.product = product
+        self.variable = variable
+        self.page = page
+        self.pages = pages
+
+        # Open a connection kept for reading pages.
+        self.connection = sqlite3.connect(idata.MASTER)
+
+        # Find the number of observations.
+        self.count = idata.getDataCount(product, variable, self.connection)
+
+        # Create the loaded pages and the order they were last used in, and
+        # the edited values by row.
+        self.loaded = {}
+        self.used = []
+        self.edits = {}
+
+        # Create the read only attribute of the date column.
+        self.dateAttr = wx.grid.GridCellAttr()
+        self.dateAttr.SetReadOnly(True)
+
+    """
+    Manipulate Functions
+    """
+    def getPage(self, row):
+        """
+        Get the page holding a row, reading it from the database if needed.
+
+        Args:
+          row (int): The row of the table.
+
+        Returns:
+          tuple of (numpy.ndarray, numpy.ndarray): The dates and values of the
+            page.
         """
 
-        # 
-        pass
+        # Return the page if it is loaded and mark it as most recently used.
+        number = row // self.page
+        if number in self.loaded:
+            if self.used[-1] != number:
+                self.used.remove(number)
+                self.used.append(number)
+
+            return self.loaded[number]
+
+        # Read the page into arrays.
+        data = idata.getDataPage(self.product, self.variable,
+            number * self.page, self.page, self.connection)
+        dates = np.array([x[0] for x in data], dtype=object)
+        values = np.array([np.nan if x[1] is None else x[1] for x in data],
+            dtype=float)
+
+        # Put back the values edited on the page.
+        for (row, value) in self.edits.items():
+            if row // self.page == number and row % self.page < len(values):
+                values[row % self.page] = value
+
+        # Drop the least recently used page if there are too many.
+        if len(self.used) >= self.pages:
+            del self.loaded[self.used.pop(0)]
+
+        self.loaded[number] = (dates, values)
+        self.used.append(number)
+
+        return self.loaded[number]
+
+    def close(self):
+        """
+        """
+
+        self.connection.close()
+
+    """
+    Grid Table Functions
+    """
+    def GetNumberRows(self):
+        """
+        """
+
+        return self.count
+
+    def GetNumberCols(self):
+        """
+        """
+
+        return 2
+
+    def IsEmptyCell(self, row, col):
+        """
+        """
+
+        return False
+
+    def GetValue(self, row, col):
+        """
+        Get the text of a cell when it is drawn.
+        """
+
+        # Find the page and the row within it.
+        (dates, values) = self.getPage(row)
+        index = row % self.page
+        if index >= len(dates):
+            return ''
+
+        if col == 0:
+            return dates[index]
+        if np.isnan(values[index]):
+            return ''
+
+        return str(values[index])
+
+    def SetValue(self, row, col, value):
+        """
+        Change a value held by the table. Dates are read only.
+        """
+
+        # Only values can be changed.
+        if col == 0:
+            return
+
+        # Keep the value with the edits and change it in the loaded page.
+        (dates, values) = self.getPage(row)
+        try:
+            self.edits[row] = float(value)
+        except ValueError:
+            return
+        values[row % self.page] = self.edits[row]
+
+    def GetColLabelValue(self, col):
+        """
+        """
+
+        return ["Date", "Value"][col]
+
+    def GetAttr(self, row, col, kind):
+        """
+        Make the date column read only.
+        """
+
+        if col == 0:
+            self.dateAttr.IncRef()
+            return self.dateAttr
+
+        return None
 
 def main():
     """
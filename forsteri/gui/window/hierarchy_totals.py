@@ -0,0 +1,230 @@
+#!/usr/bin/python
+
+"""
+Hierarchy Totals Frame
+
+Copyright (c) 2014, 2015 Andrew Hawkins
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+
+"""
+Import Declarations
+"""
+import sqlite3
+import wx
+
+from forsteri.interface import data as idata
+from forsteri.interface import rollup as irollup
+
+"""
+Frame Class
+"""
+class TotalsFrame(wx.Frame):
+    """
+    A frame showing the monthly totals of a variable or forecast for a title
+    of the hierarchy, read from the rollup table.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """
+        Initialize the frame.
+
+        Args:
+          *args (): Any arguments to be passed directly to the super's
+            constructor.
+          **kwargs (): Any keyword arguments to be passed to the super's
+            constructor.
+
+        Returns:
+          TotalsFrame
+        """
+
+        ## Frame
+        # Initialize by the parent's constructor.
+        super(TotalsFrame, self).__init__(*args, **kwargs)
+
+        # Open a connection to the data database.
+        self.connection = sqlite3.connect(idata.MASTER)
+
+        # Create the master panel.
+        masterPanel = wx.Panel(self)
+
+        # Create the master sizer.
+        masterSizer = wx.BoxSizer(wx.VERTICAL)
+
+        ## Input Section
+        # Create the input sizer.
+        inputSizer = wx.FlexGridSizer(3, 2, 5, 10)
+
+        # Create the tier, title, and variable choices.
+        self.tierChoice = wx.ComboBox(masterPanel, size=(200, -1),
+            choices=[x.title() for x in irollup.TIERS], style=wx.CB_READONLY)
+        self.titleChoice = wx.ComboBox(masterPanel, size=(200, -1),
+            style=wx.CB_READONLY)
+        self.variableChoice = wx.ComboBox(masterPanel, size=(200, -1),
+            choices=[idata.fromSQLName(x) for x in\
+            irollup.getRollupVariables(self.connection)],
+            style=wx.CB_READONLY)
+
+        # Bind the choices to functions.
+        self.tierChoice.Bind(wx.EVT_COMBOBOX, self.onTier)
+        self.titleChoice.Bind(wx.EVT_COMBOBOX, self.onShow)
+        self.variableChoice.Bind(wx.EVT_COMBOBOX, self.onShow)
+
+        # Add everything to the input sizer.
+        inputSizer.AddMany([wx.StaticText(masterPanel, label="Tier"),
+            self.tierChoice,
+            wx.StaticText(masterPanel, label="Title"), self.titleChoice,
+            wx.StaticText(masterPanel, label="Variable"),
+            self.variableChoice])
+
+        ## Totals
+        # Create the totals list control.
+        self.totalsList = wx.ListCtrl(masterPanel, size=(390, 250),
+            style=wx.LC_REPORT|wx.LC_HRULES|wx.LC_VRULES|wx.BORDER_SUNKEN)
+
+        # Add columns to the list control.
+        self.totalsList.InsertColumn(0, "Month", width=90)
+        self.totalsList.InsertColumn(1, "Total", width=110)
+        self.totalsList.InsertColumn(2, "Products", width=80)
+        self.totalsList.InsertColumn(3, "Average", width=90)
+
+        ## Buttons
+        # Create the button sizer.
+        buttonSizer = wx.BoxSizer(wx.HORIZONTAL)
+
+        # Create the buttons.
+        rebuildButton = wx.Button(masterPanel, label="&Rebuild")
+        closeButton = wx.Button(masterPanel, id=wx.ID_CLOSE)
+
+        # Add the buttons to the button sizer.
+        buttonSizer.AddMany([rebuildButton, (5, 0), closeButton])
+
+        # Bind button presses to functions.
+        rebuildButton.Bind(wx.EVT_BUTTON, self.onRebuild)
+        closeButton.Bind(wx.EVT_BUTTON, self.onClose)
+
+        ## Frame Operations
+        # Add everything to the master sizer.
+        masterSizer.Add(inputSizer, flag=wx.ALL, border=5)
+        masterSizer.Add(self.totalsList, flag=wx.ALL, border=5)
+        masterSizer.Add(buttonSizer, flag=wx.ALL|wx.ALIGN_RIGHT, border=5)
+
+        # Set the sizer for the master panel.
+        masterPanel.SetSizer(masterSizer)
+
+        # Bind the window close to a function.
+        self.Bind(wx.EVT_CLOSE, self.onClose)
+
+        # Set window properties.
+        self.SetSize((410, 420))
+        self.SetTitle("Hierarchy Totals")
+        self.Centre()
+        self.Show(True)
+
+    """
+    Helper Functions
+    """
+    def getTier(self):
+        """
+        """
+
+        return self.tierChoice.GetValue().lower()
+
+    def getVariable(self):
+        """
+        """
+
+        return idata.toSQLName(self.variableChoice.GetValue())
+
+    """
+    Event Handler Functions
+    """
+    def onTier(self, event):
+        """
+        """
+
+        # Show the titles of the tier.
+        self.titleChoice.SetItems(irollup.getRollupTitles(self.getTier(),
+            self.connection))
+        self.totalsList.DeleteAllItems()
+
+    def onShow(self, event):
+        """
+        """
+
+        # Remove all items from the totals list.
+        self.totalsList.DeleteAllItems()
+
+        # Do nothing until a title and variable are chosen.
+        title = self.titleChoice.GetValue()
+        variable = self.getVariable()
+        if title == '' or variable == '':
+            return
+
+        # Add the totals of each month.
+        index = 0
+        for (date, total, count) in irollup.getRollup(self.getTier(), title,
+            variable, self.connection):
+            self.totalsList.InsertStringItem(index, date[0 : 7])
+            self.totalsList.SetStringItem(index, 1, "{:.0f}".format(total))
+            self.totalsList.SetStringItem(index, 2, str(count))
+            self.totalsList.SetStringItem(index, 3,
+                "{:.1f}".format(total / count))
+            index += 1
+
+    def onRebuild(self, event):
+        """
+        Rebuild every total as a job, after any jobs that change the data.
+        """
+
+        # Use the job manager of the main frame if there is one.
+        parent = self.GetParent()
+        if hasattr(parent, "jobs"):
+            parent.jobs.submit("Rollup", irollup.refreshRollup,
+                after=parent.jobs.before("Rollup"), resources=["data"])
+        else:
+            irollup.refreshRollup()
+
+    def onClose(self, event):
+        """
+        """
+
+        # Close the connection to the database.
+        self.connection.close()
+
+        self.Destroy()
+
+"""
+Start Application
+"""
+def main():
+    """
+    When the file is called independently create and display the totals
+    frame.
+    """
+
+    app = wx.App()
+    TotalsFrame(None, style=wx.DEFAULT_FRAME_STYLE^wx.RESIZE_BORDER)
+    app.MainLoop()
+
+if __name__ == '__main__':
+    main()
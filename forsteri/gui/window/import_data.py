@@ -28,12 +28,14 @@ THE SOFTWARE.
 Import Declarations
 """
 import datetime as dt
+import json
 import threading as td
 import wx
 
 from forsteri.interface import data as idata
 from forsteri.interface import sql as isql
 from forsteri.process import bring as dec
+from forsteri.process import timing as pt
 
 """
 Constant Declarations
@@ -180,6 +182,7 @@ class ImportFrame(wx.Frame):
         # Create the check boxes.
         self.shiftCheck = wx.CheckBox(masterPanel, label="Shift Week")
         self.overwriteCheck = wx.CheckBox(masterPanel, label="Overwrite")
+        self.deltaCheck = wx.CheckBox(masterPanel, label="Only New Rows")
 
         # Initially disable the Walmart week check box.
         self.shiftCheck.Disable()
@@ -191,6 +194,8 @@ class ImportFrame(wx.Frame):
         checkSizer.Add(self.shiftCheck, flag=wx.RIGHT|wx.ALIGN_LEFT, border=5)
         checkSizer.Add(self.overwriteCheck,
             flag=wx.TOP|wx.RIGHT|wx.ALIGN_LEFT, border=5)
+        checkSizer.Add(self.deltaCheck,
+            flag=wx.TOP|wx.RIGHT|wx.ALIGN_LEFT, border=5)
 
         # Add the file picker and check sizers to the last sizer.
         lastSizer.Add(filePickerSizer)
@@ -232,6 +237,7 @@ class ImportFrame(wx.Frame):
         finishSizer = wx.BoxSizer(wx.HORIZONTAL)
 
         # Create the buttons.
+        timingsButton = wx.Button(masterPanel, label="&Timings")
         importButton = wx.Button(masterPanel, label="&Import")
         cancelButton = wx.Button(masterPanel, id=wx.ID_CANCEL)
 
@@ -239,9 +245,11 @@ class ImportFrame(wx.Frame):
         importButton.SetDefault()
 
         # Add the buttons to the finish sizer.
-        finishSizer.AddMany([importButton, (5, 0), cancelButton])
+        finishSizer.AddMany([timingsButton, (5, 0), importButton, (5, 0),
+            cancelButton])
 
         # Bind button presses to functions.
+        timingsButton.Bind(wx.EVT_BUTTON, self.onTimings)
         importButton.Bind(wx.EVT_BUTTON, self.onImport)
         cancelButton.Bind(wx.EVT_BUTTON, self.onCancel)
 
@@ -259,7 +267,7 @@ class ImportFrame(wx.Frame):
         self.Bind(wx.EVT_CLOSE, self.onClose)
 
         # Set window properties.
-        self.SetSize((575, 580))
+        self.SetSize((575, 600))
         self.SetTitle("Import Data")
         self.Centre()
         self.Show(True)
@@ -406,6 +414,11 @@ class ImportFrame(wx.Frame):
 
             return
 
+        # Determine what to do with content that has already been imported.
+        duplicate = self.checkDuplicate(source)
+        if duplicate is None:
+            return
+
         # Check to make sure there is a date for the file.
         if self.timeseriesRB.GetValue():
             # Get the value selected for date format from the combo box.
@@ -441,20 +454,18 @@ class ImportFrame(wx.Frame):
                     # Destroy the variable dialog.
                     variableDlg.Destroy()
 
-                    # Call the import timeseries function in a thread.
-                    importThread = td.Thread(target=dec.importTimeseries,
-                        args=(source, dateFormat, variable, overwrite))
-                    importThread.start()
+                    # Queue the import timeseries function as a job.
+                    submitImport(dec.importTimeseries, (source, dateFormat,
+                        variable, overwrite, duplicate), self.GetParent())
 
                     self.Close()
                 else:
                     # Get the shift check.
                     shift = self.shiftCheck.GetValue()
 
-                    # Call the import timeseries function in a thread.
-                    importThread = td.Thread(target=dec.importTimeseries2,
-                        args=(source, dateFormat, overwrite, shift))
-                    importThread.start()
+                    # Queue the import timeseries function as a job.
+                    submitImport(dec.importTimeseries2, (source, dateFormat,
+                        overwrite, shift, duplicate), self.GetParent())
 
                     self.Close()
             else:
@@ -492,16 +503,47 @@ class ImportFrame(wx.Frame):
                 # Get the date from the input.
                 date = dt.date(*(entry.GetValue() for entry in self.stEntry))
 
-                # Call the import timeseries function in a thread.
-                importThread = td.Thread(target=dec.importSingleTime,
-                    args=(source, date, overwrite))
-                importThread.start()
+                # Queue the import single time function as a job.
+                submitImport(dec.importSingleTime, (source, date, overwrite,
+                    duplicate), self.GetParent())
 
                 self.Close()
 
     """
     Helper Functions
     """
+    def checkDuplicate(self, source):
+        """
+        Determine how previously imported content in the file is handled.
+
+        Args:
+          source (str): The location of the file on the disk.
+
+        Returns:
+          str: The duplicate flag passed to the import functions, None if the
+            import should not happen.
+        """
+
+        # Only import rows that have not been seen if requested.
+        if self.deltaCheck.GetValue():
+            return "delta"
+
+        # If the exact file has not been imported before, import it.
+        if isql.getImportByHash(dec.fingerprint(source)) is None:
+            return "skip"
+
+        # Ask whether or not to import the same file again.
+        confirmDialog = wx.MessageDialog(self,
+            "This file has already been imported. Import it again?",
+            "Duplicate Import", wx.YES_NO|wx.ICON_QUESTION)
+        answer = confirmDialog.ShowModal()
+        confirmDialog.Destroy()
+
+        if answer == wx.ID_YES:
+            return "reload"
+
+        return None
+
     def convertVariable(self, variable):
         """
         """
@@ -513,6 +555,27 @@ class ImportFrame(wx.Frame):
     """
     Event Handler Functions
     """
+    def onTimings(self, event):
+        """
+        Show the stage timings of the latest import.
+        """
+
+        # Get the latest import with timings.
+        latest = isql.getImportTimings(1)
+
+        # If there are none, show an error message and return.
+        if len(latest) == 0:
+            errorDialog = wx.MessageDialog(self,
+                "No import timings have been recorded.", "Error",
+                wx.OK|wx.ICON_ERROR)
+            errorDialog.ShowModal()
+
+            return
+
+        # Show the timings.
+        (importID, location, date, timings) = latest[0]
+        TimingFrame(json.loads(timings), location, self)
+
     def onCancel(self, event):
         """
         """
@@ -670,6 +733,136 @@ class HeaderDialog(wx.Dialog):
 
         self.EndModal(wx.ID_OK)
 
+class TimingFrame(wx.Frame):
+    """
+    A frame showing the wall time, rows, throughput, rise in the peak memory,
+    and peak memory of each stage of an import.
+    """
+
+    def __init__(self, stages, location, *args, **kwargs):
+        """
+        Initialize the frame.
+
+        Args:
+          stages (list of dict): The stages as recorded by a StageTimer.
+          location (str): The location of the imported file.
+          *args (): Any arguments to be passed directly to the super's
+            constructor.
+          **kwargs (): Any keyword arguments to be passed to the super's
+            constructor.
+
+        Returns:
+          TimingFrame
+        """
+
+        # Initialize by the parent's constructor.
+        super(TimingFrame, self).__init__(*args, **kwargs)
+
+        # Create the master panel.
+        masterPanel = wx.Panel(self)
+
+        # Create the master sizer.
+        masterSizer = wx.BoxSizer(wx.VERTICAL)
+
+        # Create the location text.
+        locationText = wx.StaticText(masterPanel, label=location)
+
+        # Create the list control.
+        timingList = wx.ListCtrl(masterPanel, size=(570, 200),
+            style=wx.LC_REPORT|wx.LC_HRULES|wx.LC_VRULES|wx.BORDER_SUNKEN)
+
+        # Add columns to the list control.
+        labels = ["Stage", "Seconds", "Rows", "Rows/s", "Peak +MB",
+            "Peak MB"]
+        for (index, label) in enumerate(labels):
+            timingList.InsertColumn(index, label, width=94)
+
+        # Add each stage to the list control.
+        for (index, stage) in enumerate(stages):
+            timingList.InsertStringItem(index, stage["stage"])
+            timingList.SetStringItem(index, 1,
+                "{:.3f}".format(stage["seconds"]))
+            timingList.SetStringItem(index, 2,
+                pt.formatValue(stage["rows"], "{:d}"))
+            timingList.SetStringItem(index, 3,
+                pt.formatValue(stage["rate"], "{:.0f}"))
+            timingList.SetStringItem(index, 4,
+                pt.formatMemory(stage.get("growth")))
+            timingList.SetStringItem(index, 5,
+                pt.formatMemory(stage["peak"]))
+
+        # Create the total text.
+        totalText = wx.StaticText(masterPanel, label="Total: " +\
+            "{:.3f}".format(sum([x["seconds"] for x in stages])) + " seconds")
+
+        # Add everything to the master sizer.
+        masterSizer.Add(locationText, flag=wx.ALL|wx.ALIGN_CENTER, border=5)
+        masterSizer.Add(timingList, flag=wx.LEFT|wx.RIGHT, border=5)
+        masterSizer.Add(totalText, flag=wx.ALL|wx.ALIGN_RIGHT, border=5)
+
+        # Set the sizer for the master panel.
+        masterPanel.SetSizer(masterSizer)
+
+        # Set window properties.
+        self.SetSize((590, 300))
+        self.SetTitle("Import Timings")
+        self.Centre()
+        self.Show(True)
+
+"""
+Helper Functions
+"""
+def runImport(function, args, parent):
+    """
+    Run an import function with a timer and show the timings when it
+    finishes.
+
+    Args:
+      function (function): The bring import function.
+      args (tuple of object): The arguments to the import function.
+      parent (wx.Window): The parent of the timing frame.
+
+    Returns:
+      bool: True if the import happened, false otherwise.
+    """
+
+    # Run the import with a timer.
+    timer = pt.StageTimer()
+    imported = function(*args, timer=timer)
+
+    # Show the timings on the GUI thread.
+    if imported:
+        wx.CallAfter(TimingFrame, timer.stages, args[0], parent)
+
+    return imported
+
+def submitImport(function, args, parent):
+    """
+    Queue an import on the job manager of the main frame, or run it in a
+    thread if there is none.
+
+    Args:
+      function (function): The bring import function.
+      args (tuple of object): The arguments to the import function.
+      parent (wx.Window): The main frame.
+
+    Returns:
+      None
+    """
+
+    # Run the import in a thread when opened on its own.
+    if not hasattr(parent, "jobs"):
+        importThread = td.Thread(target=runImport,
+            args=(function, args, parent))
+        importThread.start()
+
+        return
+
+    # Queue the import, keeping anything else off the databases.
+    parent.jobs.submit("Import", runImport, args=(function, args, parent),
+        after=parent.jobs.before("Import"), resources=["data", "master"],
+        progress=False)
+
 """
 Start Application
 """
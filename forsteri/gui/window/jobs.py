@@ -0,0 +1,224 @@
+#!/usr/bin/python
+
+"""
+Job Frame
+
+Copyright (c) 2014, 2015 Andrew Hawkins
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+"""
+Import Declarations
+"""
+import wx
+
+from forsteri.interface import sql as isql
+
+"""
+Frame Class
+"""
+class JobFrame(wx.Frame):
+    """
+    A frame listing the jobs of a job manager with their progress, which can
+    cancel them, and the history of finished jobs.
+    """
+
+    def __init__(self, manager, *args, **kwargs):
+        """
+        Initialize the frame.
+
+        Args:
+          manager (forsteri.process.job.JobManager): The job manager shown.
+          *args (): Any arguments to be passed directly to the super's
+            constructor.
+          **kwargs (): Any keyword arguments to be passed to the super's
+            constructor.
+
+        Returns:
+          JobFrame
+        """
+
+        ## Frame
+        # Initialize by the parent's constructor.
+        super(JobFrame, self).__init__(*args, **kwargs)
+
+        # Define the job manager.
+        self.manager = manager
+
+        # Create the master panel.
+        masterPanel = wx.Panel(self)
+
+        # Create the master sizer.
+        masterSizer = wx.BoxSizer(wx.VERTICAL)
+
+        ## Jobs
+        # Create the job list control.
+        self.jobList = wx.ListCtrl(masterPanel, size=(590, 150),
+            style=wx.LC_REPORT|wx.LC_HRULES|wx.LC_VRULES|wx.BORDER_SUNKEN)
+
+        # Add columns to the list control.
+        self.jobList.InsertColumn(0, "Job", width=110)
+        self.jobList.InsertColumn(1, "State", width=75)
+        self.jobList.InsertColumn(2, "Progress", width=65)
+        self.jobList.InsertColumn(3, "Seconds", width=65)
+        self.jobList.InsertColumn(4, "Message", width=270)
+
+        ## History
+        # Create the history label.
+        historyText = wx.StaticText(masterPanel, label="History")
+
+        # Create the history list control.
+        self.historyList = wx.ListCtrl(masterPanel, size=(590, 150),
+            style=wx.LC_REPORT|wx.LC_HRULES|wx.LC_VRULES|wx.BORDER_SUNKEN)
+
+        # Add columns to the list control.
+        self.historyList.InsertColumn(0, "Job", width=110)
+        self.historyList.InsertColumn(1, "State", width=75)
+        self.historyList.InsertColumn(2, "Finished", width=130)
+        self.historyList.InsertColumn(3, "Seconds", width=65)
+        self.historyList.InsertColumn(4, "Message", width=210)
+
+        ## Buttons
+        # Create the button sizer.
+        buttonSizer = wx.BoxSizer(wx.HORIZONTAL)
+
+        # Create the buttons.
+        cancelJobButton = wx.Button(masterPanel, label="&Cancel Job")
+        closeButton = wx.Button(masterPanel, id=wx.ID_CLOSE)
+
+        # Add the buttons to the button sizer.
+        buttonSizer.AddMany([cancelJobButton, (5, 0), closeButton])
+
+        # Bind button presses to functions.
+        cancelJobButton.Bind(wx.EVT_BUTTON, self.onCancelJob)
+        closeButton.Bind(wx.EVT_BUTTON, self.onClose)
+
+        ## Frame Operations
+        # Add everything to the master sizer.
+        masterSizer.Add(self.jobList, flag=wx.ALL, border=5)
+        masterSizer.Add(historyText, flag=wx.LEFT|wx.TOP, border=5)
+        masterSizer.Add(self.historyList, flag=wx.ALL, border=5)
+        masterSizer.Add(buttonSizer, flag=wx.ALL|wx.ALIGN_RIGHT, border=5)
+
+        # Set the sizer for the master panel.
+        masterPanel.SetSizer(masterSizer)
+
+        # Show the jobs and history, updating them when a job changes.
+        self.updateJobs()
+        self.updateHistory()
+        self.manager.listen(self.onJob)
+
+        # Bind the window close to a function.
+        self.Bind(wx.EVT_CLOSE, self.onClose)
+
+        # Set window properties.
+        self.SetSize((610, 420))
+        self.SetTitle("Jobs")
+        self.Centre()
+        self.Show(True)
+
+    """
+    Helper Functions
+    """
+    def updateJobs(self):
+        """
+        """
+
+        # Remove all items from the job list.
+        self.jobList.DeleteAllItems()
+
+        # Add the jobs, latest first.
+        index = 0
+        for job in reversed(self.manager.jobs):
+            seconds = job.seconds()
+            self.jobList.InsertStringItem(index, job.name)
+            self.jobList.SetStringItem(index, 1, job.state)
+            self.jobList.SetStringItem(index, 2,
+                "{:.0f}%".format(job.percent))
+            self.jobList.SetStringItem(index, 3, '' if seconds is None else\
+                "{:.1f}".format(seconds))
+            self.jobList.SetStringItem(index, 4, job.message)
+            index += 1
+
+    def updateHistory(self):
+        """
+        """
+
+        # Remove all items from the history list.
+        self.historyList.DeleteAllItems()
+
+        # Add the finished jobs, latest first.
+        index = 0
+        for (jobID, name, state, started, finished, seconds, message) in\
+            isql.getJobHistory():
+            self.historyList.InsertStringItem(index, name)
+            self.historyList.SetStringItem(index, 1, state)
+            self.historyList.SetStringItem(index, 2, finished)
+            self.historyList.SetStringItem(index, 3, '' if seconds is None\
+                else "{:.1f}".format(seconds))
+            self.historyList.SetStringItem(index, 4, message or '')
+            index += 1
+
+    """
+    Event Handler Functions
+    """
+    def onJob(self, job):
+        """
+        Update the lists from the GUI thread when a job changes.
+        """
+
+        wx.CallAfter(self.showJob, job)
+
+    def showJob(self, job):
+        """
+        """
+
+        # Do nothing if the frame has been closed.
+        if not self:
+            return
+
+        self.updateJobs()
+        if job.isFinished():
+            self.updateHistory()
+
+    def onCancelJob(self, event):
+        """
+        """
+
+        # Find the selected job, the list is latest first.
+        index = self.jobList.GetFirstSelected()
+        if index == -1:
+            errorDialog = wx.MessageDialog(self, "No job was selected.",
+                "Error", wx.OK|wx.ICON_ERROR)
+            errorDialog.ShowModal()
+
+            return
+
+        # Cancel the job.
+        self.manager.jobs[len(self.manager.jobs) - 1 - index].cancel()
+
+    def onClose(self, event):
+        """
+        """
+
+        # Stop listening to the manager.
+        self.manager.unlisten(self.onJob)
+
+        self.Destroy()
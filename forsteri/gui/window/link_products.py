@@ -31,6 +31,7 @@ import sqlite3
 import threading as td
 import wx
 
+from forsteri.interface import cache
 from forsteri.interface import data as idata
 from forsteri.interface import sql as isql
 
@@ -370,11 +371,13 @@ class LinkFrame(wx.Frame):
         """
         """
 
-        # Commit and close the database.
+        # Commit and close the database, dropping the cached views of
+        # products.
         self.connection.commit()
         self.connection.close()
         self.connection2.commit()
         self.connection2.close()
+        cache.invalidate()
 
         self.Close()
 
@@ -27,12 +27,14 @@ THE SOFTWARE.
 """
 Import Declarations
 """
-import copy
+import numpy as np
 import sqlite3
 import wx
 
 from forsteri.interface import data as idata
+from forsteri.interface import launch as ilaunch
 from forsteri.interface import sql as isql
+from forsteri.process import model as pm
 
 """
 Constant Declarations
@@ -141,6 +143,25 @@ class NewItemFrame(wx.Frame):
         # Add the  sizer to the info sizer.
         infoSizer.Add(infoGridSizer, flag=wx.EXPAND)
 
+        ## Launch Curve
+        # Create the curve static box.
+        curveSB = wx.StaticBox(masterPanel, label="Launch Curve")
+
+        # Create the curve sizer.
+        curveSizer = wx.StaticBoxSizer(curveSB, wx.VERTICAL)
+
+        # Create the list control.
+        self.curveList = wx.ListCtrl(masterPanel, size=(730, 150),
+            style=wx.LC_REPORT|wx.LC_HRULES|wx.LC_VRULES|wx.BORDER_SUNKEN)
+
+        # Add a column for each month after launch.
+        self.curveList.InsertColumn(0, "Percentile", width=70)
+        for i in range(1, ilaunch.LENGTH + 1):
+            self.curveList.InsertColumn(i, "Month " + str(i), width=55)
+
+        # Add the curve list to the curve sizer.
+        curveSizer.Add(self.curveList, flag=wx.ALL, border=5)
+
         ## Frame Operations
         # Add everything to the master sizer.
         masterSizer.Add(contentSizer, flag=wx.TOP|wx.ALIGN_CENTER, border=10)
@@ -149,12 +170,14 @@ class NewItemFrame(wx.Frame):
             wx.ALIGN_CENTER, border=5)
         masterSizer.Add(infoSizer, flag=wx.ALL|wx.ALIGN_CENTER|wx.EXPAND,
             border=5)
+        masterSizer.Add(curveSizer, flag=wx.LEFT|wx.RIGHT|wx.BOTTOM|
+            wx.ALIGN_CENTER, border=5)
 
         # Set the sizer for the master panel.
         masterPanel.SetSizer(masterSizer)
 
         # Set window properties.
-        self.SetSize((328, 530))
+        self.SetSize((760, 720))
         self.SetTitle("New Item Forecast")
         self.Centre()
         self.Show(True)
@@ -175,38 +198,6 @@ class NewItemFrame(wx.Frame):
 
         return choices
 
-    def summary(self, data):
-        """
-        """
-
-        # Copy, find the length, and sort the data.
-        dataCopy = copy.copy(data)
-        dataLen = len(dataCopy)
-        dataCopy.sort()
-
-        # Find the maximum and mean of the data.
-        summary = [dataCopy[-1]]
-        summary.append(sum(dataCopy) / dataLen)
-
-        # Iterate over each quartile.
-        for i in range(3, 0, -1):
-            q = i * (dataLen - 1)
-            summary.append(self.quartile(dataCopy, q // 4, q % 4))
-
-        # Find the minimum.
-        summary.append(dataCopy[0])
-
-        # Swap the mean.
-        summary[1], summary[2] = summary[2], summary[1]
-
-        return summary
-
-    def quartile(self, data, i, r):
-        """
-        """
-
-        return data[i] + (r / 4) * (data[i + 1] - data[i])
-
     """
     Event Handlers
     """
@@ -226,40 +217,63 @@ class NewItemFrame(wx.Frame):
             len(selections):
             return
 
-        # Get the data from the selections.
-        description = selections.copy()
-        products = [x[0] for x in isql.getData(description)]
+        # Build the launch curves if they have never been built.
+        if ilaunch.countLaunch(connection) == 0:
+            ilaunch.refreshLaunch(connection=connection)
+            connection.commit()
+
+        # Get the launch curves of the products with the selections.
+        analogs = ilaunch.getAnalogs({key.lower(): value for (key, value) in\
+            selections.items()}, connection)
+        connection.close()
 
-        # Remove all items from the list control and reset the index.
+        # Remove all items from the list controls.
         self.relatedList.DeleteAllItems()
+        self.curveList.DeleteAllItems()
+        for item in self.infoItems:
+            item.SetLabel('')
 
-        # 
-        index = 0
-        first = []
-        for product in products:
-            try:
-                first.append(idata.getData(product, "finished_goods_monthly",
-                    connection=connection)[0][1])
-
-                self.relatedList.InsertStringItem(index, product)
-                self.relatedList.SetStringItem(index, 1,
-                    str(int(first[index])))
-
-                index += 1
-            except IndexError:
-                continue
-
-        # Get the summary statistics.
-        try:
-            summary = self.summary(first)
-        except IndexError:
+        # Do nothing more if there are no analogs.
+        if len(analogs) == 0:
             return
 
-        # Set each value.
-        i = 0
-        for item in self.infoItems:
-            item.SetLabel(str(round(summary[i])))
-            i += 1
+        # Find the values and percentiles of the curves.
+        (values, bands, mean) = pm.launchCurves(analogs)
+
+        # Add each analog and its first month.
+        first = values[:, 0]
+        for (index, row) in enumerate(analogs):
+            self.relatedList.InsertStringItem(index, row[0])
+            self.relatedList.SetStringItem(index, 1, toText(first[index]))
+
+        # Get the summary statistics of the first month.
+        released = first[~np.isnan(first)]
+        if len(released) > 0:
+            summary = np.percentile(released, [100, 75, 50, 25, 0])
+            summary = np.insert(summary, 2, released.mean())
+            for (item, value) in zip(self.infoItems, summary):
+                item.SetLabel(toText(value))
+
+        # Add a row for each percentile and the mean.
+        rows = [(str(x) + "th", band) for (x, band) in\
+            zip(pm.PERCENTILES, bands)] + [("Mean", mean)]
+        for (index, (label, band)) in enumerate(rows):
+            self.curveList.InsertStringItem(index, label)
+            for (i, value) in enumerate(band):
+                self.curveList.SetStringItem(index, i + 1, toText(value))
+
+"""
+Helper Functions
+"""
+def toText(value):
+    """
+    Get the text of a value rounded to a whole number, empty for nan.
+    """
+
+    if np.isnan(value):
+        return ''
+
+    return str(int(round(value)))
 
 """
 Start Application
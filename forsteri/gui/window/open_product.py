@@ -25,18 +25,21 @@ THE SOFTWARE.
 # Import python modules.
 import csv
 import datetime as dt
-import os
-import pickle
 import sqlite3
 import wx
 
 # Import forsteri modules.
+from forsteri.interface import cache
 from forsteri.interface import data as idata
+from forsteri.interface import search
 from forsteri.interface import sql as isql
 
 # Create global labels.
 LABELS = ["product", "sku", "account", "class", "category", "subcategory"]
 
+# The milliseconds to wait after a keystroke before searching.
+DELAY = 150
+
 class OpenDialog(wx.Dialog):
     """
     A dialog containing all products that are contained within the master
@@ -49,10 +52,7 @@ class OpenDialog(wx.Dialog):
       wx.Dialog
 
     To Do:
-      1) Make the updating of list items occur without removing all items and
-        adding new back.
-      2) Add ways to search for products. Being by chemical or component.
-      3) Make the header clickable and sort by that column when clicked.
+      1) Add ways to search for products. Being by chemical or component.
     """
 
     def __init__(self, *args, **kwargs):
@@ -119,7 +119,10 @@ class OpenDialog(wx.Dialog):
         searchSizer.Add(self.inputs[0], flag=wx.LEFT|wx.RIGHT, border=5)
 
         # Bind text entry to a function.
-        self.inputs[0].Bind(wx.EVT_TEXT, self.updateList)
+        self.inputs[0].Bind(wx.EVT_TEXT, self.onText)
+
+        # Create the delayed search started by text entry.
+        self.delay = None
 
         # Create subsequent label and combo boxes, add them to the search
         # sizer, and bind them to functions.
@@ -140,15 +143,7 @@ class OpenDialog(wx.Dialog):
 
         ## List Control
         # Create the list control.
-        self.productList = wx.ListCtrl(masterPanel, size=(710, 400),
-            style=wx.LC_REPORT|wx.LC_HRULES|wx.LC_VRULES|wx.BORDER_SUNKEN)
-
-        # Add columns to the list control.
-        self.productList.InsertColumn(0, "Product", width=136)
-        self.productList.InsertColumn(1, "Account", width=136)
-        self.productList.InsertColumn(2, "Class", width=136)
-        self.productList.InsertColumn(3, "Category", width=136)
-        #self.productList.InsertColumn(4, "Subcategory", width=136)
+        self.productList = ProductListCtrl(masterPanel, size=(710, 400))
 
         # Bind the selection of an item to a function.
         self.productList.Bind(wx.EVT_LIST_ITEM_SELECTED, self.onSelected)
@@ -250,6 +245,17 @@ class OpenDialog(wx.Dialog):
         # Open a connection to the database.
         self.connection = sqlite3.connect(isql.MASTER)
 
+        # Create the table used by multi edits before any change is made.
+        isql.createSelection(self.connection)
+
+        # Keep the titles of every product to find the ones edits move.
+        self.classification = isql.getClassification(
+            connection=self.connection)
+
+        # Load the search index of products.
+        self.index = search.ProductIndex()
+        self.index.load(self.connection)
+
         # Update the displayed list.
         self.updateList(None)
 
@@ -280,7 +286,7 @@ class OpenDialog(wx.Dialog):
         index = 1
         while index <= count:
             # Add the next product to the list of products.
-            selected.append(self.productList.GetItemText(productIndex))
+            selected.append(self.productList.getProduct(productIndex))
 
             # Find the next selected index.
             productIndex = self.productList.GetNextSelected(productIndex)
@@ -326,11 +332,16 @@ class OpenDialog(wx.Dialog):
 
     def readAddData(self, path):
         """
+        Read the products of a mass add file one row at a time.
+
+        Args:
+          path (str): The location of the file.
+
+        Yields:
+          dict of {str: str}: The data of each product.
         """
 
-        # Open the file and save it in the data variable.
-        newData = []
-        newProducts = []
+        # Open the file and yield each row as it is read.
         with open(path) as csvFile:
             reader = csv.reader(csvFile, delimiter=',', quotechar='|')
             for row in reader:
@@ -342,13 +353,9 @@ class OpenDialog(wx.Dialog):
                     for i in range(rowLength, 6):
                         row.append("")
 
-                # Append the data and product list with the input data.
-                newData.append({"product": row[0], "sku": row[1],
-                    "account": row[2], "class": row[3], "category": row[4],
-                    "subcategory": row[5]})
-                newProducts.append(row[0])
-
-        return newData, newProducts
+                yield {"product": row[0], "sku": row[1], "account": row[2],
+                    "class": row[3], "category": row[4],
+                    "subcategory": row[5]}
 
     def siftForecast(self, forecast):
         """
@@ -390,8 +397,8 @@ class OpenDialog(wx.Dialog):
         self.sieve["category"] = self.inputs[3].GetStringSelection()
         #self.sieve["subcategory"] = self.inputs[4].GetStringSelection()
 
-        # Get all of the products from the database.
-        data = isql.getData(self.sieve, self.connection)
+        # Get the products satisfying the sieve from the index.
+        data = self.index.search(self.sieve)
 
         # Set the title of the frame.
         self.SetTitle("Open/Manage: " + str(len(data)) + " Products")
@@ -400,18 +407,19 @@ class OpenDialog(wx.Dialog):
         self.editButton.SetBackgroundColour(wx.NullColour)
         self.deleteButton.SetBackgroundColour(wx.NullColour)
 
-        # Remove all items from the list control and reset the index.
-        self.productList.DeleteAllItems()
-        index = 0
+        # Give the data to the list control.
+        self.productList.setData(data)
 
-        # Add the items to the list control.
-        for product in data:
-            self.productList.InsertStringItem(index, product[0])
-            self.productList.SetStringItem(index, 1, product[2])
-            self.productList.SetStringItem(index, 2, product[3])
-            self.productList.SetStringItem(index, 3, product[4])
-            #self.productList.SetStringItem(index, 4, product[5])
-            index += 1
+    def onText(self, event):
+        """
+        Search once typing pauses rather than on every keystroke.
+        """
+
+        # Restart the delay if a search is already waiting.
+        if self.delay is not None and self.delay.IsRunning():
+            self.delay.Restart(DELAY)
+        else:
+            self.delay = wx.CallLater(DELAY, self.updateList, None)
 
     def onSelected(self, event):
         """
@@ -432,9 +440,13 @@ class OpenDialog(wx.Dialog):
         """
         """
 
-        # Iterate through the items in the list selecting each.
-        for i in range(0, self.productList.GetItemCount()):
-            self.productList.Select(i)
+        # Select every item in the list at once.
+        self.productList.SetItemState(-1, wx.LIST_STATE_SELECTED,
+            wx.LIST_STATE_SELECTED)
+
+        # Update the buttons, which a single selection of every item may not
+        # send an event for.
+        self.onSelected(None)
 
     def onMouseOverAdd(self, event):
         """
@@ -508,8 +520,9 @@ class OpenDialog(wx.Dialog):
         # Destroy the dialog box.
         addDialog.Destroy()
 
-        # Add the inputted product data to the database.
+        # Add the inputted product data to the database and index.
         isql.addProduct(addProductData, self.connection)
+        self.index.add(addProductData)
 
         # Update the list.
         self.updateList(None)
@@ -528,14 +541,15 @@ class OpenDialog(wx.Dialog):
         if openFileDialog.ShowModal() != wx.ID_OK:
             return
 
-        # Read the data from the file.
-        (data, newProducts) = self.readAddData(openFileDialog.GetPath())
+        # Stream the data from the file.
+        data = self.readAddData(openFileDialog.GetPath())
 
         # Destroy the dialog box
         openFileDialog.Destroy()
 
-        # Add the products to the database.
-        isql.addProducts(newProducts, data, overwrite, self.connection)
+        # Add the products to the database in bulk and reload the index.
+        isql.addProducts(data, overwrite, self.connection)
+        self.index.load(self.connection)
 
         # Update the list.
         self.updateList(None)
@@ -565,7 +579,7 @@ class OpenDialog(wx.Dialog):
         productIndex = self.productList.GetFirstSelected()
 
         # Get the string value of the old product.
-        product = self.productList.GetItemText(productIndex)
+        product = self.productList.getProduct(productIndex)
 
         # Extract the attributes from the database.
         oldProductData = isql.getProduct(product, self.connection)
@@ -603,8 +617,9 @@ class OpenDialog(wx.Dialog):
         if len(newProductData) == 0:
             return
 
-        # Add the inputted product data to the database.
+        # Add the inputted product data to the database and index.
         isql.setProduct(oldProductData[0], newProductData, self.connection)
+        self.index.set(oldProductData[0], newProductData)
 
         # Update the list.
         self.updateList(None)
@@ -641,11 +656,15 @@ class OpenDialog(wx.Dialog):
         products = []
         productIndex = self.productList.GetFirstSelected()
         for index in range(0, count):
-            products.append(self.productList.GetItemText(productIndex))
+            products.append(self.productList.getProduct(productIndex))
             productIndex = self.productList.GetNextSelected(productIndex)
 
-        # Update the values input in the database.
-        isql.setProducts(products, newProductData, self.connection)
+        # Update the values input in the database and index.
+        if isql.setProducts(products, newProductData, self.connection) > 0:
+            changed = dict([(key, value) for (key, value) in\
+                newProductData.items() if value != ''])
+            for product in products:
+                self.index.set(product, changed)
 
         # Update the list.
         self.updateList(None)
@@ -699,10 +718,11 @@ class OpenDialog(wx.Dialog):
         index = 1
         while keepGoing and index <= count:
             # Get the product text.
-            product = self.productList.GetItemText(productIndex)
+            product = self.productList.getProduct(productIndex)
 
             # Remove the selected item.
             isql.removeProduct(product, self.connection)
+            self.index.remove(product)
 
             # Get the next selected item index.
             productIndex = self.productList.GetNextSelected(productIndex)
@@ -732,8 +752,7 @@ class OpenDialog(wx.Dialog):
         products = self.getSelection()
 
         # Get the preferences for reporting.
-        pref = pickle.load(open(os.path.join(idata.DATA, "Forsteri",
-            "pref.p"), "rb"))
+        pref = idata.getPreferences()
 
         # Get the method type.
         method = pref["report_type"].lower()
@@ -743,11 +762,16 @@ class OpenDialog(wx.Dialog):
         # Open a connection to the data database.
         dataConnection = sqlite3.connect(idata.MASTER)
 
-        # Iterate over the products selected.
+        # Iterate over the products selected, finding the bounds of the
+        # prediction interval of the method used for each.
         data = {}
+        bounds = {}
         for product in products:
             data[product] = idata.getForecast(product, method,
                 connection=dataConnection)
+            used = method or idata.getSelection(product, dataConnection)
+            bounds[product] = idata.toBounds(data[product],
+                idata.getIntervals(product, dataConnection).get(used, {}))
 
         # Create the file dialog box.
         fileDialog = wx.FileDialog(self, "Save file as", "", "",
@@ -763,14 +787,23 @@ class OpenDialog(wx.Dialog):
         # Write the data to a file.
         with open(loc, 'w') as csvfile:
             writer = csv.writer(csvfile, delimiter=',', quotechar='|')
-            writer.writerow(["Product", "January", "February", "March",
-                "April", "May", "June", "July", "August", "September",
-                "October", "November", "December"])
+            months = ["January", "February", "March", "April", "May", "June",
+                "July", "August", "September", "October", "November",
+                "December"]
+            writer.writerow(["Product"] + months + [x + " Lower" for x in\
+                months] + [x + " Upper" for x in months])
             for product in products:
                 temp = [product]
                 temp.extend(self.siftForecast(data[product]))
+                for side in [0, 1]:
+                    temp.extend(self.siftForecast(dict([(date, value[side])\
+                        for (date, value) in bounds[product].items()])))
                 writer.writerow(temp)
 
+        # Stop any waiting search.
+        if self.delay is not None:
+            self.delay.Stop()
+
         # Close the database connections.
         self.connection.close()
         dataConnection.close()
@@ -782,8 +815,14 @@ class OpenDialog(wx.Dialog):
         """
         """
 
+        # Stop any waiting search.
+        if self.delay is not None:
+            self.delay.Stop()
+
         # Commit the changes to the database.
         self.connection.commit()
+        cache.invalidate()
+        self.refreshHierarchy()
 
         # Close the database.
         self.connection.close()
@@ -797,17 +836,187 @@ class OpenDialog(wx.Dialog):
 
         # Commit the changes to the database.
         self.connection.commit()
+        cache.invalidate()
+        self.refreshHierarchy()
+
+    def refreshHierarchy(self):
+        """
+        Rebuild the hierarchy totals of the products the committed edits
+        added, removed, or moved between titles.
+        """
+
+        classification = isql.getClassification(connection=self.connection)
+        isql.refreshHierarchy(self.classification, classification)
+        self.classification = classification
 
     def onCancel(self, event):
         """
         """
 
+        # Stop any waiting search.
+        if self.delay is not None:
+            self.delay.Stop()
+
         # Close the database.
         self.connection.close()
 
         # End the modal and return the cancel id.
         self.EndModal(wx.ID_CANCEL)
 
+"""
+Product List Control Class
+"""
+class ProductListCtrl(wx.ListCtrl):
+    """
+    A virtual list control of products. The attributes are held in a column
+    store and only the rows on screen are asked for, so showing the whole
+    catalogue costs the same as showing a single product. Clicking a header
+    sorts by that column, clicking it again reverses the order.
+
+    Extends:
+      wx.ListCtrl
+    """
+
+    def __init__(self, *args, **kwargs):
+        """
+        Initialize the product list control.
+
+        Args:
+          *args (tuple of object): Any arguments to be passed directly to the
+            super's constructor.
+          **kwargs (dictionary of name: object): Any keyword arguments to be
+            passed to the super's constructor.
+
+        Returns:
+          ProductListCtrl
+        """
+
+        # Initialize by the parent's constructor.
+        super(ProductListCtrl, self).__init__(*args,
+            style=wx.LC_REPORT|wx.LC_VIRTUAL|wx.LC_HRULES|wx.LC_VRULES|\
+            wx.BORDER_SUNKEN, **kwargs)
+
+        # The index of each shown attribute in a row of product data.
+        self.fields = [0, 2, 3, 4]
+
+        # Add columns to the list control.
+        self.InsertColumn(0, "Product", width=136)
+        self.InsertColumn(1, "Account", width=136)
+        self.InsertColumn(2, "Class", width=136)
+        self.InsertColumn(3, "Category", width=136)
+
+        # Create the empty column store and the order rows are shown in.
+        self.columns = [[] for field in self.fields]
+        self.order = []
+
+        # The column sorted by and its direction, none to keep the given order.
+        self.sortColumn = None
+        self.ascending = True
+
+        # Bind clicking a header to a function.
+        self.Bind(wx.EVT_LIST_COL_CLICK, self.onColumnClick)
+
+    """
+    Manipulate Functions
+    """
+    def setData(self, data):
+        """
+        Replace the products shown.
+
+        Args:
+          data (list of list of str): The data of each product in the order
+            of the information table.
+
+        Returns:
+          bool: True if successful, false otherwise.
+        """
+
+        # Clear the selection since the rows will change.
+        index = self.GetFirstSelected()
+        while index != -1:
+            self.Select(index, False)
+            index = self.GetNextSelected(index)
+
+        # Split the data into columns.
+        self.columns = [[row[field] for row in data] for field in self.fields]
+        self.order = list(range(0, len(data)))
+
+        # Keep the current sort.
+        if self.sortColumn is not None:
+            self.sortOrder()
+
+        # Set the number of rows and redraw the visible ones.
+        self.SetItemCount(len(data))
+        self.Refresh()
+
+        return True
+
+    def getProduct(self, index):
+        """
+        Get the product shown in a row.
+
+        Args:
+          index (int): The index of the row.
+
+        Returns:
+          str: The product.
+        """
+
+        return self.columns[0][self.order[index]]
+
+    """
+    Helper Functions
+    """
+    def sortOrder(self):
+        """
+        Sort the order of rows by the sort column.
+        """
+
+        column = self.columns[self.sortColumn]
+        self.order.sort(key=lambda x: column[x].lower(),
+            reverse=not self.ascending)
+
+    """
+    Event Handler Functions
+    """
+    def OnGetItemText(self, item, col):
+        """
+        Get the text of a cell when it is drawn.
+        """
+
+        return self.columns[col][self.order[item]]
+
+    def onColumnClick(self, event):
+        """
+        Sort by the clicked column, reversing if it is already sorted by.
+        """
+
+        # Find the new sort column and direction.
+        column = event.GetColumn()
+        if column == self.sortColumn:
+            self.ascending = not self.ascending
+        else:
+            (self.sortColumn, self.ascending) = (column, True)
+
+        # Remember the selected products so they stay selected.
+        selected = set()
+        index = self.GetFirstSelected()
+        while index != -1:
+            selected.add(self.order[index])
+            self.Select(index, False)
+            index = self.GetNextSelected(index)
+
+        # Sort the rows.
+        self.sortOrder()
+
+        # Select the same products in their new rows.
+        for (index, row) in enumerate(self.order):
+            if row in selected:
+                self.Select(index)
+
+        # Redraw the visible rows.
+        self.Refresh()
+
 """
 Input Dialog Box Class
 """
@@ -27,8 +27,6 @@ THE SOFTWARE.
 """
 Import Declarations
 """
-import os
-import pickle
 import wx
 
 from forsteri.interface import data as idata
@@ -73,7 +71,7 @@ class PreferencesFrame(wx.Frame):
         row1Label = wx.StaticText(masterPanel, label="Forecast Type")
 
         # Create the list of choices for the first row.
-        choice1 = ["Auto", "MLR", "EMA", "Naive"]
+        choice1 = ["Auto", "MLR", "EMA", "HW", "Naive", "Reconciled"]
 
         # Create the object for the first row.
         self.row1Obj = wx.ComboBox(masterPanel, size=(150, -1),
@@ -86,7 +84,50 @@ class PreferencesFrame(wx.Frame):
         # Add all rows to the report sizer.
         reportSizer.Add(row1Sizer, flag=wx.ALL, border=5)
 
-        # 
+        ## Models
+        # Create the models static box.
+        modelSB = wx.StaticBox(masterPanel, label="Models")
+
+        # Create the models sizer.
+        modelSizer = wx.StaticBoxSizer(modelSB, wx.VERTICAL)
+
+        # Create the second rows sizer.
+        row2Sizer = wx.BoxSizer(wx.HORIZONTAL)
+
+        # Create the label for the second row.
+        row2Label = wx.StaticText(masterPanel, label="Reconciliation")
+
+        # Create the list of choices for the second row.
+        choice2 = ["None", "Bottom Up", "Top Down", "Least Squares"]
+
+        # Create the object for the second row.
+        self.row2Obj = wx.ComboBox(masterPanel, size=(150, -1),
+            choices=choice2, style=wx.CB_READONLY)
+
+        # Add the contents to the row 2 sizer.
+        row2Sizer.Add(row2Label, flag=wx.ALIGN_CENTER|wx.RIGHT, border=5)
+        row2Sizer.Add(self.row2Obj, flag=wx.ALIGN_CENTER)
+
+        # Create the third rows sizer.
+        row3Sizer = wx.BoxSizer(wx.HORIZONTAL)
+
+        # Create the label for the third row.
+        row3Label = wx.StaticText(masterPanel, label="Prediction Interval")
+
+        # Create the list of choices for the third row.
+        choice3 = ["80%", "90%", "95%"]
+
+        # Create the object for the third row.
+        self.row3Obj = wx.ComboBox(masterPanel, size=(150, -1),
+            choices=choice3, style=wx.CB_READONLY)
+
+        # Add the contents to the row 3 sizer.
+        row3Sizer.Add(row3Label, flag=wx.ALIGN_CENTER|wx.RIGHT, border=5)
+        row3Sizer.Add(self.row3Obj, flag=wx.ALIGN_CENTER)
+
+        # Add all rows to the model sizer.
+        modelSizer.Add(row2Sizer, flag=wx.ALL, border=5)
+        modelSizer.Add(row3Sizer, flag=wx.ALL, border=5)
 
 
         ## Finish Buttons
@@ -110,6 +151,7 @@ class PreferencesFrame(wx.Frame):
         ## Panel Operations
         # Add everything to the master sizer.
         masterSizer.Add(reportSizer, flag=wx.ALL, border=5)
+        masterSizer.Add(modelSizer, flag=wx.ALL, border=5)
         masterSizer.AddSpacer(9)
         masterSizer.Add(wx.StaticLine(masterPanel, size=(585, 2)),
             flag=wx.ALIGN_CENTER)
@@ -139,12 +181,13 @@ class PreferencesFrame(wx.Frame):
         """
         """
 
-        # Load the preferences from the pickle file.
-        pref = pickle.load(open(os.path.join(idata.DATA, "Forsteri",
-            "pref.p"), "rb"))
+        # Load the preferences.
+        pref = idata.getPreferences()
 
         # Set all of the prefernce objects.
         self.row1Obj.SetValue(pref["report_type"])
+        self.row2Obj.SetValue(pref.get("reconcile", "None"))
+        self.row3Obj.SetValue(pref.get("interval", "80%"))
 
         return True
 
@@ -157,10 +200,11 @@ class PreferencesFrame(wx.Frame):
 
         # Get all of the preference objects data.
         pref["report_type"] = self.row1Obj.GetValue()
+        pref["reconcile"] = self.row2Obj.GetValue()
+        pref["interval"] = self.row3Obj.GetValue()
 
-        # Save the preferences into the pickle file.
-        pickle.dump(pref, open(os.path.join(idata.DATA, "Forsteri",
-            "pref.p"), "wb"))
+        # Save the preferences.
+        idata.setPreferences(pref)
 
         return True
 
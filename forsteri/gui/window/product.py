@@ -26,15 +26,33 @@ THE SOFTWARE.
 
 # Import python modules.
 import datetime as dt
-import numpy as np
+import sqlite3
+import threading as td
 import wx
 
-# Import forsteri modules.
-from forsteri.gui.window import data_viewer as dv
+# Import forsteri modules. The data viewer and models, which need numpy, are
+# imported when first used to keep start up quick.
+from forsteri.interface import cache
 from forsteri.interface import data as idata
 from forsteri.interface import sql as isql
-from forsteri.process import model as pm
 
+"""
+Constant Declarations
+"""
+# The forecast methods kept in a product view.
+METHODS = ["mlr", "ema", "arma", "aux", "hw", "naive", "reconciled"]
+
+# The most related, similar, and linked products read ahead after a product
+# is shown.
+PREFETCH = 20
+
+# The sections of a product view in the order they are shown.
+SECTIONS = ["information", "variables", "related", "similar", "linked",
+    "history", "selection", "interval", "forecast"]
+
+"""
+Panel Class
+"""
 class ProductPanel(wx.Panel):
     """
     """
@@ -50,8 +68,20 @@ class ProductPanel(wx.Panel):
         # Create the product variable.
         self.product = None
 
-        # Create the model type variable.
-        self.modelType = "mlr"
+        # Create the model type variable, auto for the method selected for
+        # the product.
+        self.modelType = "auto"
+
+        # Create the generation of the latest product load.
+        self.generation = 0
+
+        # Create the forecasts of every method for the shown product.
+        self.forecasts = None
+
+        # Create the method selected and the intervals of every method for
+        # the shown product.
+        self.selected = None
+        self.intervals = {}
 
         # Create the master sizer.
         masterSizer = wx.BoxSizer(wx.VERTICAL)
@@ -127,6 +157,22 @@ class ProductPanel(wx.Panel):
         # Add the list box to the sizer.
         relatedSizer.Add(self.relatedList, flag=wx.ALL, border=5)
 
+        ## Similar Items
+        # Create the similar items static box.
+        similarSB = wx.StaticBox(self, label="Similar Items")
+
+        # Create the similar items sizer.
+        similarSizer = wx.StaticBoxSizer(similarSB, wx.VERTICAL)
+
+        # Create the list box.
+        self.similarList = wx.ListBox(self, size=(150, 150))
+
+        # Bind actions to functions.
+        self.similarList.Bind(wx.EVT_LEFT_DCLICK, self.onSimilar)
+
+        # Add the list box to the sizer.
+        similarSizer.Add(self.similarList, flag=wx.ALL, border=5)
+
         ## Linked Items
         # Create the related items static box.
         linkedSB = wx.StaticBox(self, label="Linked Items")
@@ -145,7 +191,8 @@ class ProductPanel(wx.Panel):
         productSizer.Add(infoSizer, pos=(0, 0), flag=wx.LEFT|wx.TOP, border=5)
         productSizer.Add(variablesSizer, pos=(0, 1), flag=wx.TOP, border=5)
         productSizer.Add(relatedSizer, pos=(0, 2), flag=wx.TOP, border=5)
-        productSizer.Add(linkedSizer, pos=(0, 3),
+        productSizer.Add(similarSizer, pos=(0, 3), flag=wx.TOP, border=5)
+        productSizer.Add(linkedSizer, pos=(0, 4),
             flag=wx.TOP|wx.RIGHT|wx.BOTTOM, border=5)
 
         # Make the first column growable.
@@ -165,30 +212,46 @@ class ProductPanel(wx.Panel):
         forecastText.SetFont(infoFont)
 
         # Create the radio buttons.
-        buttonOne = wx.RadioButton(self, label="MLR", style=wx.RB_GROUP)
+        self.autoButton = wx.RadioButton(self, label="Auto", style=wx.RB_GROUP)
+        buttonOne = wx.RadioButton(self, label="MLR")
         buttonTwo = wx.RadioButton(self, label="EMA")
         buttonThree = wx.RadioButton(self, label="Naive")
+        buttonFour = wx.RadioButton(self, label="HW")
+        buttonFive = wx.RadioButton(self, label="Reconciled")
 
         # Bind the buttons to functions.
+        self.autoButton.Bind(wx.EVT_RADIOBUTTON, lambda event:
+            self.onRadioButton(event, "auto"))
         buttonOne.Bind(wx.EVT_RADIOBUTTON, lambda event:
             self.onRadioButton(event, "mlr"))
         buttonTwo.Bind(wx.EVT_RADIOBUTTON, lambda event:
             self.onRadioButton(event, "ema"))
         buttonThree.Bind(wx.EVT_RADIOBUTTON, lambda event:
             self.onRadioButton(event, "naive"))
+        buttonFour.Bind(wx.EVT_RADIOBUTTON, lambda event:
+            self.onRadioButton(event, "hw"))
+        buttonFive.Bind(wx.EVT_RADIOBUTTON, lambda event:
+            self.onRadioButton(event, "reconciled"))
 
         # Add the items to the type sizer.
         typeSizer.Add(forecastText, flag=wx.LEFT|wx.TOP|wx.ALIGN_LEFT,
             border=5)
         typeSizer.AddSpacer(25)
+        typeSizer.Add(self.autoButton, flag=wx.TOP, border=5)
+        typeSizer.AddSpacer(15)
         typeSizer.Add(buttonOne, flag=wx.TOP, border=5)
         typeSizer.AddSpacer(15)
         typeSizer.Add(buttonTwo, flag=wx.TOP, border=5)
         typeSizer.AddSpacer(15)
         typeSizer.Add(buttonThree, flag=wx.TOP, border=5)
+        typeSizer.AddSpacer(15)
+        typeSizer.Add(buttonFour, flag=wx.TOP, border=5)
+        typeSizer.AddSpacer(15)
+        typeSizer.Add(buttonFive, flag=wx.TOP, border=5)
 
-        # Create the forecast list control.
-        self.forecastList = wx.ListCtrl(self, size=(-1, 60),
+        # Create the forecast list control, the second row holding the
+        # prediction interval.
+        self.forecastList = wx.ListCtrl(self, size=(-1, 80),
             style=wx.LC_REPORT|wx.LC_HRULES|wx.LC_VRULES|wx.BORDER_SUNKEN)
 
         # Add columns to the list control.
@@ -258,14 +321,99 @@ class ProductPanel(wx.Panel):
 
     def setProduct(self, product):
         """
+        Show a product. A cached view is shown at once, otherwise the product
+        is read by a worker thread and each section is shown as it arrives, so
+        the panel never waits on the database. Setting another product cancels
+        a load in progress. The related, similar, and linked products are then
+        read ahead into the cache.
+
+        Args:
+          product (str): The name of the product.
+
+        Returns:
+          bool: True if successful, false otherwise.
         """
 
-        ## Product Information
         # Set the variable to be the updated product.
         self.product = product
 
-        # Get the data for the product from the database.
-        data = isql.getProduct(product)
+        # Start a new generation so older loads are ignored and stop early.
+        self.generation += 1
+        generation = self.generation
+        current = lambda: generation == self.generation
+
+        # Show a cached view at once and read ahead its neighbours.
+        view = cache.VIEWS.get(product)
+        if view is not None:
+            for name in SECTIONS:
+                self.showSection(generation, name, view[name])
+            worker = td.Thread(target=prefetchProducts,
+                args=(view["related"] + view["similar"] + view["linked"],
+                current))
+            worker.daemon = True
+            worker.start()
+
+            return True
+
+        # Show the name while the rest loads.
+        self.nameText.SetLabel(product)
+        for text in [self.accountText, self.classText, self.categoryText]:
+            text.SetLabel('')
+        self.variablesList.DeleteAllItems()
+        self.relatedList.SetItems([])
+        self.similarList.SetItems([])
+        self.linkedList.SetItems([])
+        self.historyList.DeleteAllItems()
+        self.forecastList.DeleteAllItems()
+        self.forecasts = None
+        self.selected = None
+        self.intervals = {}
+
+        # Load the product then read ahead its neighbours in a worker thread.
+        worker = td.Thread(target=loadAndPrefetch, args=(product,
+            lambda name, value: wx.CallAfter(self.showSection, generation,
+            name, value), current))
+        worker.daemon = True
+        worker.start()
+
+        return True
+
+    def getProduct(self):
+        """
+        """
+
+        return self.product
+
+    """
+    Show Functions
+    """
+    def showSection(self, generation, name, value):
+        """
+        Show a section of a product posted by the worker, unless a newer
+        product has been set since.
+        """
+
+        # Ignore sections from an older load.
+        if generation != self.generation:
+            return
+
+        # Show the section.
+        {"information": self.showInformation,
+            "variables": self.showVariables,
+            "related": self.relatedList.SetItems,
+            "similar": self.similarList.SetItems,
+            "linked": self.linkedList.SetItems,
+            "history": self.showHistory,
+            "selection": self.showSelection,
+            "interval": self.showIntervals,
+            "forecast": self.showForecasts}[name](value)
+
+        # Relayout the panel.
+        self.Layout()
+
+    def showInformation(self, data):
+        """
+        """
 
         # Set the labels for the static texts.
         self.nameText.SetLabel(data[0])
@@ -274,89 +422,47 @@ class ProductPanel(wx.Panel):
         self.categoryText.SetLabel(data[4])
         #self.subcategoryText.SetLabel(data[5])
 
-        ## Product Variables
-        # Get the variables.
-        variables = idata.hasVariables(data[0], convert=True)
-
-        # Remove nonvariables.
-        variables = [x for x in variables if x[-8:] == " Monthly"]
-        try:
-            variables.remove("Forecast")
-        except ValueError:
-            pass
-
-        # Get the latest data dates.
-        latest = idata.latestData(data[0], variables, convert=True)
-
-        # Get the number of observations.
-        count = idata.obsCount(data[0], variables, convert=True)
+    def showVariables(self, summary):
+        """
+        """
 
         # Remove all items from the variables list.
         self.variablesList.DeleteAllItems()
 
         # Add the new items to the variables list.
         index = 0
-        for variable in variables:
+        for (variable, latest, count) in summary:
             self.variablesList.InsertStringItem(index,
-                variable[0 : len(variable) - 8])
-            self.variablesList.SetStringItem(index, 1, latest[index])
-            self.variablesList.SetStringItem(index, 2, str(count[index]))
+                idata.fromSQLName(variable)[:-8])
+            self.variablesList.SetStringItem(index, 1, latest)
+            self.variablesList.SetStringItem(index, 2, str(count))
             index += 1
 
-        ## Related Products
-        # Get the related products.
-        related = isql.getData({"class": data[3], "category": data[4],
-            "subcategory": data[5]})
-
-        # Extract only the names of the related products.
-        related = [x[0] for x in related]
-
-        # Remove itself from the related list.
-        related.remove(data[0])
-
-        # Set the items for the related list.
-        self.relatedList.SetItems(related)
-
-        ## Linked Products
-        # Get the linked products.
-        linked = isql.getLinksTo(product)
-
-        # Set the items for the linked list.
-        self.linkedList.SetItems(linked)
-
-        ## History
-        # Get the historical values.
-        history = idata.getData(product, "finished_goods_monthly")
+    def showHistory(self, history):
+        """
+        """
 
-        # Remove all items from the forecast and history list.
-        self.forecastList.DeleteAllItems()
+        # Remove all items from the history list.
         self.historyList.DeleteAllItems()
 
-        # Convert the data into overlapped form.
-        try:
-            historyOverlap = pm.overlap(history)
-        except IndexError:
-            historyOverlap = []
+        # If there is no history, show an error.
+        if history is None:
             hError = wx.MessageDialog(self, "Historical data not available.",
                 style=wx.ICON_ERROR)
             hError.ShowModal()
 
-            self.Layout()
             return
 
-        # Determine the years in the data.
-        start = int(history[0][0][0 : 4])
-        end = int(history[-1][0][0 : 4])
-        years = list(range(start, end + 1))
-
         # Iterate over the data and add it to the list control.
+        (years, historyOverlap) = history
         index1 = 0
         for row in historyOverlap:
             self.historyList.InsertStringItem(index1,
                 "{:d}".format(years[index1]))
             index2 = 1
             for col in row:
-                if np.isnan(col):
+                # A missing value is NaN, the only value unequal to itself.
+                if col != col:
                     self.historyList.SetStringItem(index1, index2, '')
                 else:
                     self.historyList.SetStringItem(index1, index2,
@@ -364,67 +470,87 @@ class ProductPanel(wx.Panel):
                 index2 += 1
             index1 += 1
 
-        ## Forecast
-        # Get the forecast values.
-        forecast = idata.getForecast(product, method=self.modelType)
+    def showSelection(self, method):
+        """
+        Show the method selected for the product on the auto button.
+        """
 
-        # Get todays date.
-        today = dt.date(1, 1, 1).today()
+        self.selected = method
 
-        # Add the row that will contain the forecasts.
-        self.forecastList.InsertStringItem(0, "")
+        if method is None:
+            self.autoButton.SetLabel("Auto")
+        else:
+            self.autoButton.SetLabel("Auto ({m})".format(m=method.upper()))
 
-        # Add each forecast for all months.
-        for month in range(1, 13):
-            if month > today.month:
-                year = today.year
-            else:
-                year = today.year + 1
-            try:
-                self.forecastList.SetStringItem(0, month - 1,
-                    "{:.0f}".format(forecast[dt.datetime(year, month, 1)]))
-            except KeyError:
-                continue
+    def showIntervals(self, intervals):
+        """
+        Keep the intervals of every method, shown with the forecast.
+        """
 
-        # Relayout the panel.
-        self.Layout()
+        self.intervals = intervals
 
-    def getProduct(self):
+    def showForecasts(self, forecasts):
         """
         """
 
-        return self.product
+        # Keep the forecasts of every method and show the chosen one.
+        self.forecasts = forecasts
+        self.showForecast(forecasts.get(self.modelType, {}))
 
-    def onRadioButton(self, event, modelType):
+    def showForecast(self, forecast):
         """
         """
 
-        # Set the model type for the class.
-        self.modelType = modelType
-
         # Remove the old values from the forecast list.
         self.forecastList.DeleteAllItems()
 
-        # Get the forecast values.
-        forecast = idata.getForecast(self.product, method=modelType)
-
         # Get todays date.
         today = dt.date(1, 1, 1).today()
 
         # Add the row that will contain the forecasts.
         self.forecastList.InsertStringItem(0, "")
 
+        # Find the interval of the method shown.
+        if self.modelType == "auto":
+            method = self.selected
+        else:
+            method = self.modelType
+        bounds = idata.toBounds(forecast, self.intervals.get(method, {}))
+        if len(bounds) > 0:
+            self.forecastList.InsertStringItem(1, "")
+
         # Add each forecast for all months.
         for month in range(1, 13):
             if month > today.month:
                 year = today.year
             else:
                 year = today.year + 1
+            date = dt.datetime(year, month, 1)
             try:
                 self.forecastList.SetStringItem(0, month - 1,
-                    "{:.0f}".format(forecast[dt.datetime(year, month, 1)]))
+                    "{:.0f}".format(forecast[date]))
             except KeyError:
                 continue
+            if date in bounds:
+                self.forecastList.SetStringItem(1, month - 1,
+                    "{:.0f} - {:.0f}".format(*bounds[date]))
+
+    """
+    Event Handler Functions
+    """
+    def onRadioButton(self, event, modelType):
+        """
+        """
+
+        # Set the model type for the class.
+        self.modelType = modelType
+
+        # Show the forecast values, read if they are not already held.
+        if self.forecasts is not None and modelType in self.forecasts:
+            self.showForecast(self.forecasts[modelType])
+        else:
+            self.showForecast(idata.getForecast(self.product,
+                method=None if modelType == "auto" else modelType))
 
         # Relayout the panel.
         self.Layout()
@@ -438,6 +564,7 @@ class ProductPanel(wx.Panel):
             GetFirstSelected())
 
         # Create the data viewer for the variable.
+        from forsteri.gui.window import data_viewer as dv
         dv.DataViewer(self.nameText.GetLabel(), variable + "_monthly", self)
 
     def onRelated(self, event):
@@ -447,3 +574,170 @@ class ProductPanel(wx.Panel):
         # Set the product to be the selected.
         self.setProduct(self.relatedList.GetString(self.relatedList.\
             GetSelection()))
+
+    def onSimilar(self, event):
+        """
+        """
+
+        # Set the product to be the selected.
+        self.setProduct(self.similarList.GetString(self.similarList.\
+            GetSelection()))
+
+"""
+Helper Functions
+"""
+def loadProduct(product, post=None, current=None):
+    """
+    Read everything shown for a product into a view, posting each section as
+    soon as it is read, and add the view to the cache. Run in a worker thread
+    with its own database connections.
+
+    Args:
+      product (str): The name of the product.
+      post (function, optional): Called with the name and value of each
+        section.
+      current (function, optional): Returns false once the load has been
+        replaced by a newer one, which stops the load.
+
+    Returns:
+      dict: The view of the product, None if the load was stopped.
+    """
+
+    # Post and check nothing if not asked to.
+    if post is None:
+        post = lambda name, value: None
+    if current is None:
+        current = lambda: True
+
+    from forsteri.process import model as pm
+    from forsteri.process import similar as ps
+
+    # Note the cache version so a write during the load is not cached over.
+    version = cache.VIEWS.version
+
+    # Open connections to both databases.
+    masterConnection = sqlite3.connect(isql.MASTER)
+    dataConnection = sqlite3.connect(idata.MASTER)
+
+    view = {}
+    try:
+        # Get the data for the product.
+        data = isql.getProduct(product, masterConnection)
+        if data is None or not current():
+            return None
+        view["information"] = data
+        post("information", data)
+
+        # Get the latest date and count of the monthly variables at once.
+        variables = [x for x in idata.getVariables(dataConnection) if\
+            x[-8:] == "_monthly"]
+        view["variables"] = idata.getVariableSummary(product, variables,
+            dataConnection)
+        if not current():
+            return None
+        post("variables", view["variables"])
+
+        # Get the related products, removing itself.
+        view["related"] = [x[0] for x in isql.getData({"class": data[3],
+            "category": data[4], "subcategory": data[5]}, masterConnection)\
+            if x[0] != data[0]]
+        if not current():
+            return None
+        post("related", view["related"])
+
+        # Get the products with the most similar demand.
+        view["similar"] = ps.findSimilar(product, connection=dataConnection)
+        if not current():
+            return None
+        post("similar", view["similar"])
+
+        # Get the linked products.
+        view["linked"] = isql.getLinksTo(product, masterConnection)
+        if not current():
+            return None
+        post("linked", view["linked"])
+
+        # Get the historical values in overlapped form.
+        history = idata.getData(product, "finished_goods_monthly",
+            dataConnection)
+        try:
+            historyOverlap = pm.overlap(history)
+            years = list(range(int(history[0][0][0 : 4]),
+                int(history[-1][0][0 : 4]) + 1))
+            view["history"] = (years, historyOverlap)
+        except IndexError:
+            view["history"] = None
+        if not current():
+            return None
+        post("history", view["history"])
+
+        # Get the method selected for the product.
+        view["selection"] = idata.getSelection(product, dataConnection)
+        if not current():
+            return None
+        post("selection", view["selection"])
+
+        # Get the prediction intervals of every method.
+        view["interval"] = idata.getIntervals(product, dataConnection)
+        if not current():
+            return None
+        post("interval", view["interval"])
+
+        # Get the forecast values of every method, and of the selected method
+        # as auto.
+        view["forecast"] = idata.getForecasts(product, METHODS,
+            dataConnection)
+        view["forecast"]["auto"] = idata.getForecast(product,
+            connection=dataConnection)
+        if not current():
+            return None
+        post("forecast", view["forecast"])
+    finally:
+        # Close the connections.
+        masterConnection.close()
+        dataConnection.close()
+
+    # Add the view to the cache.
+    cache.VIEWS.put(product, view, version)
+
+    return view
+
+def prefetchProducts(products, current):
+    """
+    Read the views of products that are not cached yet into the cache,
+    stopping when a newer product is set.
+
+    Args:
+      products (list of str): The products to read ahead.
+      current (function): Returns false once a newer product is set.
+
+    Returns:
+      int: The number of views read.
+    """
+
+    count = 0
+    for product in products[0 : PREFETCH]:
+        if not current():
+            break
+        if cache.VIEWS.has(product):
+            continue
+        # Leave a product that cannot be read now, such as while a job holds
+        # the database, to be read when it is shown.
+        try:
+            if loadProduct(product, current=current) is not None:
+                count += 1
+        except (sqlite3.Error, ValueError):
+            continue
+
+    return count
+
+def loadAndPrefetch(product, post, current):
+    """
+    Load a product for showing, then read ahead its related, similar, and
+    linked products.
+    """
+
+    view = loadProduct(product, post, current)
+    if view is not None:
+        prefetchProducts(view["related"] + view["similar"] + view["linked"],
+            current)
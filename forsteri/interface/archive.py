@@ -0,0 +1,273 @@
+"""
+Compressed Archive of Imported Files
+
+Copyright (c) 2014, 2015 Andrew Hawkins
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+"""
+Import Declarations
+"""
+import csv
+import json
+import os
+import re
+import struct
+import zlib
+
+from forsteri.interface import sql as isql
+
+"""
+Constant Declarations
+"""
+# The directory holding the archives.
+ARCHIVE = os.path.join(isql.DATA, "imported")
+
+# The first bytes of every archive.
+MAGIC = b"FCA2"
+
+# The number of rows stored in each compressed block.
+BLOCK = 10000
+
+"""
+Writing
+"""
+def writeArchive(importID, data, block=BLOCK):
+    """
+    Write the decomposed data of an import to a compressed columnar archive.
+    The rows are split into blocks and each column of a block is compressed
+    on its own, so readers can stream a block at a time and only decompress
+    the columns they need. Each column holds the length of every value
+    followed by the values, so a value may hold any bytes.
+
+    Args:
+      importID (int): The id of the import.
+      data (list of list of object): The decomposed data including the
+        header.
+      block (int, optional): The number of rows in each block.
+
+    Returns:
+      str: The location of the archive.
+    """
+
+    # Determine the header and number of columns.
+    header = [str(x) for x in data[0]]
+    cols = len(header)
+
+    # Create the archive header.
+    info = toBytes(json.dumps({"import_id": importID, "columns": header,
+        "rows": len(data) - 1, "block": block}))
+
+    # Write the archive.
+    location = archivePath(importID)
+    with open(location, "wb") as archiveFile:
+        archiveFile.write(MAGIC)
+        archiveFile.write(struct.pack(">I", len(info)))
+        archiveFile.write(info)
+
+        # Iterate over the blocks of rows.
+        for first in range(1, len(data), block):
+            rows = data[first : first + block]
+            archiveFile.write(struct.pack(">I", len(rows)))
+
+            # Compress and write each column of the block.
+            for j in range(0, cols):
+                column = zlib.compress(packColumn([toBytes(str(row[j])) for\
+                    row in rows]), 6)
+                archiveFile.write(struct.pack(">I", len(column)))
+                archiveFile.write(column)
+
+    return location
+
+def archiveLegacy(remove=False):
+    """
+    Convert the plain CSV copies written by earlier versions into archives.
+
+    Args:
+      remove (bool, optional): True if the CSV copies are deleted after
+        conversion, false otherwise.
+
+    Returns:
+      list of int: The ids of the imports that were converted.
+    """
+
+    # Find the legacy copies named <id>-<date of import>.csv.
+    converted = []
+    for name in sorted(os.listdir(ARCHIVE)):
+        found = re.match(r"^(\d+)-.*\.csv$", name)
+        if found is None:
+            continue
+        importID = int(found.group(1))
+        location = os.path.join(ARCHIVE, name)
+
+        # Read the copy and write the archive.
+        with open(location) as csvFile:
+            reader = csv.reader(csvFile, delimiter=',', quotechar='|')
+            data = [row for row in reader]
+        if len(data) == 0:
+            continue
+        writeArchive(importID, data)
+        converted.append(importID)
+
+        # Remove the copy if requested.
+        if remove:
+            os.remove(location)
+
+    return converted
+
+"""
+Reading
+"""
+def readHeader(importID):
+    """
+    Read the header information of an archive.
+
+    Args:
+      importID (int): The id of the import.
+
+    Returns:
+      dict: The import id, columns, number of rows, and block size.
+    """
+
+    with open(archivePath(importID), "rb") as archiveFile:
+        return readInfo(archiveFile)
+
+def readArchive(importID, columns=None):
+    """
+    Stream the rows of an archive back, one block at a time. The first row
+    yielded is the header.
+
+    Args:
+      importID (int): The id of the import.
+      columns (list of str, optional): The columns to read, all if None.
+
+    Returns:
+      generator of list of str: The header then each row.
+    """
+
+    with open(archivePath(importID), "rb") as archiveFile:
+        info = readInfo(archiveFile)
+
+        # Determine which columns to decompress.
+        if columns is None:
+            keep = list(range(0, len(info["columns"])))
+        else:
+            keep = [info["columns"].index(column) for column in columns]
+
+        yield [info["columns"][j] for j in keep]
+
+        # Iterate over the blocks.
+        size = archiveFile.read(4)
+        while len(size) == 4:
+            rows = struct.unpack(">I", size)[0]
+
+            # Read each column, skipping the ones not needed.
+            values = {}
+            for j in range(0, len(info["columns"])):
+                length = struct.unpack(">I", archiveFile.read(4))[0]
+                if j not in keep:
+                    archiveFile.seek(length, 1)
+                    continue
+                column = zlib.decompress(archiveFile.read(length))
+                values[j] = unpackColumn(column, rows)
+
+            # Yield the rows of the block.
+            for i in range(0, rows):
+                yield [toNative(values[j][i]) for j in keep]
+
+            size = archiveFile.read(4)
+
+def getArchives():
+    """
+    Get the ids of all imports that have an archive.
+
+    Returns:
+      list of int: The import ids in order.
+    """
+
+    if not os.path.isdir(ARCHIVE):
+        return []
+
+    return sorted([int(name[:-4]) for name in os.listdir(ARCHIVE) if\
+        re.match(r"^\d+\.fca$", name)])
+
+"""
+Helper Functions
+"""
+def archivePath(importID):
+    """
+    """
+
+    return os.path.join(ARCHIVE, str(importID) + ".fca")
+
+def readInfo(archiveFile):
+    """
+    Read the magic bytes and header information from an open archive.
+    """
+
+    magic = archiveFile.read(4)
+    if magic != MAGIC:
+        raise IOError("The file is not a Forsteri archive.")
+
+    length = struct.unpack(">I", archiveFile.read(4))[0]
+
+    return json.loads(toNative(archiveFile.read(length)))
+
+def packColumn(values):
+    """
+    Join the values of a column, each length first then every value.
+    """
+
+    return struct.pack(">" + str(len(values)) + "I", *[len(x) for x in\
+        values]) + b"".join(values)
+
+def unpackColumn(column, rows):
+    """
+    Split a column joined by packColumn back into its values.
+    """
+
+    lengths = struct.unpack(">" + str(rows) + "I", column[0 : 4 * rows])
+    values = []
+    start = 4 * rows
+    for length in lengths:
+        values.append(column[start : start + length])
+        start += length
+
+    return values
+
+def toBytes(text):
+    """
+    Encode text as UTF-8, leaving byte strings as they are.
+    """
+
+    if isinstance(text, bytes):
+        return text
+
+    return text.encode("utf-8")
+
+def toNative(value):
+    """
+    Convert bytes read from an archive to the native string type.
+    """
+
+    if str is bytes:
+        return value
+
+    return value.decode("utf-8")
@@ -0,0 +1,197 @@
+"""
+Product View Cache
+
+Copyright (c) 2014, 2015 Andrew Hawkins
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+"""
+Import Declarations
+"""
+import collections
+import sys
+import threading as td
+
+"""
+Constant Declarations
+"""
+# The most bytes of product views kept in memory.
+LIMIT = 32 * 1024 * 1024
+
+"""
+View Cache
+"""
+class ViewCache(object):
+    """
+    A least recently used cache of fully assembled product views bounded by
+    an estimate of their size in memory. Every write to the databases goes
+    through invalidate, so a cached view is never older than the data. The
+    cache is shared between the interface and worker threads.
+    """
+
+    def __init__(self, limit=LIMIT):
+        """
+        Initialize an empty cache.
+
+        Args:
+          limit (int, optional): The most bytes of views kept.
+
+        Returns:
+          ViewCache
+        """
+
+        self.limit = limit
+
+        # The views by product in order of use and their sizes.
+        self.views = collections.OrderedDict()
+        self.sizes = {}
+        self.size = 0
+
+        # The number of invalidations, used to drop views read before one.
+        self.version = 0
+
+        self.lock = td.Lock()
+
+    def get(self, product):
+        """
+        Get the view of a product, marking it as most recently used.
+
+        Args:
+          product (str): The name of the product.
+
+        Returns:
+          dict: The view, None if it is not cached.
+        """
+
+        with self.lock:
+            view = self.views.pop(product, None)
+            if view is not None:
+                self.views[product] = view
+
+            return view
+
+    def has(self, product):
+        """
+        """
+
+        with self.lock:
+            return product in self.views
+
+    def put(self, product, view, version):
+        """
+        Add the view of a product unless the data has been written to since
+        the view was read.
+
+        Args:
+          product (str): The name of the product.
+          view (dict): The view of the product.
+          version (int): The version of the cache when reading began.
+
+        Returns:
+          bool: True if the view was added, false otherwise.
+        """
+
+        with self.lock:
+            # Ignore views read before a write.
+            if version != self.version:
+                return False
+
+            # Replace any older view.
+            self.discard(product)
+            self.views[product] = view
+            self.sizes[product] = sizeOf(view)
+            self.size += self.sizes[product]
+
+            # Drop the least recently used views until within the limit.
+            while self.size > self.limit and len(self.views) > 1:
+                self.discard(next(iter(self.views)))
+
+            return True
+
+    def invalidate(self, product=None):
+        """
+        Drop the view of a product, or every view if no product is given.
+
+        Args:
+          product (str, optional): The name of the product written to.
+
+        Returns:
+          bool: True if successful, false otherwise.
+        """
+
+        with self.lock:
+            self.version += 1
+            if product is None:
+                self.views.clear()
+                self.sizes.clear()
+                self.size = 0
+            else:
+                self.discard(product)
+
+        return True
+
+    """
+    Helper Functions
+    """
+    def discard(self, product):
+        """
+        Remove a view, the lock must be held.
+        """
+
+        if product in self.views:
+            del self.views[product]
+            self.size -= self.sizes.pop(product)
+
+# The cache of product views.
+VIEWS = ViewCache()
+
+"""
+Helper Functions
+"""
+def invalidate(product=None):
+    """
+    Drop the cached view of a product, or every view if no product is given.
+    """
+
+    return VIEWS.invalidate(product)
+
+def sizeOf(value):
+    """
+    Estimate the bytes used by a view.
+
+    Args:
+      value (object): The view or part of a view.
+
+    Returns:
+      int: The estimated size in bytes.
+    """
+
+    # Use the buffer size of arrays.
+    if hasattr(value, "nbytes"):
+        return max(sys.getsizeof(value), value.nbytes)
+
+    # Add the contents of containers.
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum([sizeOf(x) + sizeOf(y) for (x, y) in value.items()])
+    elif isinstance(value, (list, tuple)):
+        size += sum([sizeOf(x) for x in value])
+
+    return size
@@ -29,9 +29,11 @@ Import Declarations
 """
 import datetime as dt
 import os
+import pickle
 import sqlite3
 import sys
-import wx
+
+from forsteri.interface import cache
 
 """
 Constant Declarations
@@ -42,6 +44,21 @@ elif os.name == "posix":
     DATA = "/mnt/forecastdb/"
 MASTER = ''.join([DATA, "data.db"])
 
+# The location of the preferences file.
+PREFERENCES = os.path.join(DATA, "Forsteri", "pref.p")
+
+# The preferences once read from the preferences file.
+PREFERENCE = {}
+
+# Tables in the data database holding derived results rather than variables.
+RESERVED = ["rollup", "backtest", "parameter", "selection", "interval",
+    "launch", "profile"]
+
+# Variables that are a level rather than a flow and are not summed by month.
+SINGULAR = ["balance_on_order", "instock_store_count",
+    "need_for_target_inventory_level", "store_balance_on_hand",
+    "target_inventory_level", "aim_store_count", "balance_on_hand"]
+
 """
 Managing Relations
 """
@@ -74,6 +91,9 @@ def addVariable(variable, connection=None):
         connection.commit()
         connection.close()
 
+        # Drop the cached views of products once the change is committed.
+        cache.invalidate()
+
     return True
 
 def removeVariable(variable, connection=None):
@@ -100,6 +120,9 @@ def removeVariable(variable, connection=None):
         connection.commit()
         connection.close()
 
+        # Drop the cached views of products once the change is committed.
+        cache.invalidate()
+
     return True
 
 def getVariables(connection=None):
@@ -118,8 +141,9 @@ def getVariables(connection=None):
     # Execute the create table statement.
     cursor.execute("""SELECT name FROM sqlite_master WHERE type='table';""")
 
-    # Fetch the returned values.
-    variables = [variable[0] for variable in cursor.fetchall()]
+    # Fetch the returned values, leaving out the derived tables.
+    variables = [variable[0] for variable in cursor.fetchall() if\
+        variable[0] not in RESERVED]
 
     # Close the cursor.
     cursor.close()
@@ -239,6 +263,51 @@ def obsCount(product, variables, convert=False, connection=None):
 
     return count
 
+def getVariableSummary(product, variables, connection=None):
+    """
+    Get the latest date and number of observations of many variables for a
+    product in a single query.
+
+    Args:
+      product (str): The name of the product.
+      variables (list of str): The SQL names of the variables to check.
+      connection (sqlite3.Connection, optional): A connection to the database.
+
+    Returns:
+      list of tuple of (str, str, int): The variable, latest date, and count
+        of values for each variable the product has, in the order given.
+    """
+
+    # Open the master database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(MASTER)
+        flag = True
+
+    # Create a cursor from the connection.
+    cursor = connection.cursor()
+
+    # Query the variables in groups within the compound select limit.
+    summary = []
+    for first in range(0, len(variables), 400):
+        # Join a select for each variable.
+        selects = ["""SELECT '{v}', MAX(date), COUNT(value), COUNT(*) FROM {v}
+WHERE product='{p}'""".format(v=variable, p=product) for variable in\
+            variables[first : first + 400]]
+        cursor.execute(" UNION ALL ".join(selects))
+
+        # Keep only the variables the product has rows in.
+        summary.extend([row[0 : 3] for row in cursor.fetchall() if row[3] > 0])
+
+    # Close the cursor.
+    cursor.close()
+
+    # Close the connection.
+    if flag:
+        connection.close()
+
+    return summary
+
 """
 Managing Data
 """
@@ -271,10 +340,13 @@ def addData(variable, data, overwrite=False, connection=None):
     # Close the cursor.
     cursor.close()
 
-    # Close the connection.
+    # Close the connection, dropping the cached views of products once the
+    # value is committed. A caller supplying the connection drops them once
+    # it commits the batch.
     if flag:
         connection.commit()
         connection.close()
+        cache.invalidate()
 
     return True
 
@@ -307,8 +379,98 @@ date""".format(v=variable, p=product))
 
     return data
 
-def getAllData(product, connection=None):
+def getDataCount(product, variable, connection=None):
+    """
+    Get the number of observations of a variable for a product.
+
+    Args:
+      product (str): The name of the product.
+      variable (str): The SQL name of the variable.
+      connection (sqlite3.Connection, optional): A connection to the database.
+
+    Returns:
+      int: The number of observations.
+    """
+
+    # Open the master database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(MASTER)
+        flag = True
+
+    # Create a cursor from the connection.
+    cursor = connection.cursor()
+
+    # Execute the statement to count the observations.
+    cursor.execute("""SELECT COUNT(*) FROM {v} WHERE product='{p}'""".\
+        format(v=variable, p=product))
+
+    # Fetch the count.
+    count = cursor.fetchone()[0]
+
+    # Close the cursor.
+    cursor.close()
+
+    # Close the connection.
+    if flag:
+        connection.close()
+
+    return count
+
+def getDataPage(product, variable, offset, limit, connection=None):
+    """
+    Get a page of the date and value data of a variable for a product.
+
+    Args:
+      product (str): The name of the product.
+      variable (str): The SQL name of the variable.
+      offset (int): The number of observations before the page.
+      limit (int): The most observations on the page.
+      connection (sqlite3.Connection, optional): A connection to the database.
+
+    Returns:
+      list of tuple of (str, float): The dates and values in order of date.
+    """
+
+    # Open the master database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(MASTER)
+        flag = True
+
+    # Create a cursor from the connection.
+    cursor = connection.cursor()
+
+    # Execute the satement to pull the page of date and value data.
+    cursor.execute("""SELECT date, value FROM {v} WHERE product='{p}' ORDER BY
+date LIMIT {l} OFFSET {o}""".format(v=variable, p=product, l=limit, o=offset))
+
+    # Fetch the returned values.
+    data = cursor.fetchall()
+
+    # Close the cursor.
+    cursor.close()
+
+    # Close the connection.
+    if flag:
+        connection.close()
+
+    return data
+
+def getAllData(product, variables=None, connection=None):
     """
+    Get the months a product has a value for finished goods and for every
+    other monthly variable read.
+
+    Args:
+      product (str): The name of the product.
+      variables (list of str, optional): The variables to read, every
+        variable the product has if None.
+      connection (sqlite3.Connection, optional): A connection to the database.
+
+    Returns:
+      tuple of (list of str, list of tuple): The variables read and the date
+        and values of each month, both None without finished goods.
     """
 
     # Open the master database if it is not supplied.
@@ -317,8 +479,9 @@ def getAllData(product, connection=None):
         connection = sqlite3.connect(MASTER)
         flag = True
 
-    # Get the variables that exist for the product.
-    variables = hasVariables(product)
+    # Get the variables that exist for the product if none are given.
+    if variables is None:
+        variables = hasVariables(product, connection=connection)
 
     # Remove nonmonthly variables.
     variables = [variable for variable in variables if variable[-8:] ==\
@@ -327,6 +490,8 @@ def getAllData(product, connection=None):
     # Check for finished goods monthly.
     if "finished_goods_monthly" not in variables:
         #print("Finished goods monthly was not found in the database.")
+        if flag:
+            connection.close()
         return None, None
 
     # Create the repeated strings.
@@ -388,18 +553,15 @@ def updateForecast(product, method, forecast, connection=None):
         connection = sqlite3.connect(MASTER)
         flag = True
 
-    # Find today's date.
-    today = dt.date(1, 1, 1).today()
+    # Find the date of the next occurence of each month.
+    dates = forecastDates()
 
     # Create a cursor from the connection.
     cursor = connection.cursor()
 
     # Execute the statement to insert the data into the database.
     for month in range(0 ,12):
-        if month + 1 > today.month:
-            date = dt.date(today.year, month + 1, 1)
-        else:
-            date = dt.date(today.year + 1, month + 1, 1)
+        date = dates[month]
         try:
             cursor.execute("""INSERT INTO forecast (date, product) VALUES
 ('{d}', '{p}')""".format(d=date, p=product))
@@ -412,11 +574,60 @@ date='{d}' AND product='{p}'""".format(m=method, f=forecast[month], d=date,
     # Close the cursor.
     cursor.close()
 
+    # Close the connection, dropping the cached view of the product once the
+    # change is committed.
+    if flag:
+        connection.commit()
+        connection.close()
+        cache.invalidate(product)
+
+    return True
+
+def updateForecasts(method, forecasts, connection=None):
+    """
+    Set the forecasts of a method for many products at once.
+
+    Args:
+      method (str): The forecast method, a column of the forecast table.
+      forecasts (dict of {str: list of float}): The forecast of each product
+        for January through December, None where there is none.
+      connection (sqlite3.Connection, optional): A connection to the database.
+
+    Returns:
+      bool: True if successful, false otherwise.
+    """
+
+    # Open the master database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(MASTER)
+        flag = True
+
+    # Find the date of the next occurence of each month.
+    dates = [str(date) for date in forecastDates()]
+
+    # Create a cursor from the connection.
+    cursor = connection.cursor()
+
+    # Create any missing rows then set the values.
+    cursor.executemany("""INSERT OR IGNORE INTO forecast (date, product)
+VALUES (?, ?)""", [(date, product) for product in forecasts for date in dates])
+    cursor.executemany("""UPDATE forecast SET {m}=? WHERE date=? AND
+product=?""".format(m=method), [(value, dates[month], product) for\
+        (product, values) in forecasts.items() for (month, value) in\
+        enumerate(values)])
+
+    # Close the cursor.
+    cursor.close()
+
     # Close the connection.
     if flag:
         connection.commit()
         connection.close()
 
+        # Drop the cached views of products once the change is committed.
+        cache.invalidate()
+
     return True
 
 def getForecast(product, method=None, connection=None):
@@ -437,8 +648,13 @@ def getForecast(product, method=None, connection=None):
         cursor.execute("""SELECT date, {m} FROM forecast WHERE product='{p}'
 ORDER BY date""".format(m=method, p=product))
     else:
-        cursor.execute("""SELECT date, mlr, ema, arma, aux FROM forecast WHERE
-product='{p}' ORDER BY date""".format(p=product))
+        # Otherwise put the method selected for the product, if any, before
+        # the others, each month falling back to the next with a value.
+        selected = getSelection(product, connection)
+        columns = ", ".join(([selected] if selected else []) + ["mlr", "ema",
+            "arma", "aux"])
+        cursor.execute("""SELECT date, {c} FROM forecast WHERE product='{p}'
+ORDER BY date""".format(c=columns, p=product))
 
     # Fetch the forecast values.
     forecast = cursor.fetchall()
@@ -462,6 +678,58 @@ product='{p}' ORDER BY date""".format(p=product))
 
     return final
 
+def getForecasts(product, methods, connection=None):
+    """
+    Get the forecasts of many methods for a product in a single query.
+
+    Args:
+      product (str): The name of the product.
+      methods (list of str): The forecast methods.
+      connection (sqlite3.Connection, optional): A connection to the database.
+
+    Returns:
+      dict of {str: dict of {datetime.datetime: float}}: The forecast of each
+        method by date, as given by getForecast.
+    """
+
+    # Open the master database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(MASTER)
+        flag = True
+
+    # Create a cursor from the connection.
+    cursor = connection.cursor()
+
+    # Find the methods that have a column, a model not yet run has none.
+    cursor.execute("""PRAGMA table_info(forecast)""")
+    columns = [row[1] for row in cursor.fetchall()]
+
+    # Get the values of every method.
+    cursor.execute("""SELECT date, {m} FROM forecast WHERE product='{p}' ORDER
+BY date""".format(m=", ".join([method if method in columns else "NULL" for\
+        method in methods]), p=product))
+
+    # Fetch the forecast values.
+    forecast = cursor.fetchall()
+
+    # Close the cursor.
+    cursor.close()
+
+    # Close the connection.
+    if flag:
+        connection.close()
+
+    # Split the values into a dictionary for each method.
+    final = dict([(method, dict()) for method in methods])
+    for row in forecast:
+        date = dt.datetime.strptime(row[0], "%Y-%m-%d")
+        for (i, method) in enumerate(methods):
+            if row[i + 1] is not None:
+                final[method][date] = row[i + 1]
+
+    return final
+
 def changeName(oldName, newName, connection=None):
     """
     """
@@ -491,6 +759,9 @@ product='{ol}'""".format(v=variable, ol=oldName, nn=newName))
         connection.commit()
         connection.close()
 
+        # Drop the cached views of products once the change is committed.
+        cache.invalidate()
+
     return True
 
 def trimLeadingZeros(variable, connection=None):
@@ -540,6 +811,9 @@ product='{p}'""".format(v=variable, d=element[0], p=product[0]))
         connection.commit()
         connection.close()
 
+        # Drop the cached views of products once the change is committed.
+        cache.invalidate()
+
     return True
 
 def rediscretize(variable, method="sum", connection=None):
@@ -591,6 +865,9 @@ product, strftime('%Y-%m', date) ORDER BY product;""".format(vr=variableRe,
         connection.commit()
         connection.close()
 
+        # Drop the cached views of products once the change is committed.
+        cache.invalidate()
+
     return True
 
 """
@@ -598,6 +875,15 @@ Error
 """
 def updateError(meth="mlr", connection=None):
     """
+    Find the error of a method's forecasts of months that have finished
+    goods.
+
+    Args:
+      meth (str, optional): The forecast method.
+      connection (sqlite3.Connection, optional): A connection to the database.
+
+    Returns:
+      list of str: The products with an error that changed.
     """
 
     # Open the master database if it is not supplied.
@@ -609,20 +895,19 @@ def updateError(meth="mlr", connection=None):
     # Create a cursor from the connection.
     cursor = connection.cursor()
 
-    # Get the error values.
-    cursor.execute("""SELECT fg.date, fg.product, fg.value-forecast.{m} FROM
-finished_goods_monthly AS fg INNER JOIN forecast ON fg.date=forecast.date AND
-fg.product=forecast.product""".format(m=meth))
+    # Get the error values and the errors already held.
+    cursor.execute("""SELECT fg.date, fg.product, fg.value-forecast.{m},
+forecast.{m}_error FROM finished_goods_monthly AS fg INNER JOIN forecast ON
+fg.date=forecast.date AND fg.product=forecast.product""".format(m=meth))
 
-    # Fetch the error data.
-    errors = cursor.fetchall()
+    # Fetch the error data, keeping only the errors that changed.
+    errors = [error for error in cursor.fetchall() if error[2] is not None\
+        and error[2] != error[3]]
 
-    # Iterate over all months and products and update the error values.
-    for error in errors:
-        if error[2] is None:
-            continue
-        cursor.execute("""UPDATE forecast SET {m}_error={e} WHERE date='{d}'
-AND product='{p}'""".format(m=meth, e=error[2], d=error[0], p=error[1]))
+    # Update the error values.
+    cursor.executemany("""UPDATE forecast SET {m}_error=? WHERE date=? AND
+product=?""".format(m=meth), [(error[2], error[0], error[1]) for error in\
+        errors])
 
     # Close the cursor.
     cursor.close()
@@ -632,13 +917,20 @@ AND product='{p}'""".format(m=meth, e=error[2], d=error[0], p=error[1]))
         connection.commit()
         connection.close()
 
-    return True
+    return sorted(set([error[1] for error in errors]))
 
 """
-Linking
+Backtest
 """
-def linkData(old, new, connection=None):
+def createBacktest(connection=None):
     """
+    Create the backtest table if it does not already exist.
+
+    Args:
+      connection (sqlite3.Connection, optional): A connection to the database.
+
+    Returns:
+      bool: True if successful, false otherwise.
     """
 
     # Open the master database if it is not supplied.
@@ -650,40 +942,40 @@ def linkData(old, new, connection=None):
     # Create a cursor from the connection.
     cursor = connection.cursor()
 
-    # Get the variables assigned to the old product.
-    variables = hasVariables(new)
-    variables = [x for x in variables if x[-8:] != "_monthly"]
-    variables.remove("forecast")
-
-    # Iterate over the variables.
-    for variable in variables:
-        # Get the earliest date from the new product.
-        cursor.execute("""SELECT MIN(date) FROM {v} WHERE product='{n}'""".\
-            format(v=variable, n=new))
-        firstDate = cursor.fetchone()[0]
-
-        # Get all data from the old product before the first date.
-        cursor.execute("""SELECT date, value FROM {v} WHERE product='{o}' AND
-date<'{d}' ORDER BY date""".format(v=variable, o=old, d=firstDate))
-        dataTemp = cursor.fetchall()
-
-        # Iterate over the values that were pulled from the old product.
-        for point in dataTemp:
-            cursor.execute("""INSERT INTO {v} (date, product, value) VALUES
-('{d}', '{n}', {val})""".format(v=variable, d=point[0], n=new, val=point[1]))
+    # Execute the command to create the table.
+    cursor.execute("""CREATE TABLE IF NOT EXISTS backtest (
+`product` TEXT NOT NULL,
+`method` TEXT NOT NULL,
+`horizon` INTEGER NOT NULL,
+`count` INTEGER,
+`mae` REAL,
+`mape` REAL,
+`bias` REAL,
+UNIQUE(`product`, `method`, `horizon`)
+)""")
 
     # Close the cursor.
     cursor.close()
 
-    # Close the connection.
+    # Commit the change to the database and close the connection.
     if flag:
         connection.commit()
         connection.close()
 
     return True
 
-def unlinkData(old, new, connection=None):
+def setBacktest(results, connection=None):
     """
+    Store backtest results, replacing any for the same product, method, and
+    horizon.
+
+    Args:
+      results (iterable of tuple): The product, method, horizon, count, mean
+        absolute error, mean absolute percent error, and bias of each result.
+      connection (sqlite3.Connection, optional): A connection to the database.
+
+    Returns:
+      bool: True if successful, false otherwise.
     """
 
     # Open the master database if it is not supplied.
@@ -692,94 +984,1056 @@ def unlinkData(old, new, connection=None):
         connection = sqlite3.connect(MASTER)
         flag = True
 
+    # Make sure the table exists.
+    createBacktest(connection)
+
     # Create a cursor from the connection.
     cursor = connection.cursor()
 
-    # Get the variables assigned to the old product.
-    variables = hasVariables(new)
-    variables = [x for x in variables if x[-8:] != "_monthly"]
-    variables.remove("forecast")
-
-    # Iterate over the variables.
-    for variable in variables:
-        # Get the data for the old product.
-        cursor.execute("""SELECT date, value FROM {v} WHERE product='{o}'""".\
-            format(v=variable, o=old))
-        oldData = cursor.fetchall()
-
-        # Iterate over the old data.
-        for point in oldData:
-            cursor.execute("""DELETE FROM {v} WHERE date='{d}' AND
-product='{n}' AND value={val}""".format(v=variable, d=point[0], n=new,
-    val=point[1]))
+    # Execute the command to store the results.
+    cursor.executemany("""INSERT OR REPLACE INTO backtest (product, method,
+horizon, count, mae, mape, bias) VALUES (?, ?, ?, ?, ?, ?, ?)""", results)
 
     # Close the cursor.
     cursor.close()
 
-    # Close the connection.
+    # Commit the change to the database and close the connection.
     if flag:
         connection.commit()
         connection.close()
 
     return True
 
-"""
-Helper/Utility Functions
-"""
-def systematize():
+def getBacktest(product, connection=None):
     """
+    Get the backtest results of a product.
+
+    Args:
+      product (str): The name of the product.
+      connection (sqlite3.Connection, optional): A connection to the database.
+
+    Returns:
+      list of tuple of (str, int, int, float, float, float): The method,
+        horizon, count, mean absolute error, mean absolute percent error, and
+        bias of each result, in order of method and horizon.
     """
 
-    # Create the progress dialog box.
-    progress_dlg = wx.ProgressDialog("Running Systematize",
-        "Opening database connection.")
+    # Open the master database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(MASTER)
+        flag = True
 
-    # Open a connection to the data database.
-    connection = sqlite3.connect(MASTER)
+    # Make sure the table exists.
+    createBacktest(connection)
 
-    (cont, skip) = progress_dlg.Update(2, "Connection initialized, \
-gathering variables.")
-    if not cont:
-        return False
+    # Create a cursor from the connection.
+    cursor = connection.cursor()
 
-    # Get a list of all variables.
-    variables = getVariables(connection)
+    # Execute the command to select the results.
+    cursor.execute("""SELECT method, horizon, count, mae, mape, bias FROM
+backtest WHERE product=? ORDER BY method, horizon""", (product,))
 
-    # Only operate on non monthly data.
-    variablesNM = [x for x in variables if x[-8:] != "_monthly"]
+    # Fetch the results.
+    results = cursor.fetchall()
 
-    # Remove forecast from the list.
-    variablesNM.remove("forecast")
+    # Close the cursor.
+    cursor.close()
 
-    # Create a list of singular variables.
-    singular = ["balance_on_order", "instock_store_count",
-        "need_for_target_inventory_level", "store_balance_on_hand",
-        "target_inventory_level", "aim_store_count", "balance_on_hand"]
+    # Close the connection.
+    if flag:
+        connection.close()
 
-    progress_dlg.Update(5, "Variables gathered, rediscretizing.")
+    return results
+
+"""
+Model Selection
+"""
+def createSelection(connection=None):
+    """
+    Create the selection table, holding the forecast method chosen for each
+    product, if it does not already exist.
+
+    Args:
+      connection (sqlite3.Connection, optional): A connection to the database.
+
+    Returns:
+      bool: True if successful, false otherwise.
+    """
+
+    # Open the master database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(MASTER)
+        flag = True
+
+    # Create a cursor from the connection.
+    cursor = connection.cursor()
+
+    # Execute the command to create the table.
+    cursor.execute("""CREATE TABLE IF NOT EXISTS selection (
+`product` TEXT NOT NULL UNIQUE,
+`method` TEXT NOT NULL,
+`score` REAL,
+`source` TEXT
+)""")
+
+    # Close the cursor.
+    cursor.close()
+
+    # Commit the change to the database and close the connection.
+    if flag:
+        connection.commit()
+        connection.close()
+
+    return True
+
+def refreshSelection(products=None, connection=None):
+    """
+    Choose the forecast method of each product with the least mean absolute
+    error. The errors of past forecasts are used where a product has any,
+    each method with errors scored over only the months every one of them
+    has an error, and the backtest results otherwise.
+
+    Args:
+      products (list of str, optional): The products to choose for, all if
+        None.
+      connection (sqlite3.Connection, optional): A connection to the database.
+
+    Returns:
+      int: The number of products with a method chosen.
+    """
+
+    # Open the master database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(MASTER)
+        flag = True
+
+    # Make sure the tables exist.
+    createSelection(connection)
+    createBacktest(connection)
+
+    # Create a cursor from the connection.
+    cursor = connection.cursor()
+
+    # Find the methods that have errors.
+    cursor.execute("""PRAGMA table_info(forecast)""")
+    columns = [row[1] for row in cursor.fetchall()]
+    methods = [x for x in columns if x + "_error" in columns]
+
+    # The commands scoring each method of each product from its errors and
+    # from the backtests. The errors are compared over the months of a
+    # product where every method with any error for it has one, so no
+    # method is scored over easier months than another.
+    counts = "SELECT product, " + ", ".join(["COUNT({m}_error) AS {m}".\
+        format(m=method) for method in methods]) + " FROM forecast{w} GROUP "\
+        "BY product"
+    common = " AND ".join(["(f.{m}_error IS NOT NULL OR n.{m} = 0)".\
+        format(m=method) for method in methods])
+    errors = " UNION ALL ".join(["""SELECT f.product, '{m}' AS method,
+AVG(ABS(f.{m}_error)) AS score FROM forecast AS f JOIN ({n}) AS n ON
+f.product=n.product WHERE f.{m}_error IS NOT NULL AND {c} GROUP BY
+f.product""".format(m=method, n=counts, c=common) for method in methods])
+    backtests = """SELECT product, method, SUM(mae * count) / SUM(count) AS
+score FROM backtest{w} GROUP BY product, method"""
+
+    # Choose from the errors first, then from the backtests for products
+    # without errors, in chunks of products if only some are chosen for.
+    if products is None:
+        chunks = [None]
+    else:
+        size = max(1, 900 // (len(methods) + 1))
+        chunks = [products[i : i + size] for i in range(0, len(products),
+            size)]
+    for chunk in chunks:
+        if chunk is None:
+            (where, marks) = ('', [])
+            cursor.execute("""DELETE FROM selection""")
+        else:
+            where = " WHERE product IN ({m})".format(m=", ".join(['?'] *\
+                len(chunk)))
+            marks = list(chunk)
+            cursor.execute("""DELETE FROM selection{w}""".format(w=where),
+                marks)
+        if len(methods) > 0:
+            cursor.execute("""INSERT INTO selection (product, method, score,
+source) SELECT product, method, MIN(score), 'error' FROM ({s}) GROUP BY
+product""".format(s=errors.format(w=where)), marks * len(methods))
+        cursor.execute("""INSERT OR IGNORE INTO selection (product, method,
+score, source) SELECT product, method, MIN(score), 'backtest' FROM ({s}) GROUP
+BY product""".format(s=backtests.format(w=where)), marks)
+
+    # Count the products with a method chosen.
+    cursor.execute("""SELECT COUNT(*) FROM selection""")
+    count = cursor.fetchone()[0]
+
+    # Close the cursor.
+    cursor.close()
+
+    # Commit the change to the database and close the connection.
+    if flag:
+        connection.commit()
+        connection.close()
+
+        # Drop the cached views of products once the change is committed.
+        cache.invalidate()
+
+    return count
+
+def getSelection(product, connection=None):
+    """
+    Get the forecast method chosen for a product.
+
+    Args:
+      product (str): The name of the product.
+      connection (sqlite3.Connection, optional): A connection to the database.
+
+    Returns:
+      str: The method, None if none has been chosen.
+    """
+
+    # Open the master database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(MASTER)
+        flag = True
+
+    # Make sure the table exists.
+    createSelection(connection)
+
+    # Create a cursor from the connection.
+    cursor = connection.cursor()
+
+    # Execute the command to select the method.
+    cursor.execute("""SELECT method FROM selection WHERE product=?""",
+        (product,))
+
+    # Fetch the method.
+    row = cursor.fetchone()
+
+    # Close the cursor.
+    cursor.close()
+
+    # Close the connection.
+    if flag:
+        connection.close()
+
+    if row is None:
+        return None
+
+    return row[0]
+
+"""
+Prediction Intervals
+"""
+def createInterval(connection=None):
+    """
+    Create the interval table if it does not already exist. The table holds
+    the offset of each quantile from the forecast of a method for a product.
+
+    Args:
+      connection (sqlite3.Connection, optional): A connection to the database.
+
+    Returns:
+      bool: True if successful, false otherwise.
+    """
+
+    # Open the master database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(MASTER)
+        flag = True
+
+    # Create a cursor from the connection.
+    cursor = connection.cursor()
+
+    # Execute the command to create the table.
+    cursor.execute("""CREATE TABLE IF NOT EXISTS interval (
+`product` TEXT NOT NULL,
+`method` TEXT NOT NULL,
+`quantile` REAL NOT NULL,
+`offset` REAL,
+UNIQUE(`product`, `method`, `quantile`)
+)""")
+
+    # Close the cursor.
+    cursor.close()
+
+    # Commit the change to the database and close the connection.
+    if flag:
+        connection.commit()
+        connection.close()
+
+    return True
+
+def setIntervals(method, offsets, connection=None):
+    """
+    Replace the intervals of a method.
+
+    Args:
+      method (str): The forecast method.
+      offsets (dict of {str: dict of {float: float}}): The offset of each
+        quantile for each product.
+      connection (sqlite3.Connection, optional): A connection to the database.
+
+    Returns:
+      bool: True if successful, false otherwise.
+    """
+
+    # Open the master database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(MASTER)
+        flag = True
+
+    # Make sure the table exists.
+    createInterval(connection)
+
+    # Create a cursor from the connection.
+    cursor = connection.cursor()
+
+    # Remove the old intervals then add the new.
+    cursor.execute("""DELETE FROM interval WHERE method=?""", (method,))
+    cursor.executemany("""INSERT INTO interval (product, method, quantile,
+offset) VALUES (?, ?, ?, ?)""", [(product, method, quantile, offset) for\
+        (product, values) in offsets.items() for (quantile, offset) in\
+        values.items()])
+
+    # Close the cursor.
+    cursor.close()
+
+    # Commit the change to the database and close the connection.
+    if flag:
+        connection.commit()
+        connection.close()
+
+        # Drop the cached views of products once the change is committed.
+        cache.invalidate()
+
+    return True
+
+def getIntervals(product, connection=None):
+    """
+    Get the intervals of every method for a product.
+
+    Args:
+      product (str): The name of the product.
+      connection (sqlite3.Connection, optional): A connection to the database.
+
+    Returns:
+      dict of {str: dict of {float: float}}: The offset of each quantile from
+        the forecast of each method.
+    """
+
+    # Open the master database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(MASTER)
+        flag = True
+
+    # Make sure the table exists.
+    createInterval(connection)
+
+    # Create a cursor from the connection.
+    cursor = connection.cursor()
+
+    # Execute the command to select the intervals.
+    cursor.execute("""SELECT method, quantile, offset FROM interval WHERE
+product=?""", (product,))
+
+    # Fetch the intervals.
+    intervals = {}
+    for (method, quantile, offset) in cursor.fetchall():
+        intervals.setdefault(method, {})[quantile] = offset
+
+    # Close the cursor.
+    cursor.close()
+
+    # Close the connection.
+    if flag:
+        connection.close()
+
+    return intervals
+
+def toBounds(forecast, offsets):
+    """
+    Add the offsets of the lowest and highest quantile to a forecast, the
+    lower bound kept from falling below zero.
+
+    Args:
+      forecast (dict of {datetime.datetime: float}): The forecast by date.
+      offsets (dict of {float: float}): The offset of each quantile.
+
+    Returns:
+      dict of {datetime.datetime: tuple of (float, float)}: The lower and
+        upper bound by date, empty if there are no offsets.
+    """
+
+    if len(offsets) == 0:
+        return {}
+
+    lower = offsets[min(offsets)]
+    upper = offsets[max(offsets)]
+
+    return dict([(date, (max(value + lower, 0), value + upper)) for (date,
+        value) in forecast.items()])
+
+"""
+Parameters
+"""
+def createParameter(connection=None):
+    """
+    Create the parameter table if it does not already exist.
+
+    Args:
+      connection (sqlite3.Connection, optional): A connection to the database.
+
+    Returns:
+      bool: True if successful, false otherwise.
+    """
+
+    # Open the master database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(MASTER)
+        flag = True
+
+    # Create a cursor from the connection.
+    cursor = connection.cursor()
+
+    # Execute the command to create the table.
+    cursor.execute("""CREATE TABLE IF NOT EXISTS parameter (
+`product` TEXT NOT NULL,
+`model` TEXT NOT NULL,
+`parameter` TEXT NOT NULL,
+`value` REAL,
+UNIQUE(`product`, `model`, `parameter`)
+)""")
+
+    # Close the cursor.
+    cursor.close()
+
+    # Commit the change to the database and close the connection.
+    if flag:
+        connection.commit()
+        connection.close()
+
+    return True
+
+def setParameters(model, parameter, values, connection=None):
+    """
+    Store a parameter of a model for many products, replacing any already
+    stored.
+
+    Args:
+      model (str): The model, such as ema.
+      parameter (str): The parameter, such as alpha.
+      values (dict of {str: float}): The value for each product.
+      connection (sqlite3.Connection, optional): A connection to the database.
+
+    Returns:
+      bool: True if successful, false otherwise.
+    """
+
+    # Open the master database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(MASTER)
+        flag = True
+
+    # Make sure the table exists.
+    createParameter(connection)
+
+    # Create a cursor from the connection.
+    cursor = connection.cursor()
+
+    # Execute the command to store the values.
+    cursor.executemany("""INSERT OR REPLACE INTO parameter (product, model,
+parameter, value) VALUES (?, ?, ?, ?)""", [(product, model, parameter, value)\
+        for (product, value) in values.items()])
+
+    # Close the cursor.
+    cursor.close()
+
+    # Commit the change to the database and close the connection.
+    if flag:
+        connection.commit()
+        connection.close()
+
+    return True
+
+def getParameters(model, parameter, connection=None):
+    """
+    Get a parameter of a model for every product it is stored for.
+
+    Args:
+      model (str): The model, such as ema.
+      parameter (str): The parameter, such as alpha.
+      connection (sqlite3.Connection, optional): A connection to the database.
+
+    Returns:
+      dict of {str: float}: The value for each product.
+    """
+
+    # Open the master database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(MASTER)
+        flag = True
+
+    # Make sure the table exists.
+    createParameter(connection)
+
+    # Create a cursor from the connection.
+    cursor = connection.cursor()
+
+    # Execute the command to select the values.
+    cursor.execute("""SELECT product, value FROM parameter WHERE model=? AND
+parameter=?""", (model, parameter))
+
+    # Fetch the values.
+    values = dict(cursor.fetchall())
+
+    # Close the cursor.
+    cursor.close()
+
+    # Close the connection.
+    if flag:
+        connection.close()
+
+    return values
+
+def setModelParameters(model, values, connection=None):
+    """
+    Store every parameter of a model for many products, removing any other
+    parameters already stored for them.
+
+    Args:
+      model (str): The model, such as mlr.
+      values (dict of {str: dict of {str: float}}): The value of each
+        parameter for each product.
+      connection (sqlite3.Connection, optional): A connection to the database.
+
+    Returns:
+      bool: True if successful, false otherwise.
+    """
+
+    # Open the master database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(MASTER)
+        flag = True
+
+    # Make sure the table exists.
+    createParameter(connection)
+
+    # Create a cursor from the connection.
+    cursor = connection.cursor()
+
+    # Execute the commands to replace the values.
+    cursor.executemany("""DELETE FROM parameter WHERE product=? AND model=?""",
+        [(product, model) for product in values])
+    cursor.executemany("""INSERT INTO parameter (product, model, parameter,
+value) VALUES (?, ?, ?, ?)""", [(product, model, parameter, value) for\
+        (product, parameters) in values.items() for (parameter, value) in\
+        parameters.items()])
+
+    # Close the cursor.
+    cursor.close()
+
+    # Commit the change to the database and close the connection.
+    if flag:
+        connection.commit()
+        connection.close()
+
+    return True
+
+def getModelParameters(model, connection=None):
+    """
+    Get every parameter of a model for every product any is stored for.
+
+    Args:
+      model (str): The model, such as mlr.
+      connection (sqlite3.Connection, optional): A connection to the database.
+
+    Returns:
+      dict of {str: dict of {str: float}}: The value of each parameter for
+        each product.
+    """
+
+    # Open the master database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(MASTER)
+        flag = True
+
+    # Make sure the table exists.
+    createParameter(connection)
+
+    # Create a cursor from the connection.
+    cursor = connection.cursor()
+
+    # Execute the command to select the values.
+    cursor.execute("""SELECT product, parameter, value FROM parameter WHERE
+model=?""", (model,))
+
+    # Gather the values of each product.
+    values = {}
+    for (product, parameter, value) in cursor.fetchall():
+        values.setdefault(product, {})[parameter] = value
+
+    # Close the cursor.
+    cursor.close()
+
+    # Close the connection.
+    if flag:
+        connection.close()
+
+    return values
+
+"""
+Demand Profiles
+"""
+def createProfile(connection=None):
+    """
+    Create the profile table if it does not already exist. A profile is the
+    scale of a product's recent finished goods and the share of it in each
+    month of the year.
+
+    Args:
+      connection (sqlite3.Connection, optional): A connection to the database.
+
+    Returns:
+      bool: True if successful, false otherwise.
+    """
+
+    # Open the master database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(MASTER)
+        flag = True
+
+    # Create a cursor from the connection.
+    cursor = connection.cursor()
+
+    # Execute the command to create the table.
+    cursor.execute("""CREATE TABLE IF NOT EXISTS profile (
+`product` TEXT NOT NULL UNIQUE,
+`signature` TEXT,
+`scale` REAL,
+{m}
+)""".format(m=",\n".join(["`month_{i}` REAL".format(i=i) for i in\
+        range(1, 13)])))
+
+    # Close the cursor.
+    cursor.close()
+
+    # Commit the change to the database and close the connection.
+    if flag:
+        connection.commit()
+        connection.close()
+
+    return True
+
+def setProfiles(profiles, removed=None, connection=None):
+    """
+    Store the profiles of many products, replacing any already stored, and
+    remove the profiles of others.
+
+    Args:
+      profiles (list of tuple): The product, signature of its history, scale,
+        and share of each month of each profile.
+      removed (list of str, optional): The products whose profiles are
+        removed.
+      connection (sqlite3.Connection, optional): A connection to the database.
+
+    Returns:
+      bool: True if successful, false otherwise.
+    """
+
+    # Open the master database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(MASTER)
+        flag = True
+
+    # Make sure the table exists.
+    createProfile(connection)
+
+    # Create a cursor from the connection.
+    cursor = connection.cursor()
+
+    # Execute the commands to remove and store the profiles.
+    cursor.executemany("""DELETE FROM profile WHERE product=?""",
+        [(product,) for product in removed or []])
+    cursor.executemany("""INSERT OR REPLACE INTO profile (product, signature,
+scale, {m}) VALUES ({v})""".format(m=", ".join(["month_" + str(i) for i in\
+        range(1, 13)]), v=", ".join(['?'] * 15)), profiles)
+
+    # Close the cursor.
+    cursor.close()
+
+    # Commit the change to the database and close the connection.
+    if flag:
+        connection.commit()
+        connection.close()
+
+    return True
+
+def getProfiles(products=None, connection=None):
+    """
+    Get the profiles of some products, or of every product.
+
+    Args:
+      products (list of str, optional): The products, all if None.
+      connection (sqlite3.Connection, optional): A connection to the database.
+
+    Returns:
+      list of tuple: The product, signature, scale, and share of each month
+        of each profile, in order of product.
+    """
+
+    # Open the master database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(MASTER)
+        flag = True
+
+    # Make sure the table exists.
+    createProfile(connection)
+
+    # Create a cursor from the connection.
+    cursor = connection.cursor()
+
+    # Execute the command to select the profiles, in chunks if products are
+    # given.
+    select = """SELECT product, signature, scale, {m} FROM profile{{w}} ORDER
+BY product""".format(m=", ".join(["month_" + str(i) for i in range(1, 13)]))
+    if products is None:
+        cursor.execute(select.format(w=''))
+        profiles = cursor.fetchall()
+    else:
+        profiles = []
+        for first in range(0, len(products), 900):
+            chunk = products[first : first + 900]
+            cursor.execute(select.format(w=" WHERE product IN ({m})".format(
+                m=", ".join(['?'] * len(chunk)))), chunk)
+            profiles.extend(cursor.fetchall())
+        profiles.sort()
+
+    # Close the cursor.
+    cursor.close()
+
+    # Close the connection.
+    if flag:
+        connection.close()
+
+    return profiles
+
+"""
+Linking
+"""
+def linkData(old, new, connection=None):
+    """
+    """
+
+    # Open the master database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(MASTER)
+        flag = True
+
+    # Create a cursor from the connection.
+    cursor = connection.cursor()
+
+    # Get the variables assigned to the old product.
+    variables = hasVariables(new)
+    variables = [x for x in variables if x[-8:] != "_monthly"]
+    variables.remove("forecast")
+
+    # Iterate over the variables.
+    for variable in variables:
+        # Get the earliest date from the new product.
+        cursor.execute("""SELECT MIN(date) FROM {v} WHERE product='{n}'""".\
+            format(v=variable, n=new))
+        firstDate = cursor.fetchone()[0]
+
+        # Get all data from the old product before the first date.
+        cursor.execute("""SELECT date, value FROM {v} WHERE product='{o}' AND
+date<'{d}' ORDER BY date""".format(v=variable, o=old, d=firstDate))
+        dataTemp = cursor.fetchall()
+
+        # Iterate over the values that were pulled from the old product.
+        for point in dataTemp:
+            cursor.execute("""INSERT INTO {v} (date, product, value) VALUES
+('{d}', '{n}', {val})""".format(v=variable, d=point[0], n=new, val=point[1]))
+
+    # Close the cursor.
+    cursor.close()
+
+    # Close the connection.
+    if flag:
+        connection.commit()
+        connection.close()
+
+        # Drop the cached views of products once the change is committed.
+        cache.invalidate()
+
+    return True
+
+def unlinkData(old, new, connection=None):
+    """
+    """
+
+    # Open the master database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(MASTER)
+        flag = True
+
+    # Create a cursor from the connection.
+    cursor = connection.cursor()
+
+    # Get the variables assigned to the old product.
+    variables = hasVariables(new)
+    variables = [x for x in variables if x[-8:] != "_monthly"]
+    variables.remove("forecast")
+
+    # Iterate over the variables.
+    for variable in variables:
+        # Get the data for the old product.
+        cursor.execute("""SELECT date, value FROM {v} WHERE product='{o}'""".\
+            format(v=variable, o=old))
+        oldData = cursor.fetchall()
+
+        # Iterate over the old data.
+        for point in oldData:
+            cursor.execute("""DELETE FROM {v} WHERE date='{d}' AND
+product='{n}' AND value={val}""".format(v=variable, d=point[0], n=new,
+    val=point[1]))
+
+    # Close the cursor.
+    cursor.close()
+
+    # Close the connection.
+    if flag:
+        connection.commit()
+        connection.close()
+
+        # Drop the cached views of products once the change is committed.
+        cache.invalidate()
+
+    return True
+
+"""
+Preferences
+"""
+def getPreferences():
+    """
+    Get the preferences, only reading the preferences file the first time.
+
+    Returns:
+      dict of {str: object}: The preferences.
+    """
+
+    # Read the preferences file if it has not been read.
+    if len(PREFERENCE) == 0:
+        PREFERENCE.update(pickle.load(open(PREFERENCES, "rb")))
+
+    return dict(PREFERENCE)
+
+def setPreferences(pref):
+    """
+    Save the preferences to the preferences file.
+
+    Args:
+      pref (dict of {str: object}): The preferences.
+
+    Returns:
+      bool: True if successful, false otherwise.
+    """
+
+    # Write the preferences file and keep the preferences in memory.
+    pickle.dump(pref, open(PREFERENCES, "wb"))
+    PREFERENCE.clear()
+    PREFERENCE.update(pref)
+
+    return True
+
+"""
+Helper/Utility Functions
+"""
+def systematize(progress=None):
+    """
+    Trim the leading zeros of every variable and rediscretize it to be
+    monthly.
+
+    Args:
+      progress (function, optional): Called as progress(percent, message),
+        returning false to stop after the current variable.
+
+    Returns:
+      bool: True if every variable was systematized, false if stopped.
+    """
+
+    # Report nothing if not asked to.
+    if progress is None:
+        progress = lambda percent, message: True
+
+    # Open a connection to the data database.
+    connection = sqlite3.connect(MASTER)
+
+    progress(2, "Connection initialized, gathering variables.")
+
+    # Get a list of all variables.
+    variables = getVariables(connection)
+
+    # Only operate on non monthly data.
+    variablesNM = [x for x in variables if x[-8:] != "_monthly"]
+
+    # Remove forecast from the list.
+    variablesNM.remove("forecast")
+
+    keepGoing = progress(5, "Variables gathered, rediscretizing.")
 
     prog = 5
     delta = 94 / len(variablesNM)
 
     # Iterate over the variables performing operations on each.
     for variable in variablesNM:
-        trimLeadingZeros(variable, connection=connection)
-        if variable in singular:
-            rediscretize(variable, method="singular", connection=connection)
-        else:
-            rediscretize(variable, connection=connection)
+        if not keepGoing:
+            break
+        systematizeVariable(variable, connection)
         prog += delta
-        progress_dlg.Update(prog, fromSQLName(variable) + " complete.")
+        keepGoing = progress(prog, fromSQLName(variable) + " complete.")
 
-    # Close and commit the connection.
+    # Commit the connection, dropping the cached views of products.
     connection.commit()
+    cache.invalidate()
+
+    # Rebuild the hierarchy totals of the monthly variables.
+    if keepGoing:
+        from forsteri.interface import rollup as irollup
+        progress(99, "Rolling up the hierarchy.")
+        irollup.refreshRollup([x + "_monthly" for x in variablesNM],
+            connection=connection)
+        connection.commit()
+
+    # Rebuild the launch curves if the finished goods changed.
+    if keepGoing and "finished_goods" in variablesNM:
+        from forsteri.interface import launch as ilaunch
+        ilaunch.refreshLaunch(connection=connection)
+        connection.commit()
+
+    # Close the connection.
     connection.close()
 
-    progress_dlg.Update(100, "Systematize complete.")
-    progress_dlg.Destroy()
+    progress(100, "Systematize complete.")
+
+    return keepGoing
+
+def systematizeVariable(variable, connection=None):
+    """
+    Trim the leading zeros of a single variable and rediscretize it to be
+    monthly.
+
+    Args:
+      variable (str): The SQL name of the variable.
+      connection (sqlite3.Connection, optional): A connection to the database.
+
+    Returns:
+      bool: True if successful, false otherwise.
+    """
+
+    # Open the master database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(MASTER)
+        flag = True
+
+    # Remove the leading zeros and rediscretize.
+    trimLeadingZeros(variable, connection=connection)
+    if variable in SINGULAR:
+        rediscretize(variable, method="singular", connection=connection)
+    else:
+        rediscretize(variable, connection=connection)
+
+    # Close the connection, dropping the cached views of products once the
+    # change is committed.
+    if flag:
+        connection.commit()
+        connection.close()
+        cache.invalidate()
+
+    return True
+
+def systematizeVariables(variables, connection=None):
+    """
+    Systematize only the given variables, such as the ones touched by an
+    import.
+
+    Args:
+      variables (list of str): The SQL names of the variables.
+      connection (sqlite3.Connection, optional): A connection to the database.
+
+    Returns:
+      bool: True if successful, false otherwise.
+    """
+
+    # Open the master database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(MASTER)
+        flag = True
+
+    # Iterate over the non monthly variables.
+    variables = [x for x in variables if x[-8:] != "_monthly" and\
+        x != "forecast"]
+    for variable in variables:
+        systematizeVariable(variable, connection)
+
+    # Rebuild the hierarchy totals of the variables.
+    from forsteri.interface import rollup as irollup
+    irollup.refreshRollup([x + "_monthly" for x in variables],
+        connection=connection)
+
+    # Rebuild the launch curves if the finished goods changed.
+    if "finished_goods" in variables:
+        from forsteri.interface import launch as ilaunch
+        ilaunch.refreshLaunch(connection=connection)
+
+    # Close the connection, dropping the cached views of products once the
+    # change is committed.
+    if flag:
+        connection.commit()
+        connection.close()
+        cache.invalidate()
 
     return True
 
+def forecastDates():
+    """
+    Get the first day of the next occurence of each month, the dates a
+    forecast is made for.
+
+    Returns:
+      list of datetime.date: The dates for January through December.
+    """
+
+    # Find today's date.
+    today = dt.date(1, 1, 1).today()
+
+    # A month that has started is forecast for next year.
+    dates = []
+    for month in range(1, 13):
+        if month > today.month:
+            dates.append(dt.date(today.year, month, 1))
+        else:
+            dates.append(dt.date(today.year + 1, month, 1))
+
+    return dates
+
 def toSQLName(text):
     """
     """
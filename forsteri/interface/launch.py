@@ -0,0 +1,292 @@
+"""
+Launch Curves
+
+Copyright (c) 2014, 2015 Andrew Hawkins
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+
+The launch table in the data database holds the first months of finished
+goods of every product from its first month with any, together with the
+hierarchy attributes of the product, so the analogs of a new item are found
+with a single indexed query. Each curve is stored as its scale, the mean of
+the months held, and the value of each month divided by the scale. Products
+already selling in the first month of the finished goods are left out, since
+they were launched before the history begins and their first months are not
+a launch.
+"""
+
+"""
+Import Declarations
+"""
+import sqlite3
+
+from forsteri.interface import data as idata
+from forsteri.interface import rollup as irollup
+
+"""
+Constant Declarations
+"""
+# The number of months held after a product's launch.
+LENGTH = 12
+
+# The hierarchy attributes held with each curve.
+ATTRIBUTES = ["account", "class", "category", "subcategory"]
+
+# The most products bound in a single statement.
+CHUNK = 400
+
+"""
+Managing The Launch Curves
+"""
+def createLaunch(connection=None):
+    """
+    Create the launch table and its indexes if they do not already exist.
+
+    Args:
+      connection (sqlite3.Connection, optional): A connection to the data
+        database.
+
+    Returns:
+      bool: True if successful, false otherwise.
+    """
+
+    # Open the data database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(idata.MASTER)
+        flag = True
+
+    # Create a cursor from the connection.
+    cursor = connection.cursor()
+
+    # Execute the commands to create the table and its indexes.
+    cursor.execute("""CREATE TABLE IF NOT EXISTS launch (
+`product` TEXT NOT NULL UNIQUE,
+`account` TEXT,
+`class` TEXT,
+`category` TEXT,
+`subcategory` TEXT,
+`launched` TEXT,
+`scale` REAL,
+{m}
+)""".format(m=",\n".join(["`month_{i}` REAL".format(i=i) for i in\
+        range(1, LENGTH + 1)])))
+    cursor.execute("""CREATE INDEX IF NOT EXISTS launch_class ON launch
+(class, category, subcategory)""")
+    cursor.execute("""CREATE INDEX IF NOT EXISTS launch_category ON launch
+(category, subcategory)""")
+
+    # Close the cursor.
+    cursor.close()
+
+    # Commit the change to the database and close the connection.
+    if flag:
+        connection.commit()
+        connection.close()
+
+    return True
+
+def refreshLaunch(products=None, connection=None):
+    """
+    Rebuild the launch curves of some products, or of every product. Attaching
+    the master database commits any open transaction on the connection.
+
+    Args:
+      products (list of str, optional): The products to rebuild, all if None.
+      connection (sqlite3.Connection, optional): A connection to the data
+        database.
+
+    Returns:
+      int: The number of curves rebuilt.
+    """
+
+    # Open the data database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(idata.MASTER)
+        flag = True
+
+    # Make sure the table exists and the master database is attached.
+    createLaunch(connection)
+    irollup.attachMaster(connection)
+
+    # Create a cursor from the connection.
+    cursor = connection.cursor()
+
+    # There are no curves without finished goods.
+    cursor.execute("""SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND
+name='finished_goods_monthly'""")
+    if cursor.fetchone()[0] == 0:
+        cursor.close()
+        if flag:
+            connection.commit()
+            connection.close()
+
+        return 0
+
+    # The command selecting the first months of each product with its
+    # attributes, scanning the finished goods once against the launch dates
+    # and leaving out the products selling since the history began.
+    select = """SELECT f.product, f.date, f.value, l.launched, {a} FROM
+finished_goods_monthly AS f CROSS JOIN (SELECT product, MIN(date) AS launched
+FROM finished_goods_monthly WHERE value IS NOT NULL AND value!=0{{w}} GROUP
+BY product HAVING MIN(date)>(SELECT MIN(date) FROM finished_goods_monthly
+WHERE value IS NOT NULL AND value!=0)) AS l ON l.product=f.product LEFT JOIN
+info.information AS i ON i.product=f.product WHERE f.value IS NOT NULL AND
+f.date>=l.launched AND f.date<date(l.launched, '+{n} months'){{v}}""".format(
+        a=", ".join(["i." + x for x in ATTRIBUTES]), n=LENGTH)
+
+    # Read every product at once or the products in chunks.
+    if products is None:
+        cursor.execute("""DELETE FROM launch""")
+        cursor.execute(select.format(w='', v=''))
+        rows = cursor.fetchall()
+    else:
+        rows = []
+        for first in range(0, len(products), CHUNK):
+            chunk = products[first : first + CHUNK]
+            marks = ", ".join(['?'] * len(chunk))
+            cursor.execute("""DELETE FROM launch WHERE product IN
+({m})""".format(m=marks), chunk)
+            cursor.execute(select.format(w=" AND product IN ({m})".format(
+                m=marks), v=" AND f.product IN ({m})".format(m=marks)),
+                chunk + chunk)
+            rows.extend(cursor.fetchall())
+
+    # Gather the months of each product by their distance from its launch.
+    curves = {}
+    for row in rows:
+        (product, date, value, launched) = row[0 : 4]
+        if product not in curves:
+            curves[product] = [launched] + list(row[4 :]) + [None] * LENGTH
+        month = (int(date[0 : 4]) - int(launched[0 : 4])) * 12 +\
+            int(date[5 : 7]) - int(launched[5 : 7])
+        if month < 0 or month >= LENGTH:
+            continue
+        curves[product][1 + len(ATTRIBUTES) + month] = value
+
+    # Scale each curve by its mean.
+    values = []
+    for (product, curve) in curves.items():
+        months = curve[1 + len(ATTRIBUTES) :]
+        held = [x for x in months if x is not None]
+        scale = sum(held) / float(len(held))
+        values.append([product] + curve[1 : 1 + len(ATTRIBUTES)] +\
+            [curve[0], scale] + [None if x is None or scale == 0 else\
+            x / scale for x in months])
+
+    # Add the curves.
+    cursor.executemany("""INSERT INTO launch (product, {a}, launched, scale,
+{m}) VALUES ({v})""".format(a=", ".join(ATTRIBUTES),
+        m=", ".join(["month_" + str(i) for i in range(1, LENGTH + 1)]),
+        v=", ".join(['?'] * (3 + len(ATTRIBUTES) + LENGTH))), values)
+
+    # Close the cursor.
+    cursor.close()
+
+    # Commit the change to the database and close the connection.
+    if flag:
+        connection.commit()
+        connection.close()
+
+    return len(values)
+
+def getAnalogs(sieve, connection=None):
+    """
+    Get the launch curves of the products with the given attributes.
+
+    Args:
+      sieve (dict of {str: str}): The title of each attribute to match, an
+        empty title matching any.
+      connection (sqlite3.Connection, optional): A connection to the data
+        database.
+
+    Returns:
+      list of tuple: The product, launch date, scale, and scaled value of
+        each month after launch, None where there is none, of each analog in
+        order of product.
+    """
+
+    # Open the data database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(idata.MASTER)
+        flag = True
+
+    # Make sure the table exists.
+    createLaunch(connection)
+
+    # Keep the attributes that are given.
+    keys = [key for key in ATTRIBUTES if sieve.get(key, '') not in ['',
+        None]]
+    where = " AND ".join([key + "=?" for key in keys]) or "1"
+
+    # Create a cursor from the connection.
+    cursor = connection.cursor()
+
+    # Execute the command to select the curves.
+    cursor.execute("""SELECT product, launched, scale, {m} FROM launch WHERE
+{w} ORDER BY product""".format(m=", ".join(["month_" + str(i) for i in\
+        range(1, LENGTH + 1)]), w=where), [sieve[key] for key in keys])
+
+    # Fetch the curves.
+    analogs = cursor.fetchall()
+
+    # Close the cursor.
+    cursor.close()
+
+    # Close the connection.
+    if flag:
+        connection.close()
+
+    return analogs
+
+def countLaunch(connection=None):
+    """
+    Get the number of launch curves held.
+
+    Args:
+      connection (sqlite3.Connection, optional): A connection to the data
+        database.
+
+    Returns:
+      int: The number of curves.
+    """
+
+    # Open the data database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(idata.MASTER)
+        flag = True
+
+    # Make sure the table exists.
+    createLaunch(connection)
+
+    # Count the curves.
+    cursor = connection.cursor()
+    cursor.execute("""SELECT COUNT(*) FROM launch""")
+    count = cursor.fetchone()[0]
+    cursor.close()
+
+    # Close the connection.
+    if flag:
+        connection.close()
+
+    return count
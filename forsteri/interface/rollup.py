@@ -0,0 +1,399 @@
+"""
+Hierarchy Rollup
+
+Copyright (c) 2014, 2015 Andrew Hawkins
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+The rollup table in the data database holds the monthly sum and count of
+every monthly variable and forecast method for each title of each tier of the
+hierarchy. Forecast methods are stored under the variable forecast_<method>.
+The table is rebuilt by joining the information table of the master database
+with the data, either entirely or only for the titles of some products.
+"""
+
+"""
+Import Declarations
+"""
+import sqlite3
+
+from forsteri.interface import data as idata
+from forsteri.interface import sql as isql
+
+"""
+Constant Declarations
+"""
+# The tiers of the hierarchy that are rolled up.
+TIERS = ["account", "class", "category", "subcategory"]
+
+# The prefix of the variables holding a forecast method.
+FORECAST = "forecast_"
+
+# The most titles or products bound in a single statement.
+CHUNK = 400
+
+"""
+Managing The Rollup
+"""
+def createRollup(connection=None):
+    """
+    Create the rollup table if it does not already exist.
+
+    Args:
+      connection (sqlite3.Connection, optional): A connection to the data
+        database.
+
+    Returns:
+      bool: True if successful, false otherwise.
+    """
+
+    # Open the data database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(idata.MASTER)
+        flag = True
+
+    # Create a cursor from the connection.
+    cursor = connection.cursor()
+
+    # Execute the command to create the table.
+    cursor.execute("""CREATE TABLE IF NOT EXISTS rollup (
+`tier` TEXT NOT NULL,
+`title` TEXT NOT NULL,
+`variable` TEXT NOT NULL,
+`date` TEXT NOT NULL,
+`total` REAL,
+`count` INTEGER,
+UNIQUE(`tier`, `title`, `variable`, `date`)
+)""")
+
+    # Close the cursor.
+    cursor.close()
+
+    # Commit the change to the database and close the connection.
+    if flag:
+        connection.commit()
+        connection.close()
+
+    return True
+
+def refreshRollup(variables=None, products=None, progress=None,
+    connection=None, titles=None):
+    """
+    Rebuild the rollup of some variables, either entirely or only for the
+    titles the given products belong to and the titles given. Attaching the
+    master database commits any open transaction on the connection.
+
+    Args:
+      variables (list of str, optional): The monthly variables and forecast
+        variables to rebuild, all if None.
+      products (list of str, optional): The products whose titles are
+        rebuilt, every title if None and no titles are given.
+      progress (function, optional): Called as progress(percent, message),
+        returning false to stop between variables.
+      connection (sqlite3.Connection, optional): A connection to the data
+        database.
+      titles (dict of {str: list of str}, optional): More titles of each tier
+        to rebuild, such as the titles products were moved out of.
+
+    Returns:
+      bool: True if every variable was rebuilt, false if stopped.
+    """
+
+    # Report nothing if not asked to.
+    if progress is None:
+        progress = lambda percent, message: True
+
+    # Open the data database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(idata.MASTER)
+        flag = True
+
+    # Make sure the table exists and the master database is attached.
+    createRollup(connection)
+    attachMaster(connection)
+
+    # Rebuild every variable if none are given.
+    if variables is None:
+        variables = getSources(connection)
+
+    # Create a cursor from the connection.
+    cursor = connection.cursor()
+
+    # Iterate over the variables and tiers rebuilding each.
+    keepGoing = True
+    for (index, variable) in enumerate(variables):
+        for tier in TIERS:
+            # Find the titles to rebuild, None for every title.
+            if products is None and titles is None:
+                chosen = None
+            else:
+                chosen = set((titles or {}).get(tier, []))
+                if products is not None:
+                    chosen.update(getTitles(tier, products, cursor))
+                chosen = sorted(chosen)
+                if len(chosen) == 0:
+                    continue
+
+            rebuild(tier, variable, chosen, cursor)
+
+        keepGoing = progress(100.0 * (index + 1) / len(variables),
+            "Rolled up " + variable + ".")
+        if not keepGoing:
+            break
+
+    # Close the cursor.
+    cursor.close()
+
+    # Commit the change to the database and close the connection.
+    if flag:
+        connection.commit()
+        connection.close()
+
+    return keepGoing
+
+def getRollup(tier, title, variable, connection=None):
+    """
+    Get the monthly totals of a variable for a title of a tier.
+
+    Args:
+      tier (str): The tier, such as category.
+      title (str): The title within the tier.
+      variable (str): The monthly variable or forecast variable.
+      connection (sqlite3.Connection, optional): A connection to the data
+        database.
+
+    Returns:
+      list of tuple of (str, float, int): The date, total, and number of
+        products with a value for each month, in order of date.
+    """
+
+    # Open the data database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(idata.MASTER)
+        flag = True
+
+    # Make sure the table exists.
+    createRollup(connection)
+
+    # Create a cursor from the connection.
+    cursor = connection.cursor()
+
+    # Execute the command to select the totals.
+    cursor.execute("""SELECT date, total, count FROM rollup WHERE tier=? AND
+title=? AND variable=? ORDER BY date""", (tier, title, variable))
+
+    # Fetch the totals.
+    totals = cursor.fetchall()
+
+    # Close the cursor.
+    cursor.close()
+
+    # Close the connection.
+    if flag:
+        connection.close()
+
+    return totals
+
+def getRollupTitles(tier, connection=None):
+    """
+    Get the titles of a tier that have totals.
+
+    Args:
+      tier (str): The tier, such as category.
+      connection (sqlite3.Connection, optional): A connection to the data
+        database.
+
+    Returns:
+      list of str: The titles in order.
+    """
+
+    # Open the data database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(idata.MASTER)
+        flag = True
+
+    # Make sure the table exists.
+    createRollup(connection)
+
+    # Create a cursor from the connection.
+    cursor = connection.cursor()
+
+    # Execute the command to select the titles.
+    cursor.execute("""SELECT DISTINCT title FROM rollup WHERE tier=? ORDER BY
+title""", (tier,))
+
+    # Fetch the titles.
+    titles = [row[0] for row in cursor.fetchall()]
+
+    # Close the cursor.
+    cursor.close()
+
+    # Close the connection.
+    if flag:
+        connection.close()
+
+    return titles
+
+def getRollupVariables(connection=None):
+    """
+    Get the variables that have totals.
+
+    Args:
+      connection (sqlite3.Connection, optional): A connection to the data
+        database.
+
+    Returns:
+      list of str: The variables in order.
+    """
+
+    # Open the data database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(idata.MASTER)
+        flag = True
+
+    # Make sure the table exists.
+    createRollup(connection)
+
+    # Create a cursor from the connection.
+    cursor = connection.cursor()
+
+    # Execute the command to select the variables.
+    cursor.execute("""SELECT DISTINCT variable FROM rollup ORDER BY
+variable""")
+
+    # Fetch the variables.
+    variables = [row[0] for row in cursor.fetchall()]
+
+    # Close the cursor.
+    cursor.close()
+
+    # Close the connection.
+    if flag:
+        connection.close()
+
+    return variables
+
+"""
+Helper Functions
+"""
+def attachMaster(connection):
+    """
+    Attach the master database to a connection to the data database as info,
+    unless it is already attached.
+    """
+
+    # Check the attached databases.
+    cursor = connection.cursor()
+    cursor.execute("""PRAGMA database_list""")
+    attached = [row[1] for row in cursor.fetchall()]
+
+    # Attaching is not allowed within a transaction.
+    if "info" not in attached:
+        connection.commit()
+        cursor.execute("""ATTACH DATABASE ? AS info""", (isql.MASTER,))
+
+    cursor.close()
+
+    return True
+
+def getSources(connection):
+    """
+    Get every variable that can be rolled up, the monthly variables and a
+    forecast variable for each forecast method.
+
+    Returns:
+      list of str: The variables.
+    """
+
+    # Find the monthly variables.
+    sources = sorted([x for x in idata.getVariables(connection) if\
+        x[-8:] == "_monthly"])
+
+    # Find the forecast methods from the columns of the forecast table.
+    cursor = connection.cursor()
+    cursor.execute("""PRAGMA table_info(forecast)""")
+    methods = [row[1] for row in cursor.fetchall() if row[1] not in\
+        ["date", "product"] and not row[1].endswith("_error")]
+    cursor.close()
+
+    return sources + [FORECAST + method for method in methods]
+
+def getTitles(tier, products, cursor):
+    """
+    Get the titles of a tier that the products belong to.
+
+    Returns:
+      list of str: The titles.
+    """
+
+    titles = set()
+    for first in range(0, len(products), CHUNK):
+        chunk = products[first : first + CHUNK]
+        cursor.execute("""SELECT DISTINCT {t} FROM info.information WHERE
+{t} IS NOT NULL AND {t}!='' AND product IN ({m})""".format(t=tier,
+            m=", ".join(['?'] * len(chunk))), chunk)
+        titles.update([row[0] for row in cursor.fetchall()])
+
+    return sorted(titles)
+
+def rebuild(tier, variable, titles, cursor):
+    """
+    Replace the totals of a variable for some titles of a tier, or for every
+    title if titles is None.
+    """
+
+    # Select the values from the forecast table or a variable table.
+    if variable.startswith(FORECAST):
+        source = """SELECT product, date, {m} AS value FROM forecast WHERE {m}
+IS NOT NULL""".format(m=variable[len(FORECAST):])
+    else:
+        source = """SELECT product, date, value FROM {v} WHERE value IS NOT
+NULL""".format(v=variable)
+
+    # The command summing the values of each title by month.
+    insert = """INSERT INTO rollup (tier, title, variable, date, total, count)
+SELECT ?, i.{t}, ?, d.date, SUM(d.value), COUNT(d.value) FROM ({s}) AS d JOIN
+info.information AS i ON i.product=d.product WHERE i.{t} IS NOT NULL AND
+i.{t}!=''{w} GROUP BY i.{t}, d.date"""
+
+    # Rebuild every title at once.
+    if titles is None:
+        cursor.execute("""DELETE FROM rollup WHERE tier=? AND variable=?""",
+            (tier, variable))
+        cursor.execute(insert.format(t=tier, s=source, w=''),
+            (tier, variable))
+
+        return True
+
+    # Otherwise rebuild the titles in chunks.
+    for first in range(0, len(titles), CHUNK):
+        chunk = titles[first : first + CHUNK]
+        marks = ", ".join(['?'] * len(chunk))
+        cursor.execute("""DELETE FROM rollup WHERE tier=? AND variable=? AND
+title IN ({m})""".format(m=marks), [tier, variable] + chunk)
+        cursor.execute(insert.format(t=tier, s=source,
+            w=" AND i.{t} IN ({m})".format(t=tier, m=marks)),
+            [tier, variable] + chunk)
+
+    return True
@@ -0,0 +1,346 @@
+"""
+Product Search Index
+
+Copyright (c) 2014, 2015 Andrew Hawkins
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+"""
+Import Declarations
+"""
+import bisect
+
+from forsteri.interface import sql as isql
+
+"""
+Constant Declarations
+"""
+# The attributes of a product in the order of the information table.
+LABELS = ["product", "sku", "account", "class", "category", "subcategory"]
+
+# The attributes searched by prefix.
+PREFIXES = ["product", "sku"]
+
+# The attributes searched by exact value.
+TIERS = ["account", "class", "category", "subcategory"]
+
+"""
+Product Index
+"""
+class ProductIndex(object):
+    """
+    An in memory index of the information table. Product and sku are kept in
+    sorted arrays searched by bisection and the hierarchy tiers are kept as
+    sets of products for each title, so a search only touches the products
+    that match. The index has to be kept in sync with the database by calling
+    add, set, and remove alongside the sql functions of the same purpose.
+    """
+
+    def __init__(self):
+        """
+        Initialize an empty index.
+
+        Returns:
+          ProductIndex
+        """
+
+        # The data of each product in the order of LABELS.
+        self.rows = {}
+
+        # The sorted (lower case value, product) pairs for each prefix.
+        self.keys = dict([(label, []) for label in PREFIXES])
+
+        # The products for each title of each tier.
+        self.tiers = dict([(label, {}) for label in TIERS])
+
+        # The last search, used to answer a longer prefix incrementally.
+        self.last = None
+
+    def load(self, connection=None):
+        """
+        Load the index from the information table, replacing its contents.
+
+        Args:
+          connection (sqlite3.Connection, optional): A connection to the
+            master database.
+
+        Returns:
+          int: The number of products loaded.
+        """
+
+        # Empty the index.
+        self.__init__()
+
+        # Get all of the products from the database.
+        data = isql.getAllData(connection)
+
+        # Add the rows then sort the prefix arrays once.
+        for row in data:
+            self.insert(row, False)
+        for label in PREFIXES:
+            self.keys[label].sort()
+
+        return len(data)
+
+    def add(self, productData, overwrite=False):
+        """
+        Add a product to the index.
+
+        Args:
+          productData (dict of {str: str}): The product in the form given to
+            isql.addProduct.
+          overwrite (bool, optional): True if an existing product is replaced
+            by the new data, false otherwise.
+
+        Returns:
+          bool: True if the product was added, false otherwise.
+        """
+
+        # Check that a product was given.
+        product = productData.get("product")
+        if product is None or product == '':
+            return False
+
+        # Only replace an existing product if requested.
+        if product in self.rows:
+            if not overwrite:
+                return False
+
+            return self.set(product, productData)
+
+        # Insert the product in place.
+        self.insert([toValue(productData.get(label)) for label in LABELS])
+
+        return True
+
+    def set(self, product, productData):
+        """
+        Change the attributes of a product in the index.
+
+        Args:
+          product (str): The product currently in the index.
+          productData (dict of {str: str}): The changed attributes in the form
+            given to isql.setProduct.
+
+        Returns:
+          bool: True if successful, false otherwise.
+        """
+
+        # Check that the product is in the index.
+        if product not in self.rows:
+            return False
+
+        # Find the new row, taking a new name if one is given.
+        row = list(self.rows[product])
+        for (key, value) in productData.items():
+            if key in LABELS:
+                row[LABELS.index(key)] = toValue(value)
+
+        # Replace the old row with the new.
+        self.remove(product)
+        self.insert(row)
+
+        return True
+
+    def remove(self, product):
+        """
+        Remove a product from the index.
+
+        Args:
+          product (str): The product to be removed.
+
+        Returns:
+          bool: True if successful, false otherwise.
+        """
+
+        # Check that the product is in the index.
+        row = self.rows.pop(product, None)
+        if row is None:
+            return False
+
+        # Remove the product from each prefix array.
+        for label in PREFIXES:
+            keys = self.keys[label]
+            pair = (row[LABELS.index(label)].lower(), product)
+            index = bisect.bisect_left(keys, pair)
+            if index < len(keys) and keys[index] == pair:
+                del keys[index]
+
+        # Remove the product from each tier.
+        for label in TIERS:
+            titles = self.tiers[label]
+            value = row[LABELS.index(label)]
+            titles[value].discard(product)
+            if len(titles[value]) == 0:
+                del titles[value]
+
+        self.last = None
+
+        return True
+
+    def search(self, sieve):
+        """
+        Get the data after filtering with a sieve. Product and sku are matched
+        by case insensitive prefix and the tiers are matched exactly, as in
+        isql.getData.
+
+        Args:
+          sieve (dict of str: str): The values to match for each attribute,
+            empty or None to match anything.
+
+        Returns:
+          list of list of str: The data for each product satisfying the sieve
+            in order of the searched prefix.
+        """
+
+        # Find the prefix to search by, product if neither is given.
+        prefixes = [(label, sieve.get(label).lower()) for label in PREFIXES\
+            if sieve.get(label)]
+        if len(prefixes) == 0:
+            prefixes = [("product", '')]
+        (label, prefix) = prefixes[0]
+
+        # Find the tiers to filter by.
+        filters = tuple([(key, sieve.get(key)) for key in TIERS if\
+            sieve.get(key)])
+
+        # Answer incrementally if the prefix extends the last search, unless
+        # the last search was everything.
+        last = self.last
+        if last is not None and last[0] == label and last[1] == filters and\
+            prefix.startswith(last[2]) and (last[2] != '' or filters):
+            column = LABELS.index(label)
+            products = [x for x in last[3] if\
+                self.rows[x][column].lower().startswith(prefix)]
+        else:
+            products = self.match(label, prefix, filters)
+
+        # Remember the search.
+        self.last = (label, filters, prefix, products)
+
+        # Apply any further prefixes.
+        rows = [self.rows[x] for x in products]
+        for (label, prefix) in prefixes[1:]:
+            column = LABELS.index(label)
+            rows = [row for row in rows if\
+                row[column].lower().startswith(prefix)]
+
+        return [list(row) for row in rows]
+
+    def count(self):
+        """
+        """
+
+        return len(self.rows)
+
+    """
+    Helper Functions
+    """
+    def insert(self, row, ordered=True):
+        """
+        Insert a row into the index.
+
+        Args:
+          row (list of str): The data of the product in the order of LABELS.
+          ordered (bool, optional): True if the prefix arrays are kept sorted,
+            false if they will be sorted afterward.
+
+        Returns:
+          None
+        """
+
+        product = row[0]
+        self.rows[product] = row
+
+        # Add the product to each prefix array.
+        for label in PREFIXES:
+            pair = (row[LABELS.index(label)].lower(), product)
+            if ordered:
+                bisect.insort(self.keys[label], pair)
+            else:
+                self.keys[label].append(pair)
+
+        # Add the product to each tier.
+        for label in TIERS:
+            self.tiers[label].setdefault(row[LABELS.index(label)],
+                set()).add(product)
+
+        self.last = None
+
+    def match(self, label, prefix, filters):
+        """
+        Find the products with a prefix that are in every filtered tier.
+
+        Returns:
+          list of str: The products in order of the prefix.
+        """
+
+        # Find the sets of products in each filtered tier, smallest first.
+        sets = sorted([self.tiers[key].get(value, set()) for (key, value) in\
+            filters], key=len)
+
+        # With no prefix intersect the tiers rather than walk everything.
+        if prefix == '' and len(sets) > 0:
+            column = LABELS.index(label)
+            products = set.intersection(*sets)
+
+            return sorted(products,
+                key=lambda x: (self.rows[x][column].lower(), x))
+
+        # Find the run of keys starting with the prefix.
+        keys = self.keys[label]
+        first = bisect.bisect_left(keys, (prefix,))
+        last = findEnd(keys, prefix, first)
+        products = [pair[1] for pair in keys[first : last]]
+
+        # Keep only the products in every filtered tier.
+        for titles in sets:
+            products = [x for x in products if x in titles]
+
+        return products
+
+"""
+Helper Functions
+"""
+def toValue(value):
+    """
+    Convert a value to how it is shown, with NULL as an empty string.
+    """
+
+    if value is None:
+        return ''
+
+    return value
+
+def findEnd(keys, prefix, first):
+    """
+    Find the index after the last key starting with a prefix by bisection,
+    given the index of the first.
+    """
+
+    (low, high) = (first, len(keys))
+    while low < high:
+        middle = (low + high) // 2
+        if keys[middle][0].startswith(prefix):
+            low = middle + 1
+        else:
+            high = middle
+
+    return low
@@ -31,6 +31,7 @@ import re
 import sqlite3
 import sys
 
+from forsteri.interface import cache
 from forsteri.interface import data as idata
 
 """
@@ -42,6 +43,16 @@ elif os.name == "posix":
     DATA = "/mnt/forecastdb/"
 MASTER = ''.join([DATA, "master.db"])
 
+# The attributes of a product in the order of the information table.
+ATTRIBUTES = ["product", "sku", "account", "class", "category",
+    "subcategory"]
+
+# The most products bound in a single statement.
+CHUNK = 400
+
+# True if the SQLite library supports an upsert, added in version 3.24.
+UPSERT = sqlite3.sqlite_version_info >= (3, 24, 0)
+
 """
 Product Information
 """
@@ -289,17 +300,21 @@ def addProduct(productData, connection=None):
         connection.commit()
         connection.close()
 
+        # Drop the cached views of products once the change is committed.
+        cache.invalidate()
+
     return True
 
-def addProducts(newProducts, data, overwrite=False, connection=None):
+def addProducts(data, overwrite=False, connection=None):
     """
-    Add many product tuples to the database.
+    Add many products to the database in bulk. Empty values are stored as
+    NULL for new products and as empty strings when overwriting.
 
     Args:
-      newProducts (list of str): The list of new products.
-      data (list of dict of str: str): The list of new data housed in
+      data (iterable of dict of str: str): The new data housed in
         dictionaries in the form {"product": ?, "sku": ?, "account": ?,
-        "class": ?, "category": ?, "subcategory": ?}.
+        "class": ?, "category": ?, "subcategory": ?}, which may be a
+        generator so a file is streamed rather than read at once.
       overwrite (bool, optional): True if data already in the database
         should be overwritten with the new data, false otherwise.
       connection (sqlite3.Connection, optional): A connection to the database.
@@ -308,62 +323,39 @@ def addProducts(newProducts, data, overwrite=False, connection=None):
       bool: True if successful, false otherwise.
     """
 
-    # Get the list of old products.
-    oldProducts = getAttribute("product", connection)
-
-    # Convert the new products to be a set.
-    newProductsSet = set(newProducts)
-
-    # Find the difference between the old and new data.
-    addProducts = newProductsSet.difference(oldProducts)
-
-    # Find the intersection of the old and new data.
-    setProducts = newProductsSet.intersection(oldProducts)
-
-    # Open the master database if it is not supplied.
+    # Open the master database if it is not supplied, keeping the titles
+    # of every product to find the ones that move.
     flag = False
     if connection is None:
         connection = sqlite3.connect(MASTER)
         flag = True
+        old = getClassification(connection=connection)
 
     # Create a cursor from the connection.
     cursor = connection.cursor()
 
-    # Iterate over the rows in the input data.
-    for productData in data:
-        if productData["product"] in addProducts:
-            # Initlialize the attribute and value lists.
-            attrs = []
-            values = []
-
-            # Iterate over the inputted values and extract attributes.
-            for (key, value) in productData.items():
-                if value is None or value == '':
-                    continue
-                else:
-                    attrs.append(key)
-                    values.append(value)
-
-            # Convert to a valid string removing unnecessary characters.
-            if len(attrs) == 1:
-                attrs = re.sub("[',]", '', str(tuple(attrs)))
-                values = re.sub(",", '', str(tuple(values)))
-            else:
-                attrs = re.sub("'", '', str(tuple(attrs)))
-                values = str(tuple(values))
-
-            # Execute the command to write the new data to the database.
-            cursor.execute("""INSERT INTO information {a} VALUES {v}""".\
-                format(a=attrs, v=values))
-        elif overwrite:
-            # Set up the product for input
-            productInput = "'" + productData["product"] + "'"
-
-            # Iterate over the inputted values and update then in the database.
-            for (key, value) in productData.items():
-                change = key + "='" + value + "'"
-                cursor.execute("""UPDATE information SET {c} WHERE product={p}
-""".format(c=change, p=productInput))
+    # Create the commands, inserting empty values as NULL.
+    columns = ", ".join(ATTRIBUTES)
+    marks = ", ".join(["NULLIF(?, '')"] * len(ATTRIBUTES))
+    changes = ", ".join(["{a}=IFNULL(excluded.{a}, '')".format(a=x) for x in\
+        ATTRIBUTES[1:]])
+
+    # Execute the command to add or update the products in one statement,
+    # or update the old then insert the new on an older SQLite.
+    if UPSERT and overwrite:
+        cursor.executemany("""INSERT INTO information ({c}) VALUES ({m})
+ON CONFLICT(product) DO UPDATE SET {s}""".format(c=columns, m=marks,
+            s=changes), toRows(data))
+    elif overwrite:
+        rows = list(toRows(data))
+        cursor.executemany("""UPDATE information SET {s} WHERE product=?""".\
+            format(s=", ".join([x + "=?" for x in ATTRIBUTES[1:]])),
+            [row[1:] + row[0 : 1] for row in rows])
+        cursor.executemany("""INSERT OR IGNORE INTO information ({c})
+VALUES ({m})""".format(c=columns, m=marks), rows)
+    else:
+        cursor.executemany("""INSERT OR IGNORE INTO information ({c})
+VALUES ({m})""".format(c=columns, m=marks), toRows(data))
 
     # Close the cursor.
     cursor.close()
@@ -373,6 +365,11 @@ def addProducts(newProducts, data, overwrite=False, connection=None):
         connection.commit()
         connection.close()
 
+        # Drop the cached views of products once the change is committed and
+        # rebuild the totals of the titles products moved between.
+        cache.invalidate()
+        refreshHierarchy(old, getClassification())
+
     return True
 
 def getProductData(product, connection=None):
@@ -484,11 +481,13 @@ def setProduct(product, productData, connection=None):
       bool: True if successful, false otherwise.
     """
 
-    # Open the master database if it is not supplied.
+    # Open the master database if it is not supplied, keeping the titles of
+    # the product to find whether it moves.
     flag = False
     if connection is None:
         connection = sqlite3.connect(MASTER)
         flag = True
+        old = getClassification([product], connection)
 
     # Create a cursor from the connection.
     cursor = connection.cursor()
@@ -514,50 +513,72 @@ def setProduct(product, productData, connection=None):
     if "product" in productData:
         idata.changeName(product, productData["product"])
 
+    # Drop the cached views of products once the change is committed and
+    # rebuild the totals of the titles the product moved between.
+    if flag:
+        cache.invalidate()
+        refreshHierarchy(old, getClassification([productData.get("product",
+            product)]))
+
     return True
 
 def setProducts(products, productData, connection=None):
     """
     Set a group of product's to have the same tuple (except unique) in the
-    database.
+    database. The products are written to a temporary table and changed by a
+    single update joined to it.
 
     Args:
-      product (str): The product currently in the database.
+      products (list of str): The products currently in the database.
       productData (dict of {str: str}): A tuple to add to the database. Must
         be of the form {"product": ?, "sku": ?, "account": ?, "class": ?,
-        "category": ?, "subcategory": ?}. Use None to set attributes to be
-        NULL.
+        "category": ?, "subcategory": ?}. Empty strings are left unchanged.
+        Use None to set attributes to be NULL.
       connection (sqlite3.Connection, optional): A connection to the database.
 
     Returns:
-      bool: True if successful, false otherwise.
+      int: The number of products changed, 0 if product or sku is given.
     """
 
-    # Check if product or sku is defined in the input data, if so return false.
-    if productData["product"] != '' or productData["sku"] != '':
-        return False
-
-    # Define the input string for all products.
-    change = ''
-    for (key, value) in productData.items():
-        if value != '':
-            change = ''.join([change, ", ", key, "='", value, "'"])
+    # Check if product or sku is defined in the input data, if so return.
+    if productData.get("product", '') != '' or\
+        productData.get("sku", '') != '':
+        return 0
 
-    change = change[2:]
+    # Find the attributes to change.
+    changes = [(key, value) for (key, value) in sorted(productData.items())\
+        if value != '']
+    if len(changes) == 0:
+        return 0
 
-    # Open the master database if it is not supplied.
+    # Open the master database if it is not supplied, keeping the titles of
+    # the products to find the ones that move.
     flag = False
     if connection is None:
         connection = sqlite3.connect(MASTER)
         flag = True
+        old = getClassification(products, connection)
+
+    # Make sure the temporary table of products exists.
+    createSelection(connection)
 
     # Create a cursor from the connection.
     cursor = connection.cursor()
 
-    # Iterate over the inputted products and change the data.
-    for product in products:
-        cursor.execute("""UPDATE information SET {c} WHERE product='{p}'""".\
-            format(c=change, p=product))
+    # Fill the temporary table with the products.
+    cursor.execute("""DELETE FROM selection""")
+    cursor.executemany("""INSERT OR IGNORE INTO selection VALUES (?)""",
+        [(product,) for product in products])
+
+    # Execute the command to change every product at once.
+    cursor.execute("""UPDATE information SET {c}
+WHERE product IN (SELECT product FROM selection)""".format(\
+        c=", ".join([key + "=?" for (key, value) in changes])),
+        [value for (key, value) in changes])
+    count = cursor.rowcount
+
+    # Empty the temporary table.
+    cursor.execute("""DELETE FROM selection""")
 
     # Close the cursor.
     cursor.close()
@@ -567,6 +588,41 @@ def setProducts(products, productData, connection=None):
         connection.commit()
         connection.close()
 
+        # Drop the cached views of products once the change is committed and
+        # rebuild the totals of the titles products moved between.
+        cache.invalidate()
+        refreshHierarchy(old, getClassification(products))
+
+    return count
+
+def createSelection(connection):
+    """
+    Create the temporary table of products used to change many products at
+    once, if the connection does not have it yet. Creating a table commits
+    any open transaction, so a connection held open across edits should
+    create it as soon as it is opened.
+
+    Args:
+      connection (sqlite3.Connection): A connection to the database.
+
+    Returns:
+      bool: True if successful, false otherwise.
+    """
+
+    # Create a cursor from the connection.
+    cursor = connection.cursor()
+
+    # Check whether the table exists without starting a statement that
+    # commits.
+    cursor.execute("""SELECT name FROM sqlite_temp_master
+WHERE type='table' AND name='selection'""")
+    if cursor.fetchone() is None:
+        cursor.execute("""CREATE TEMP TABLE selection
+(product TEXT PRIMARY KEY)""")
+
+    # Close the cursor.
+    cursor.close()
+
     return True
 
 def removeProduct(product, connection=None):
@@ -605,8 +661,95 @@ def removeProduct(product, connection=None):
         connection.commit()
         connection.close()
 
+        # Drop the cached views of products once the change is committed.
+        cache.invalidate()
+
     return True
 
+def getClassification(products=None, connection=None):
+    """
+    Get the titles of each tier of the hierarchy some products belong to, or
+    every product, so a change can be compared with them.
+
+    Args:
+      products (list of str, optional): The products, all if None.
+      connection (sqlite3.Connection, optional): A connection to the database.
+
+    Returns:
+      dict of {str: tuple of str}: The account, class, category, and
+        subcategory of each product found.
+    """
+
+    # Open the master database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(MASTER)
+        flag = True
+
+    # Create a cursor from the connection.
+    cursor = connection.cursor()
+
+    # Execute the command to select the titles of every product at once or
+    # of the products in chunks.
+    select = """SELECT product, account, class, category, subcategory FROM
+information"""
+    data = []
+    if products is None:
+        cursor.execute(select)
+        data = cursor.fetchall()
+    else:
+        for first in range(0, len(products), CHUNK):
+            chunk = products[first : first + CHUNK]
+            cursor.execute(select + """ WHERE product IN ({m})""".format(
+                m=", ".join(['?'] * len(chunk))), chunk)
+            data.extend(cursor.fetchall())
+
+    # Close the cursor.
+    cursor.close()
+
+    # Close the connection.
+    if flag:
+        connection.close()
+
+    return {row[0]: tuple(row[1 :]) for row in data}
+
+def refreshHierarchy(old, new):
+    """
+    Rebuild the hierarchy totals of the products added, removed, or moved
+    between titles by a committed change, for both the titles they left and
+    the titles they joined.
+
+    Args:
+      old (dict of {str: tuple of str}): The titles of the products before
+        the change, as given by getClassification.
+      new (dict of {str: tuple of str}): The titles of the products after the
+        change.
+
+    Returns:
+      int: The number of products whose titles changed.
+    """
+
+    # Import the rollup here, since it imports this module.
+    from forsteri.interface import rollup as irollup
+
+    # Find the products whose titles changed.
+    moved = sorted([product for product in set(old) | set(new) if\
+        old.get(product) != new.get(product)])
+    if len(moved) == 0:
+        return 0
+
+    # Find the titles of each tier the products left.
+    left = {}
+    for (index, tier) in enumerate(irollup.TIERS):
+        left[tier] = sorted(set([old[product][index] for product in moved if\
+            product in old]) - set([None, '']))
+
+    # Rebuild the titles left and the titles the products are now in.
+    irollup.refreshRollup(products=[product for product in moved if product\
+        in new], titles=left)
+
+    return len(moved)
+
 """
 Hierarchy
 """
@@ -635,6 +778,9 @@ def addTitle(tier, title, connection=None):
         connection.commit()
         connection.close()
 
+        # Drop the cached views of products once the change is committed.
+        cache.invalidate()
+
     return True
 
 def setTitle(tier, oldTitle, newTitle, connection=None):
@@ -666,6 +812,9 @@ title='{te1}'""".format(tr=tier, te1=oldTitle, te2=newTitle))
         connection.commit()
         connection.close()
 
+        # Drop the cached views of products once the change is committed.
+        cache.invalidate()
+
     return True
 
 def removeTitle(tier, title, connection=None):
@@ -693,6 +842,9 @@ def removeTitle(tier, title, connection=None):
         connection.commit()
         connection.close()
 
+        # Drop the cached views of products once the change is committed.
+        cache.invalidate()
+
     return True
 
 def getTiers(connection=None):
@@ -958,6 +1110,56 @@ def addMissing(basis, connection=None):
 
     return basisID
 
+def addMissingBases(bases, connection=None):
+    """
+    Add many missing basis to the database at once.
+
+    Args:
+      bases (list of str): The basis values that could not be matched.
+      connection (sqlite3.Connection, optional): A connection to the database.
+
+    Returns:
+      dict of {str: int}: The id of each input basis.
+    """
+
+    # Open the master database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(MASTER)
+        flag = True
+
+    # Create a cursor from the connection.
+    cursor = connection.cursor()
+
+    # Load the unique basis values into a temporary table.
+    cursor.execute("""CREATE TEMP TABLE IF NOT EXISTS missing_load (
+                        `basis` TEXT NOT NULL UNIQUE
+);""")
+    cursor.execute("""DELETE FROM missing_load""")
+    cursor.executemany("""INSERT OR IGNORE INTO missing_load VALUES (?)""",
+        [(basis,) for basis in set(bases)])
+
+    # Execute the command to add all of the missing basis.
+    cursor.execute("""INSERT OR IGNORE INTO missing (basis) SELECT basis FROM
+missing_load""")
+
+    # Execute the command to get the ids of the input basis.
+    cursor.execute("""SELECT missing.basis, missing.id FROM missing INNER JOIN
+missing_load ON missing.basis=missing_load.basis""")
+
+    # Fetch the returned ids.
+    basisIDs = {basis[0]: basis[1] for basis in cursor.fetchall()}
+
+    # Close the cursor.
+    cursor.close()
+
+    # Commit the change to the database and close the connection.
+    if flag:
+        connection.commit()
+        connection.close()
+
+    return basisIDs
+
 def getMissing(connection=None):
     """
     """
@@ -1024,6 +1226,9 @@ def assignMissing(product, sku, connection=None):
         connection.commit()
         connection.close()
 
+        # Drop the cached views of products once the change is committed.
+        cache.invalidate()
+
     return True
 
 """
@@ -1033,9 +1238,10 @@ def addImport(fileInfo, connection=None):
     """
     """
 
-    # Put the inputs into the correct string form.
-    columns = str(tuple(fileInfo.keys())).replace("'", '')
-    values = str(tuple([x.encode() for x in fileInfo.values()]))
+    # Put the columns in the correct string form, binding the values.
+    keys = sorted(fileInfo.keys())
+    columns = "(" + ", ".join(keys) + ")"
+    marks = "(" + ", ".join(['?'] * len(keys)) + ")"
 
     # Open the master database if it is not supplied.
     flag = False
@@ -1047,12 +1253,96 @@ def addImport(fileInfo, connection=None):
     cursor = connection.cursor()
 
     # Execute the statement to add the import information.
-    cursor.execute("""INSERT INTO import {c} VALUES {v}""".format(c=columns,
-        v=values))
+    cursor.execute("""INSERT INTO import {c} VALUES {m}""".format(c=columns,
+        m=marks), [fileInfo[key] for key in keys])
+
+    # Get the id of the import added.
+    importID = cursor.lastrowid
+
+    # Close the cursor.
+    cursor.close()
+
+    # Commit the change to the database and close the connection.
+    if flag:
+        connection.commit()
+        connection.close()
+
+    return importID
+
+def createImportHash(connection=None):
+    """
+    Make sure the import table has the hash and timings columns and that the
+    import range table exists.
+
+    Args:
+      connection (sqlite3.Connection, optional): A connection to the database.
+
+    Returns:
+      bool: True if successful, false otherwise.
+    """
+
+    # Open the master database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(MASTER)
+        flag = True
+
+    # Create a cursor from the connection.
+    cursor = connection.cursor()
+
+    # Add the hash and timings columns to the import table.
+    addColumn("import", "hash", "TEXT", connection)
+    addColumn("import", "timings", "TEXT", connection)
+    cursor.execute("""CREATE INDEX IF NOT EXISTS import_hash ON import
+(`hash`)""")
+
+    # Create the table holding the hash of each imported row range.
+    cursor.execute("""CREATE TABLE IF NOT EXISTS import_range (
+                        `import_id` INTEGER NOT NULL,
+                        `first_row` INTEGER NOT NULL,
+                        `last_row` INTEGER NOT NULL,
+                        `hash` TEXT NOT NULL
+);""")
+    cursor.execute("""CREATE INDEX IF NOT EXISTS import_range_hash ON
+import_range (`hash`)""")
+
+    # Close the cursor.
+    cursor.close()
+
+    # Commit the change to the database and close the connection.
+    if flag:
+        connection.commit()
+        connection.close()
+
+    return True
+
+def getImportByHash(digest, connection=None):
+    """
+    Find a previous import of a file with the same content.
+
+    Args:
+      digest (str): The content hash of the file.
+      connection (sqlite3.Connection, optional): A connection to the database.
+
+    Returns:
+      int: The id of the first import with the hash, None if it has not been
+        seen.
+    """
+
+    # Open the master database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(MASTER)
+        flag = True
 
-    # Execute the statement to get the id of the input.
-    cursor.execute("""SELECT id FROM import WHERE date_of_import='{doi}'""".\
-        format(doi=fileInfo["date_of_import"]))
+    # Make sure the hash column exists.
+    createImportHash(connection)
+
+    # Create a cursor from the connection.
+    cursor = connection.cursor()
+
+    # Execute the statement to find the import with the hash.
+    cursor.execute("""SELECT MIN(id) FROM import WHERE hash=?""", (digest,))
 
     # Fetch the returned id.
     importID = cursor.fetchone()[0]
@@ -1067,6 +1357,305 @@ def addImport(fileInfo, connection=None):
 
     return importID
 
+def addImportRanges(importID, ranges, connection=None):
+    """
+    Record the hash of each row range brought in by an import, where each
+    data row is recorded as a range of a single row. The range table must
+    already exist, see createImportHash, so the ranges can be added through
+    a connection the master database is attached to.
+
+    Args:
+      importID (int): The id of the import.
+      ranges (list of tuple of (int, int, str)): The first row, last row, and
+        hash of each range.
+      connection (sqlite3.Connection, optional): A connection to the database.
+
+    Returns:
+      bool: True if successful, false otherwise.
+    """
+
+    # Open the master database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(MASTER)
+        flag = True
+
+    # Create a cursor from the connection.
+    cursor = connection.cursor()
+
+    # Execute the statement to add all of the ranges.
+    cursor.executemany("""INSERT INTO import_range (import_id, first_row,
+last_row, hash) VALUES (?, ?, ?, ?)""", [(importID, first, last, digest) for\
+        (first, last, digest) in ranges])
+
+    # Close the cursor.
+    cursor.close()
+
+    # Commit the change to the database and close the connection.
+    if flag:
+        connection.commit()
+        connection.close()
+
+    return True
+
+def getKnownRanges(hashes, connection=None):
+    """
+    Find which row range hashes have already been imported.
+
+    Args:
+      hashes (list of str): The row range hashes to check.
+      connection (sqlite3.Connection, optional): A connection to the database.
+
+    Returns:
+      set of str: The hashes that have been imported before.
+    """
+
+    # Open the master database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(MASTER)
+        flag = True
+
+    # Make sure the range table exists.
+    createImportHash(connection)
+
+    # Create a cursor from the connection.
+    cursor = connection.cursor()
+
+    # Load the hashes into a temporary table and join against it.
+    cursor.execute("""CREATE TEMP TABLE IF NOT EXISTS range_check (
+                        `hash` TEXT NOT NULL
+);""")
+    cursor.execute("""DELETE FROM range_check""")
+    cursor.executemany("""INSERT INTO range_check VALUES (?)""",
+        [(digest,) for digest in hashes])
+    cursor.execute("""SELECT DISTINCT range_check.hash FROM range_check INNER
+JOIN import_range ON range_check.hash=import_range.hash""")
+
+    # Fetch the returned hashes.
+    known = set([digest[0] for digest in cursor.fetchall()])
+
+    # Close the cursor.
+    cursor.close()
+
+    # Commit the change to the database and close the connection.
+    if flag:
+        connection.commit()
+        connection.close()
+
+    return known
+
+def setImportTimings(importID, timings, connection=None):
+    """
+    Store the stage timings of an import.
+
+    Args:
+      importID (int): The id of the import.
+      timings (str): The stage timings encoded as JSON.
+      connection (sqlite3.Connection, optional): A connection to the database.
+
+    Returns:
+      bool: True if successful, false otherwise.
+    """
+
+    # Open the master database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(MASTER)
+        flag = True
+
+    # Make sure the timings column exists.
+    createImportHash(connection)
+
+    # Create a cursor from the connection.
+    cursor = connection.cursor()
+
+    # Execute the statement to set the timings.
+    cursor.execute("""UPDATE import SET timings=? WHERE id=?""", (timings,
+        importID))
+
+    # Close the cursor.
+    cursor.close()
+
+    # Commit the change to the database and close the connection.
+    if flag:
+        connection.commit()
+        connection.close()
+
+    return True
+
+def getImportTimings(count=10, connection=None):
+    """
+    Get the stage timings of the latest imports.
+
+    Args:
+      count (int, optional): The number of imports to return.
+      connection (sqlite3.Connection, optional): A connection to the database.
+
+    Returns:
+      list of tuple of (int, str, str, str): The id, location, date of import,
+        and JSON encoded timings of each import, latest first.
+    """
+
+    # Open the master database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(MASTER)
+        flag = True
+
+    # Make sure the timings column exists.
+    createImportHash(connection)
+
+    # Create a cursor from the connection.
+    cursor = connection.cursor()
+
+    # Execute the statement to get the timings.
+    cursor.execute("""SELECT id, location, date_of_import, timings FROM import
+WHERE timings IS NOT NULL ORDER BY id DESC LIMIT ?""", (count,))
+
+    # Fetch the returned data.
+    timings = cursor.fetchall()
+
+    # Close the cursor.
+    cursor.close()
+
+    # Commit the change to the database and close the connection.
+    if flag:
+        connection.commit()
+        connection.close()
+
+    return timings
+
+"""
+Job History
+"""
+def createJobTable(connection=None):
+    """
+    Make sure the job history table exists.
+
+    Args:
+      connection (sqlite3.Connection, optional): A connection to the database.
+
+    Returns:
+      bool: True if successful, false otherwise.
+    """
+
+    # Open the master database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(MASTER)
+        flag = True
+
+    # Create a cursor from the connection.
+    cursor = connection.cursor()
+
+    # Create the table holding each finished job.
+    cursor.execute("""CREATE TABLE IF NOT EXISTS job (
+                        `id` INTEGER PRIMARY KEY,
+                        `name` TEXT NOT NULL,
+                        `state` TEXT NOT NULL,
+                        `started` TEXT,
+                        `finished` TEXT NOT NULL,
+                        `seconds` REAL,
+                        `message` TEXT
+);""")
+
+    # Close the cursor.
+    cursor.close()
+
+    # Commit the change to the database and close the connection.
+    if flag:
+        connection.commit()
+        connection.close()
+
+    return True
+
+def addJobHistory(jobInfo, connection=None):
+    """
+    Add a finished job to the job history.
+
+    Args:
+      jobInfo (dict of {str: object}): The job in the form {"name": ?,
+        "state": ?, "started": ?, "finished": ?, "seconds": ?, "message": ?}.
+      connection (sqlite3.Connection, optional): A connection to the database.
+
+    Returns:
+      int: The id of the job in the history.
+    """
+
+    # Open the master database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(MASTER)
+        flag = True
+
+    # Make sure the table exists.
+    createJobTable(connection)
+
+    # Create a cursor from the connection.
+    cursor = connection.cursor()
+
+    # Execute the statement to add the job.
+    cursor.execute("""INSERT INTO job (name, state, started, finished, seconds,
+message) VALUES (?, ?, ?, ?, ?, ?)""", (jobInfo["name"], jobInfo["state"],
+        jobInfo["started"], jobInfo["finished"], jobInfo["seconds"],
+        jobInfo["message"]))
+
+    # Get the id of the job.
+    jobID = cursor.lastrowid
+
+    # Close the cursor.
+    cursor.close()
+
+    # Commit the change to the database and close the connection.
+    if flag:
+        connection.commit()
+        connection.close()
+
+    return jobID
+
+def getJobHistory(count=50, connection=None):
+    """
+    Get the latest finished jobs.
+
+    Args:
+      count (int, optional): The number of jobs to return.
+      connection (sqlite3.Connection, optional): A connection to the database.
+
+    Returns:
+      list of tuple of (int, str, str, str, str, float, str): The id, name,
+        state, start, finish, seconds, and message of each job, latest first.
+    """
+
+    # Open the master database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(MASTER)
+        flag = True
+
+    # Make sure the table exists.
+    createJobTable(connection)
+
+    # Create a cursor from the connection.
+    cursor = connection.cursor()
+
+    # Execute the statement to get the jobs.
+    cursor.execute("""SELECT id, name, state, started, finished, seconds,
+message FROM job ORDER BY id DESC LIMIT ?""", (count,))
+
+    # Fetch the returned data.
+    history = cursor.fetchall()
+
+    # Close the cursor.
+    cursor.close()
+
+    # Commit the change to the database and close the connection.
+    if flag:
+        connection.commit()
+        connection.close()
+
+    return history
+
 """
 Link Products
 """
@@ -1098,6 +1687,9 @@ def addLink(old, new, connection=None):
         connection.commit()
         connection.close()
 
+        # Drop the cached views of products once the change is committed.
+        cache.invalidate()
+
     return True
 
 def setLink(old, new, kind, connection=None):
@@ -1132,6 +1724,9 @@ old='{o2}'""".format(o=old, n=new, o2=kind))
         connection.commit()
         connection.close()
 
+        # Drop the cached views of products once the change is committed.
+        cache.invalidate()
+
     return True
 
 def removeLink(old, new, connection=None):
@@ -1159,6 +1754,9 @@ def removeLink(old, new, connection=None):
         connection.commit()
         connection.close()
 
+        # Drop the cached views of products once the change is committed.
+        cache.invalidate()
+
     return True
 
 def getLinks(connection=None):
@@ -1225,6 +1823,48 @@ def getLinksTo(product, connection=None):
 """
 Helper Functions
 """
+def addColumn(table, column, kind, connection):
+    """
+    Add a column to a table if it does not already have it.
+
+    Args:
+      table (str): The name of the table.
+      column (str): The name of the column.
+      kind (str): The type of the column.
+      connection (sqlite3.Connection): A connection to the database.
+
+    Returns:
+      bool: True if the column was added, false if it already existed.
+    """
+
+    # Create a cursor from the connection.
+    cursor = connection.cursor()
+
+    # Find the existing columns.
+    cursor.execute("""PRAGMA table_info({t})""".format(t=table))
+    columns = [x[1] for x in cursor.fetchall()]
+
+    # Add the column if it is not there.
+    added = column not in columns
+    if added:
+        cursor.execute("""ALTER TABLE {t} ADD COLUMN `{c}` {k}""".format(
+            t=table, c=column, k=kind))
+
+    # Close the cursor.
+    cursor.close()
+
+    return added
+
+def toRows(data):
+    """
+    Convert product dictionaries to tuples in the order of the information
+    table, skipping any without a product.
+    """
+
+    for productData in data:
+        if productData.get("product"):
+            yield tuple([productData.get(x) or '' for x in ATTRIBUTES])
+
 def text2date(text):
     """
     SQL text date format is yyyy-mm-dd.
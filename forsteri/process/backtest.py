@@ -0,0 +1,302 @@
+"""
+Backtesting Module
+
+Copyright (c) 2014, 2015 Andrew Hawkins
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+The models are replayed over the monthly history of every product at many
+forecast origins, each origin seeing only the months before it. The history
+and the variables are read once into a panel array of product by month, so the
+exponential moving average and naive forecasts of every origin are found at
+once from running averages of the panel. The regressions are solved for every
+product at once and the origins are spread over a pool of threads. The mean
+absolute error, mean absolute percent error, and bias of each product, method,
+and horizon are stored in the backtest table of the data database.
+"""
+
+"""
+Import Declarations
+"""
+import numpy as np
+import sqlite3
+
+from multiprocessing.pool import ThreadPool
+
+from forsteri.interface import cache
+from forsteri.interface import data as idata
+from forsteri.process import job as pj
+from forsteri.process import model as pm
+
+"""
+Constant Declarations
+"""
+# The methods that can be backtested.
+METHODS = ["mlr", "ema", "naive"]
+
+# The number of months forecast from each origin.
+HORIZON = 12
+
+# The number of most recent origins replayed.
+ORIGINS = 24
+
+# The fewest months of history before the first origin.
+MINIMUM = 24
+
+# The number of threads the origins are spread over.
+WORKERS = 4
+
+"""
+Main Functions
+"""
+def runBacktest(products=None, methods=None, origins=ORIGINS,
+    workers=WORKERS, progress=None):
+    """
+    Replay the models at the most recent origins and store the accuracy of
+    each product, method, and horizon.
+
+    Args:
+      products (list of str, optional): The products to backtest, all if
+        None.
+      methods (list of str, optional): Some of METHODS, all if None.
+      origins (int, optional): The number of most recent origins replayed.
+      workers (int, optional): The number of threads the origins of the
+        regressions are spread over.
+      progress (function, optional): Called as progress(percent, message),
+        returning false to stop.
+
+    Returns:
+      bool: True if the results were stored, false if stopped.
+    """
+
+    # Check the methods.
+    if methods is None:
+        methods = METHODS
+    for method in methods:
+        if method not in METHODS:
+            raise ValueError("unknown backtest method " + str(method))
+
+    # Open a connection to the data database.
+    connection = sqlite3.connect(idata.MASTER)
+
+    # Read the history, and the other monthly variables if regressing.
+    variables = ["finished_goods_monthly"]
+    if "mlr" in methods:
+        variables += sorted([x for x in idata.getVariables(connection) if\
+            x[-8:] == "_monthly" and x != "finished_goods_monthly"])
+    chosen = products
+    (products, first, panel) = pm.loadPanel(variables, products, connection)
+    if not pj.report(progress, 20, "Data read, replaying the models."):
+        connection.close()
+        return False
+
+    # Find the origins and the month forecast at each horizon of each.
+    months = panel.shape[2]
+    starts = np.arange(max(MINIMUM, months - origins), months)
+    targets = starts[:, np.newaxis] + np.arange(HORIZON)[np.newaxis, :]
+
+    # Find the actual values, nan past the end of the history.
+    history = pad(panel[0], HORIZON)
+    actual = history[:, targets]
+
+    # Replay each method.
+    results = []
+    for (index, method) in enumerate(methods):
+        if method == "naive":
+            forecast = history[:, targets - 12]
+        elif method == "ema":
+            forecast = pad(seasonal(panel[0]), HORIZON)[:, targets - 12]
+        else:
+            forecast = regressOrigins(panel, starts, workers)
+
+        results += summarize(products, method, actual, forecast)
+
+        if not pj.report(progress, 20 + 60.0 * (index + 1) / len(methods),
+            "Replayed " + method + "."):
+            connection.close()
+            return False
+
+    # Store the results and choose the method of the products backtested.
+    idata.setBacktest(results, connection)
+    idata.refreshSelection(None if chosen is None else products, connection)
+
+    # Commit and close the connection, dropping the cached views of products.
+    connection.commit()
+    connection.close()
+    cache.invalidate()
+
+    pj.report(progress, 100, "Backtest complete.")
+
+    return True
+
+def seasonal(history, alpha=0.7):
+    """
+    Find the running exponential moving average of each month over the years,
+    as the EMA model finds it, for every product and month at once.
+
+    Args:
+      history (numpy.array): The history with a row for each product and a
+        column for each month.
+      alpha (float, optional): The weighting factor.
+
+    Returns:
+      numpy.array: The average of each month over the years up to and
+        including each column.
+    """
+
+    average = np.array(history)
+    for column in range(12, history.shape[1]):
+        previous = average[:, column - 12]
+        current = history[:, column]
+        average[:, column] = np.where(np.isnan(previous), current,
+            np.where(np.isnan(current), previous,
+            (1 - alpha) * previous + alpha * current))
+
+    return average
+
+def regressOrigins(panel, starts, workers):
+    """
+    Replay the multiple linear regression model at every origin, spreading
+    the origins over a pool of threads.
+
+    Returns:
+      numpy.array: The forecasts by product, origin, and horizon.
+    """
+
+    # Regress every origin.
+    pool = ThreadPool(max(1, workers))
+    try:
+        forecasts = pool.map(lambda start: regress(panel, start), starts)
+    finally:
+        pool.close()
+        pool.join()
+
+    # Order the forecast of each origin by horizon.
+    forecast = np.full((panel.shape[1], len(starts), HORIZON), np.nan)
+    for (index, start) in enumerate(starts):
+        forecast[:, index, :] = forecasts[index][:, (start +\
+            np.arange(HORIZON)) % 12]
+
+    return forecast
+
+def regress(panel, start):
+    """
+    Fit the multiple linear regression model of each month to the years
+    before an origin and forecast that month, for every product at once. As
+    in the model, a product uses only the variables it has and the years with
+    a value for all of them, and the forecast uses the average of each
+    variable over those years.
+
+    Returns:
+      numpy.array: The forecasts with a row for each product and a column for
+        each month starting with January.
+    """
+
+    # The variables each product has before the origin.
+    has = ~np.all(np.isnan(panel[:, :, 0 : start]), axis=2)
+    has = has[1:].T[:, np.newaxis, :]
+
+    forecast = np.full((panel.shape[1], 12), np.nan)
+    for month in range(0, 12):
+        # Take the years of the month before the origin.
+        data = panel[:, :, month : start : 12]
+        dep = data[0]
+        ind = data[1:].transpose(1, 2, 0)
+
+        # Keep the years with a value for every variable of the product.
+        valid = ~np.isnan(dep) & np.all(np.isnan(ind) <= ~has, axis=2)
+        if not np.any(valid):
+            continue
+
+        # Zero out the variables the product lacks and the years not kept,
+        # which leaves the least squares solution unchanged.
+        ind = np.where(has & valid[:, :, np.newaxis], ind, 0)
+        indB = np.concatenate((valid[:, :, np.newaxis].astype(float), ind),
+            axis=2)
+        dep = np.where(valid, dep, 0)
+
+        # Determine the weighting coefficients of every product.
+        square = np.einsum("pyi,pyj->pij", indB, indB)
+        beta = np.einsum("pij,pyj,py->pi", np.linalg.pinv(square), indB, dep)
+
+        # Average each variable over the kept years.
+        vals = pm.eMAVector(np.where(valid[:, :, np.newaxis], ind,
+            np.nan).transpose(1, 0, 2), alpha=0.7)
+        vals = np.concatenate((np.ones((len(vals), 1)), np.where(has[:, 0, :],
+            vals, 0)), axis=1)
+
+        forecast[:, month] = np.where(np.any(valid, axis=1),
+            np.sum(vals * beta, axis=1), np.nan)
+
+    return forecast
+
+"""
+Helper Functions
+"""
+def pad(values, columns):
+    """
+    Add columns of nan to the end of an array with a row for each product.
+    """
+
+    return np.concatenate((values, np.full((len(values), columns), np.nan)),
+        axis=1)
+
+def summarize(products, method, actual, forecast):
+    """
+    Summarize the errors of a method over the origins.
+
+    Args:
+      products (list of str): The products.
+      method (str): The method.
+      actual (numpy.array): The actual values by product, origin, and
+        horizon.
+      forecast (numpy.array): The forecasts by product, origin, and horizon.
+
+    Returns:
+      list of tuple: The product, method, horizon, count, mean absolute
+        error, mean absolute percent error, and bias of each product and
+        horizon with any error.
+    """
+
+    # Find the errors as the actual value less the forecast.
+    error = actual - forecast
+    valid = ~np.isnan(error)
+    error = np.where(valid, error, 0)
+
+    # Sum over the origins.
+    count = valid.sum(axis=1)
+    absolute = np.abs(error).sum(axis=1)
+    bias = error.sum(axis=1)
+
+    # The percent errors leave out actual values of zero.
+    nonzero = valid & (np.nan_to_num(actual) != 0)
+    percent = np.where(nonzero, np.abs(error) / np.abs(np.where(nonzero,
+        actual, 1)), 0).sum(axis=1)
+    scaled = nonzero.sum(axis=1)
+
+    # Gather the products and horizons with any error.
+    results = []
+    for (row, horizon) in zip(*np.nonzero(count)):
+        results.append((products[row], method, int(horizon) + 1,
+            int(count[row, horizon]), float(absolute[row, horizon] /\
+            count[row, horizon]), float(100 * percent[row, horizon] /\
+            scaled[row, horizon]) if scaled[row, horizon] > 0 else None,
+            float(bias[row, horizon] / count[row, horizon])))
+
+    return results
@@ -26,133 +26,226 @@ THE SOFTWARE.
 import copy
 import csv
 import datetime as dt
+import hashlib
 import sqlite3
+import struct
 
 # Import forsteri modules.
+from forsteri.interface import archive
+from forsteri.interface import cache
 from forsteri.interface import data as idata
+from forsteri.interface import rollup as irollup
 from forsteri.interface import sql as isql
+from forsteri.process import timing as pt
 from operator import add
 
-def importTimeseries(source, dateFormat, variable, overwrite=False):
+def importTimeseries(source, dateFormat, variable, overwrite=False,
+    duplicate="skip", timer=None):
     """
     Columns are time.
     """
 
+    # Create the timer if one is not supplied.
+    if timer is None:
+        timer = pt.StageTimer()
+
     # Run the decompose function to get the full data.
-    data = decomposeCut(source, dateFormat)
+    with timer.stage("decompose") as stage:
+        (data, record) = decomposeCut(source, dateFormat,
+            duplicate=duplicate)
+        stage.rows = 0 if data is None else len(data) - 1
+
+    # If the file has already been imported there is nothing to do.
+    if data is None:
+        return False
 
     # Extract the header.
     header = data[0]
     data2 = data[1:]
 
     # Aggregate repeated products.
-    data2 = aggregate(data2)
+    with timer.stage("aggregate") as stage:
+        data2 = aggregate(data2)
+        stage.rows = len(data2)
 
     # Perform the preinput operations.
-    data2 = preimport(data2)
+    with timer.stage("preimport") as stage:
+        data2 = preimport(data2)
+        stage.rows = len(data2)
 
     # Convert the variable name.
     variableName = idata.toSQLName(variable)
 
-    # Open a connection to the data database.
+    # Open a connection to the data database, attaching the master database
+    # so the import is recorded with the data.
     connection = sqlite3.connect(idata.MASTER)
+    irollup.attachMaster(connection)
 
-    # Iterate over the data.
-    rows = len(data2)
-    cols = len(data2[0])
-    for i in range(0, rows):
-        prod = data2[i][0]
-        for j in range(1, cols):
-            idata.addData(variableName, [header[j], prod, data2[i][j]],
-                overwrite, connection)
-
-    # Close the connection and commit changes to the data database.
-    connection.commit()
-    connection.close()
+    # Iterate over the data, closing the connection even if the write fails
+    # so that it rolls back.
+    try:
+        with timer.stage("write") as stage:
+            rows = len(data2)
+            cols = len(data2[0])
+            for i in range(0, rows):
+                prod = data2[i][0]
+                for j in range(1, cols):
+                    idata.addData(variableName,
+                        [header[j], prod, data2[i][j]], overwrite, connection)
+
+            # Record the import then commit it with the data.
+            importID = recordImport(record, connection, timer)
+            connection.commit()
+            cache.invalidate()
+
+            # Archive the decomposed data once the import is committed.
+            archive.writeArchive(importID, record["rows"])
+            stage.rows = rows * (cols - 1)
+    finally:
+        connection.close()
+
+    # Store the timings with the import.
+    timer.save()
 
     return True
 
-def importTimeseries2(source, dateFormat, overwrite=False, shift=False):
+def importTimeseries2(source, dateFormat, overwrite=False, shift=False,
+    duplicate="skip", timer=None):
     """
     There are multiple variables and a single column is time.
     """
 
+    # Create the timer if one is not supplied.
+    if timer is None:
+        timer = pt.StageTimer()
+
     # Run the decompose function to get the full data.
-    data = decomposeCut(source, dateFormat, shift)
+    with timer.stage("decompose") as stage:
+        (data, record) = decomposeCut(source, dateFormat, shift, duplicate)
+        stage.rows = 0 if data is None else len(data) - 1
+
+    # If the file has already been imported there is nothing to do.
+    if data is None:
+        return False
 
     # Extract the header.
     header = data[0]
     data2 = data[1:]
 
     # Extract the dates.
-    dateIndex = header.index("Date")
-    dates = [checkDate(x[dateIndex], dateFormat) for x in data2]
+    with timer.stage("convert_dates") as stage:
+        dateIndex = header.index("Date")
+        dates = [checkDate(x[dateIndex], dateFormat) for x in data2]
 
-    # Remove the date column from the header and data.
-    del header[dateIndex]
-    for row in data2:
-        del row[dateIndex]
+        # Remove the date column from the header and data.
+        del header[dateIndex]
+        for row in data2:
+            del row[dateIndex]
+        stage.rows = len(dates)
 
     # Perform the preinput operations.
-    data2 = preimport(data2)
+    with timer.stage("preimport") as stage:
+        data2 = preimport(data2)
+        stage.rows = len(data2)
 
-    # Open a connection to the database.
+    # Open a connection to the database, attaching the master database so
+    # the import is recorded with the data.
     connection = sqlite3.connect(idata.MASTER)
-    cursor = connection.cursor()
-
-    # 
-    index1 = 0
-    for row in data2:
-        product = row[0]
-        index2 = 1
-        for col in row[1:]:
-            idata.addData(idata.toSQLName(header[index2]), [dates[index1],
-                product, col], overwrite, connection)
-            index2 += 1
-        index1 += 1
-
-    # Close the cursor and connection and commit changes.
-    cursor.close()
-    connection.commit()
-    connection.close()
+    irollup.attachMaster(connection)
+
+    # Write the data, closing the connection even if the write fails so
+    # that it rolls back.
+    try:
+        with timer.stage("write") as stage:
+            index1 = 0
+            for row in data2:
+                product = row[0]
+                index2 = 1
+                for col in row[1:]:
+                    idata.addData(idata.toSQLName(header[index2]),
+                        [dates[index1], product, col], overwrite, connection)
+                    index2 += 1
+                index1 += 1
+
+            # Record the import then commit it with the data.
+            importID = recordImport(record, connection, timer)
+            connection.commit()
+            cache.invalidate()
+
+            # Archive the decomposed data once the import is committed.
+            archive.writeArchive(importID, record["rows"])
+            stage.rows = len(data2) * (len(header) - 1)
+    finally:
+        connection.close()
+
+    # Store the timings with the import.
+    timer.save()
 
     return True
 
-def importSingleTime(source, date, overwrite=True):
+def importSingleTime(source, date, overwrite=True, duplicate="skip",
+    timer=None):
     """
     There are multiple variables and only one time.
     """
 
+    # Create the timer if one is not supplied.
+    if timer is None:
+        timer = pt.StageTimer()
+
     # Run the decompose function to get the full data.
-    data = decomposeCut(source, '')
+    with timer.stage("decompose") as stage:
+        (data, record) = decomposeCut(source, '', duplicate=duplicate)
+        stage.rows = 0 if data is None else len(data) - 1
+
+    # If the file has already been imported there is nothing to do.
+    if data is None:
+        return False
 
     # Extract the header.
     header = data[0]
     data2 = data[1:]
 
     # Aggregate repeated products.
-    data2 = aggregate(data2)
+    with timer.stage("aggregate") as stage:
+        data2 = aggregate(data2)
+        stage.rows = len(data2)
 
     # Perform the preinput operations.
-    data2 = preimport(data2)
+    with timer.stage("preimport") as stage:
+        data2 = preimport(data2)
+        stage.rows = len(data2)
 
-    # Open a connection to the database.
+    # Open a connection to the database, attaching the master database so
+    # the import is recorded with the data.
     connection = sqlite3.connect(idata.MASTER)
-    cursor = connection.cursor()
-
-    # 
-    for row in data2:
-        product = row[0]
-        index = 1
-        for col in row[1:]:
-            idata.addData(idata.toSQLName(header[index]), [str(date),
-                product, col], overwrite, connection)
-            index += 1
+    irollup.attachMaster(connection)
 
-    # Close the cursor and connection and commit changes.
-    cursor.close()
-    connection.commit()
-    connection.close()
+    # Write the data, closing the connection even if the write fails so
+    # that it rolls back.
+    try:
+        with timer.stage("write") as stage:
+            for row in data2:
+                product = row[0]
+                index = 1
+                for col in row[1:]:
+                    idata.addData(idata.toSQLName(header[index]), [str(date),
+                        product, col], overwrite, connection)
+                    index += 1
+
+            # Record the import then commit it with the data.
+            importID = recordImport(record, connection, timer)
+            connection.commit()
+            cache.invalidate()
+
+            # Archive the decomposed data once the import is committed.
+            archive.writeArchive(importID, record["rows"])
+            stage.rows = len(data2) * (len(header) - 1)
+    finally:
+        connection.close()
+
+    # Store the timings with the import.
+    timer.save()
 
     return True
 
@@ -162,7 +255,7 @@ def preimport(data):
 
     # Determine if the input is a sku.
     try:
-        int(data[1][0])
+        int(data[0][0])
         sku = True
     except ValueError:
         sku = False
@@ -175,12 +268,15 @@ def preimport(data):
 
     # Convert the basis column from skus to product codes.
     if sku:
+        # Register every unmatched sku at once.
+        missing = isql.addMissingBases([row[0] for row in data if row[0] not\
+            in match], connection)
+
         for row in data:
             try:
                 row[0] = match[row[0]]
             except KeyError:
-                tempID = isql.addMissing(row[0], connection)
-                row[0] = "TEMP-" + str(tempID)
+                row[0] = "TEMP-" + str(missing[row[0]])
 
     # Close the connection and commit changes to the master database.
     connection.commit()
@@ -243,21 +339,51 @@ def decompose(source, dateFormat, shift=False):
 
     return header, match, hasDate, firstDate
 
-def decomposeCut(source, dateFormat, shift=False):
+def decomposeCut(source, dateFormat, shift=False, duplicate="skip"):
     """
     The point of the decompose function is to take a file with an arbitrary
     header and extract only relevent information, based on associations with a
     database.
+
+    The duplicate flag decides what happens to content that has been imported
+    before. "skip" returns None if the whole file has been seen, "delta" only
+    keeps the rows that have not been seen, wherever they are in the file,
+    and "reload" keeps everything.
+
+    Nothing is recorded here. The import, its content hash and row hashes,
+    and the rows to archive are returned as a record for recordImport, which
+    the caller runs once the data is written and before it is committed, so
+    a failed import is never mistaken for a finished one. The rows are
+    archived only after the commit.
     """
 
-    # Initialize the data list.
-    data = []
+    # Find the content hash of the file.
+    digest = fingerprint(source)
 
-    # Open the file and extract the data.
-    with open(source) as csvFile:
-        reader = csv.reader(csvFile, delimiter=',', quotechar='|')
-        for row in reader:
-            data.append(row)
+    # If the exact file has been imported before, skip it.
+    if duplicate == "skip" and isql.getImportByHash(digest) is not None:
+        return None, None
+
+    # Read the rows of the file.
+    data = readRows(source)
+
+    # Find the hash of each row.
+    ranges = fingerprintRanges(data)
+
+    # Remove the rows that have already been imported, wherever they are in
+    # the file.
+    if duplicate == "delta":
+        known = isql.getKnownRanges([x[2] for x in ranges])
+        keep = [data[0]]
+        for (first, last, rowHash) in ranges:
+            if rowHash not in known:
+                keep.extend(data[first + 1 : last + 2])
+        ranges = [x for x in ranges if x[2] not in known]
+        data = keep
+
+        # If every row has been seen there is nothing to import.
+        if len(data) < 2:
+            return None, None
 
     # Separate the header.
     header = data[0]
@@ -316,29 +442,138 @@ def decomposeCut(source, dateFormat, shift=False):
     #if dateFormat == '':
     #    dateFormat = None
 
-    # Date and time now.
-    dateNow = dt.datetime(1, 1, 1).now()
+    return data, newRecord(source, dateFormat, digest, data, ranges)
+
+def newRecord(source, dateFormat, digest, data, ranges=None):
+    """
+    Create the record of an import for recordImport.
+
+    Args:
+      source (str): The location of the file on the disk.
+      dateFormat (str): The date template the file was read with.
+      digest (str): The content hash of the file.
+      data (list of list of str): The rows to archive including the header.
+      ranges (list of tuple, optional): The row ranges to record, every range
+        of the data if None.
+
+    Returns:
+      dict: The file information, row ranges, and rows to archive.
+    """
 
-    # Create the file info dictionary.
+    # Create the file info dictionary, the date of import to the microsecond
+    # since it must be unique.
     fileInfo = {"location": source,
-        "date_of_import": dateNow.strftime("%Y-%m-%d %H_%M_%S"),
-        "date_format": dateFormat}
+        "date_of_import": dt.datetime.now().strftime("%Y-%m-%d %H_%M_%S_%f"),
+        "date_format": dateFormat,
+        "hash": digest}
 
-    # Add the import to the database.
-    importID = isql.addImport(fileInfo)
+    # Make sure the import tables exist before they are written through an
+    # attached connection.
+    isql.createImportHash()
 
-    # Create the title of the decomposed file.
-    output = ''.join([isql.DATA, "imported/", str(importID), '-',
-        fileInfo["date_of_import"], ".csv"])
+    # Keep the rows to archive, copied since the callers rearrange the data.
+    if ranges is None:
+        ranges = fingerprintRanges(data)
 
-    # Open the file and write the data.
-    with open(output, 'w') as csvFile:
-        writer = csv.writer(csvFile, delimiter=',', quotechar='|',
-            quoting=csv.QUOTE_MINIMAL)
-        for row in data:
-            writer.writerow(row)
+    return {"info": fileInfo, "ranges": ranges, "rows": [list(row) for row in\
+        data]}
 
-    return data
+def recordImport(record, connection, timer=None):
+    """
+    Add an import and its row ranges to the master database, without
+    committing. The decomposed data is archived by the caller once the
+    import is committed, so a failed import leaves no archive behind.
+
+    Args:
+      record (dict): The import as given by decomposeCut.
+      connection (sqlite3.Connection): A connection to the data database the
+        master database is attached to, holding the data written.
+      timer (forsteri.process.timing.StageTimer, optional): The timer given
+        the id of the import.
+
+    Returns:
+      int: The id of the import.
+    """
+
+    # Add the import and its row ranges in the transaction of the data.
+    importID = isql.addImport(record["info"], connection)
+    isql.addImportRanges(importID, record["ranges"], connection)
+    if timer is not None:
+        timer.importID = importID
+
+    return importID
+
+def readRows(source):
+    """
+    Read the rows of a file, including the header.
+    """
+
+    with open(source) as csvFile:
+        reader = csv.reader(csvFile, delimiter=',', quotechar='|')
+        return [row for row in reader]
+
+def fingerprint(source, blockSize=65536):
+    """
+    Find the content hash of a file without reading it all into memory.
+
+    Args:
+      source (str): The location of the file on the disk.
+      blockSize (int, optional): The number of bytes read at a time.
+
+    Returns:
+      str: The hexadecimal SHA-1 digest of the file.
+    """
+
+    # Feed the file to the hash a block at a time.
+    digest = hashlib.sha1()
+    with open(source, "rb") as binFile:
+        block = binFile.read(blockSize)
+        while len(block) > 0:
+            digest.update(block)
+            block = binFile.read(blockSize)
+
+    return digest.hexdigest()
+
+def fingerprintRanges(data):
+    """
+    Find the hash of each data row, recorded as a range of a single row so a
+    row is known however the rows around it have moved. The header is
+    included in every hash so the same values under a different header are
+    not considered seen, and each value is prefixed by its length so values
+    holding commas cannot run together.
+
+    Args:
+      data (list of list of str): The raw file rows including the header.
+
+    Returns:
+      list of tuple of (int, int, str): The data row twice and the
+        hexadecimal SHA-1 digest of each row.
+    """
+
+    # Hash the header once and copy it for each row.
+    headerHash = hashlib.sha1()
+    updateFields(headerHash, data[0])
+
+    # Iterate over the data rows.
+    ranges = []
+    for (index, row) in enumerate(data[1:]):
+        rowHash = headerHash.copy()
+        updateFields(rowHash, row)
+        ranges.append((index, index, rowHash.hexdigest()))
+
+    return ranges
+
+def updateFields(digest, fields):
+    """
+    Feed the number of fields then each field prefixed by its length to a
+    hash.
+    """
+
+    digest.update(struct.pack(">I", len(fields)))
+    for field in fields:
+        field = archive.toBytes(field)
+        digest.update(struct.pack(">I", len(field)))
+        digest.update(field)
 
 def aggregate(data):
     """
@@ -0,0 +1,282 @@
+"""
+Driver Selection Module
+
+Copyright (c) 2014, 2015 Andrew Hawkins
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+
+The drivers of the multiple linear regression of each product are chosen from
+the other monthly variables it has. A variable is kept if it shares enough
+months with the finished goods and is correlated with them, then the kept
+variable with the largest variance inflation is dropped until none is too
+collinear with the rest. The ridge penalty of each product is the one with
+the least leave one out error of the regressions of its months. The history
+of a chunk of products is read only when the chunk is searched, every
+statistic is found for the chunk at once, and the chosen drivers and penalty
+are stored in the parameter table, where the model reads them.
+"""
+
+"""
+Import Declarations
+"""
+import numpy as np
+import sqlite3
+
+from forsteri.interface import data as idata
+from forsteri.process import job as pj
+from forsteri.process import model as pm
+
+"""
+Constant Declarations
+"""
+# The fewest months a driver shares with the finished goods.
+OVERLAP = 24
+
+# The least absolute correlation of a driver with the finished goods.
+CORRELATION = 0.2
+
+# The most variance inflation of a driver kept.
+VIF = 10.0
+
+# The ridge penalties searched, ascending.
+PENALTIES = [0.0, 0.01, 0.1, 1.0, 10.0, 100.0]
+
+# The number of products read and searched in a single pass, few enough to
+# bind in a single statement.
+CHUNK = pm.BIND
+
+"""
+Main Functions
+"""
+def runDrivers(products=None, penalties=PENALTIES, progress=None):
+    """
+    Choose the drivers and ridge penalty of the multiple linear regression
+    of each product and store them.
+
+    Args:
+      products (list of str, optional): The products to choose for, all if
+        None.
+      penalties (list of float, optional): The ridge penalties searched,
+        ascending.
+      progress (function, optional): Called as progress(percent, message),
+        returning false to stop between chunks of products.
+
+    Returns:
+      bool: True if the drivers were stored, false if stopped.
+    """
+
+    # Open a connection to the data database.
+    connection = sqlite3.connect(idata.MASTER)
+
+    # Find the finished goods and every other monthly variable, and the
+    # products with finished goods if none are given.
+    variables = ["finished_goods_monthly"] + sorted([x for x in\
+        idata.getVariables(connection) if x[-8:] == "_monthly" and x !=\
+        "finished_goods_monthly"])
+    if products is None:
+        cursor = connection.cursor()
+        cursor.execute("""SELECT DISTINCT product FROM finished_goods_monthly
+WHERE value IS NOT NULL""")
+        products = sorted([row[0] for row in cursor.fetchall()])
+        cursor.close()
+    if not pj.report(progress, 5, "Products found, choosing drivers."):
+        connection.close()
+        return False
+
+    # Search each chunk of products, reading only the variables of the chunk.
+    chosen = {}
+    grid = np.array(penalties, dtype=float)
+    for start in range(0, len(products), CHUNK):
+        (chunk, first, block) = pm.loadPanel(variables,
+            products[start : start + CHUNK], connection)
+
+        # Screen the drivers, prune the collinear, and find the penalty.
+        (keep, correlation) = screen(block)
+        keep = prune(block, keep)
+        choice = grid[crossValidate(block, keep, grid)]
+
+        # Keep the choices of products with any finished goods.
+        for index in np.nonzero(np.any(~np.isnan(block[0]), axis=1))[0]:
+            parameters = dict([(variables[1 + j], float(correlation[j,
+                index])) for j in np.nonzero(keep[:, index])[0]])
+            parameters[pm.PENALTY] = float(choice[index])
+            chosen[chunk[index]] = parameters
+
+        if not pj.report(progress, 5 + 90.0 * min(start + CHUNK,
+            len(products)) / len(products), "Searched " + str(min(start +\
+            CHUNK, len(products))) + " products."):
+            connection.close()
+            return False
+
+    # Store the drivers, each with its correlation, and the penalties.
+    idata.setModelParameters("mlr", chosen, connection)
+
+    # Commit and close the connection.
+    connection.commit()
+    connection.close()
+
+    pj.report(progress, 100, "Driver selection complete.")
+
+    return True
+
+def screen(panel):
+    """
+    Find the correlation of every driver with the finished goods of every
+    product and keep the ones that share enough months and are correlated
+    enough.
+
+    Args:
+      panel (numpy.array): The finished goods then each driver by product and
+        month.
+
+    Returns:
+      tuple of (numpy.array, numpy.array): Whether each driver is kept and
+        its correlation, by driver and product.
+    """
+
+    (correlation, count) = correlate(panel[0][np.newaxis], panel[1:])
+    keep = (count >= OVERLAP) & (np.abs(correlation) >= CORRELATION)
+
+    return keep, correlation
+
+def prune(panel, keep):
+    """
+    Drop the kept driver with the largest variance inflation of each product
+    until every driver left is within VIF. The inflation of a driver is the
+    diagonal of the inverse of the correlations between the drivers kept.
+
+    Returns:
+      numpy.array: Whether each driver is kept, by driver and product.
+    """
+
+    # Find the correlation of every pair of drivers over the months with
+    # finished goods.
+    drivers = np.where(np.isnan(panel[0]), np.nan, panel[1:])
+    count = len(drivers)
+    matrix = np.zeros((panel.shape[1], count, count))
+    for i in range(0, count):
+        (correlation, seen) = correlate(drivers[i][np.newaxis], drivers)
+        matrix[:, i, :] = correlation.T
+    matrix = np.nan_to_num(matrix)
+
+    # Drop the worst driver of every product at once until none is too
+    # inflated.
+    keep = keep.T.copy()
+    products = np.arange(panel.shape[1])
+    identity = np.eye(count)
+    for step in range(0, count):
+        both = keep[:, :, np.newaxis] & keep[:, np.newaxis, :]
+        inverse = np.linalg.inv(np.where(both, matrix, identity) +\
+            1e-9 * identity)
+        inflation = np.where(keep, np.diagonal(inverse, axis1=1, axis2=2), 0)
+        worst = np.argmax(inflation, axis=1)
+        drop = inflation[products, worst] > VIF
+        if not np.any(drop):
+            break
+        keep[products[drop], worst[drop]] = False
+
+    return keep.T
+
+def crossValidate(panel, keep, grid):
+    """
+    Find the leave one out error of the regression of each month of each
+    product for every penalty, as the model fits it, over the years with a
+    value for the finished goods and every kept driver. A year that cannot be
+    left out with the largest penalty, such as the only year of a month, is
+    not counted for any penalty.
+
+    Returns:
+      numpy.array: The index in the grid of the penalty with the least error
+        of each product, the largest penalty of those tied.
+    """
+
+    # Arrange the data by product, month, year, and variable.
+    years = int(np.ceil(panel.shape[2] / 12.0))
+    data = np.full(panel.shape[0 : 2] + (years * 12,), np.nan)
+    data[:, :, 0 : panel.shape[2]] = panel
+    data = data.reshape(panel.shape[0 : 2] + (years, 12)).transpose(1, 3, 2,
+        0)
+    dep = data[:, :, :, 0]
+    ind = data[:, :, :, 1:]
+    kept = keep.T[:, np.newaxis, np.newaxis, :]
+
+    # Keep the years with a value for every kept driver.
+    valid = ~np.isnan(dep) & np.all(np.isnan(ind) <= ~kept, axis=3)
+
+    # Standardize the kept drivers over the years kept, zero elsewhere.
+    mask = valid[:, :, :, np.newaxis] & kept
+    count = np.maximum(valid.sum(axis=2), 1)[:, :, np.newaxis]
+    mean = np.where(mask, ind, 0).sum(axis=2) / count
+    centred = np.where(mask, ind - mean[:, :, np.newaxis, :], 0)
+    scale = np.sqrt((centred ** 2).sum(axis=2) / count)
+    scale[scale == 0] = 1
+    indB = np.concatenate((valid[:, :, :, np.newaxis].astype(float),
+        centred / scale[:, :, np.newaxis, :]), axis=3)
+    dep = np.where(valid, dep, 0)
+
+    # Find the leave one out error of every year for every penalty.
+    square = np.einsum("pmyi,pmyj->pmij", indB, indB)
+    ridge = np.eye(indB.shape[3])
+    ridge[0, 0] = 0
+    errors = []
+    for penalty in grid:
+        inverse = np.linalg.pinv(square + penalty * ridge)
+        beta = np.einsum("pmij,pmyj,pmy->pmi", inverse, indB, dep)
+        residual = dep - np.einsum("pmyi,pmi->pmy", indB, beta)
+        leverage = np.einsum("pmyi,pmij,pmyj->pmy", indB, inverse, indB)
+        free = 1 - leverage
+        errors.append(np.where(valid & (free > 1e-6), residual / np.maximum(
+            free, 1e-6), np.where(valid, np.inf, 0)) ** 2)
+
+    # Count only the years that can be left out with the largest penalty.
+    counted = np.isfinite(errors[-1])
+    total = np.array([np.where(counted, error, 0).sum(axis=(1, 2)) for\
+        error in errors])
+
+    return len(grid) - 1 - np.argmin(total[::-1], axis=0)
+
+"""
+Helper Functions
+"""
+def correlate(first, second):
+    """
+    Find the correlation of each series with another over the months both
+    have a value.
+
+    Args:
+      first (numpy.array): The series by variable, product, and month.
+      second (numpy.array): The other series, broadcast against the first.
+
+    Returns:
+      tuple of (numpy.array, numpy.array): The correlation, zero where either
+        series is constant, and the number of months shared.
+    """
+
+    both = ~np.isnan(first) & ~np.isnan(second)
+    count = both.sum(axis=2)
+    size = np.maximum(count, 1)[:, :, np.newaxis]
+    x = np.where(both, first, 0)
+    y = np.where(both, second, 0)
+    x = np.where(both, x - x.sum(axis=2)[:, :, np.newaxis] / size, 0)
+    y = np.where(both, y - y.sum(axis=2)[:, :, np.newaxis] / size, 0)
+    deviation = np.sqrt((x ** 2).sum(axis=2) * (y ** 2).sum(axis=2))
+
+    return np.where(deviation > 0, (x * y).sum(axis=2) / np.where(deviation >\
+        0, deviation, 1), 0), count
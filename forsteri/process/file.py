@@ -30,8 +30,10 @@ import operator as op
 import sqlite3
 
 # Import forsteri modules.
+from forsteri.interface import cache
 from forsteri.interface import data as idata
 from forsteri.interface import sql as isql
+from forsteri.process import timing as pt
 
 class File(object):
     """
@@ -60,12 +62,17 @@ class File(object):
         # Define the variable.
         self.variable = variable
 
+        # Create the timer for each stage of the import.
+        self.timer = pt.StageTimer()
+
         # Read the data from the file.
         self.data = []
-        with open(self.location) as csv_file:
-            reader = csv.reader(csv_file, delimiter=',', quotechar='|')
-            for row in reader:
-                self.data.append(row)
+        with self.timer.stage("read") as stage:
+            with open(self.location) as csv_file:
+                reader = csv.reader(csv_file, delimiter=',', quotechar='|')
+                for row in reader:
+                    self.data.append(row)
+            stage.rows = len(self.data)
 
         # If there is no data there is nothing to do.
         if len(self.data) < 2:
@@ -73,7 +80,9 @@ class File(object):
             return
 
         # Match the header values to known variables.
-        self.match()
+        with self.timer.stage("match") as stage:
+            self.match()
+            stage.rows = len(self.matched_header)
 
         # Make sure a basis column has been found.
         if "Basis" not in self.matched_header:
@@ -102,7 +111,9 @@ of file.")
                     return
 
         # Define the reduced data.
-        self.reduce()
+        with self.timer.stage("reduce") as stage:
+            self.reduce()
+            stage.rows = len(self.reduced_data)
 
         # If there are no columns remaining there is no data.
         if len(self.reduced_matched_header) == 0:
@@ -116,16 +127,24 @@ of file.")
         del self.data[0]
 
         # Convert the dates.
-        self.convert_dates()
+        with self.timer.stage("convert_dates") as stage:
+            self.convert_dates()
+            stage.rows = len(self.dates)
 
         # Convert the basis.
-        self.convert_basis()
+        with self.timer.stage("convert_basis") as stage:
+            self.convert_basis()
+            stage.rows = len(self.basis)
 
         # Convert the data.
-        self.convert_data()
+        with self.timer.stage("convert_data") as stage:
+            self.convert_data()
+            stage.rows = len(self.reduced_data)
 
         # Aggregate repeats.
-        self.aggregate()
+        with self.timer.stage("aggregate") as stage:
+            self.aggregate()
+            stage.rows = len(self.agg_reduced_data)
 
     def __getitem__(self, keys):
         """
@@ -253,16 +272,27 @@ of file.")
         """
         """
 
+        # Open a connection to the master database.
+        connection = sqlite3.connect(isql.MASTER)
+
         # Get the product hash table.
-        product_hash = isql.getProductHash()
+        product_hash = isql.getProductHash(connection)
 
-        # Iterate over the reduced data and convert the basis.
-        self.missing_basis = []
-        for index in range(0, len(self.basis)):
-            try:
-                self.basis[index] = product_hash[self.basis[index]]
-            except KeyError:
-                self.missing_basis.append(self.basis[index])
+        # Find the basis values that are not known and register them at once.
+        self.missing_basis = sorted(set(self.basis).difference(product_hash))
+        missing_ids = isql.addMissingBases(self.missing_basis, connection)
+
+        # Commit changes and close database.
+        connection.commit()
+        connection.close()
+
+        # Build the conversion for each unique basis value.
+        conversion = dict(product_hash)
+        for (basis, basis_id) in missing_ids.items():
+            conversion[basis] = "TEMP-" + str(basis_id)
+
+        # Convert the basis.
+        self.basis = [conversion[basis] for basis in self.basis]
 
     def convert_data(self):
         """
@@ -354,42 +384,64 @@ found dates.")
 
         return date
 
-    def write(self, overwrite, variable=None):
+    def write(self, overwrite, variable=None, connection=None):
         """
+        Write the aggregated data to the data database. A connection supplied
+        is left for the caller to commit.
+
+        Returns:
+          set of str: The SQL names of the variables written to.
         """
 
-        # Open a connection to the data database.
-        connection = sqlite3.connect(idata.MASTER)
+        # Open a connection to the data database if it is not supplied.
+        flag = False
+        if connection is None:
+            connection = sqlite3.connect(idata.MASTER)
+            flag = True
 
-        # Write the file data to the database.
-        if self.kind == 0:
-            for (i, entry) in enumerate(self.agg_reduced_data):
-                product = self.agg_basis[i]
-                date = self.agg_dates[i]
-                for (j, value) in enumerate(entry):
-                    idata.addData(idata.toSQLName(\
-                        self.reduced_matched_header[j]),
-                        (date, product, value), overwrite, connection)
-        elif self.kind == 1:
-            for (i, row) in enumerate(self.agg_reduced_data):
-                product = self.agg_basis[i]
-                for (j, col) in enumerate(row):
-                    idata.addData(idata.toSQLName(self.variable),
-                        (self.reduced_matched_header[j], product, col),
-                        overwrite, connection)
+        # Find the variables that will be written to.
+        if self.kind == 1:
+            variables = set([idata.toSQLName(self.variable)])
         else:
-            for (i, row) in enumerate(self.agg_reduced_data):
-                product = self.agg_basis[i]
-                for (j, col) in enumerate(row):
-                    idata.addData(idata.toSQLName(\
-                        self.reduced_matched_header[j]), (self.date, product,
-                        col), overwrite, connection)
-
-        # Commit changes and close database.
-        connection.commit()
-        connection.close()
+            variables = set([idata.toSQLName(header) for header in\
+                self.reduced_matched_header])
 
-        pass
+        # Write the file data to the database.
+        with self.timer.stage("write") as stage:
+            if self.kind == 0:
+                for (i, entry) in enumerate(self.agg_reduced_data):
+                    product = self.agg_basis[i]
+                    date = self.agg_dates[i]
+                    for (j, value) in enumerate(entry):
+                        idata.addData(idata.toSQLName(\
+                            self.reduced_matched_header[j]),
+                            (date, product, value), overwrite, connection)
+            elif self.kind == 1:
+                for (i, row) in enumerate(self.agg_reduced_data):
+                    product = self.agg_basis[i]
+                    for (j, col) in enumerate(row):
+                        idata.addData(idata.toSQLName(self.variable),
+                            (self.reduced_matched_header[j], product, col),
+                            overwrite, connection)
+            else:
+                for (i, row) in enumerate(self.agg_reduced_data):
+                    product = self.agg_basis[i]
+                    for (j, col) in enumerate(row):
+                        idata.addData(idata.toSQLName(\
+                            self.reduced_matched_header[j]), (self.date,
+                            product, col), overwrite, connection)
+
+            # Commit changes.
+            if flag:
+                connection.commit()
+                cache.invalidate()
+            stage.rows = sum([len(row) for row in self.agg_reduced_data])
+
+        # Close database.
+        if flag:
+            connection.close()
+
+        return variables
 
     def add_array(self, X, Y):
         """
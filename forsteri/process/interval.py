@@ -0,0 +1,201 @@
+"""
+Prediction Interval Module
+
+Copyright (c) 2014, 2015 Andrew Hawkins
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+
+The prediction interval of a forecast is found from the empirical quantiles
+of the residuals of its method. The residuals are the errors of the method's
+past forecasts where a product has enough of them, and otherwise the one step
+ahead errors of the average of each month over the years found from the
+product's history. Each month of a forecast is a year ahead of the same month
+of the year before, the step the residuals are measured over, so the offset of
+each quantile from the forecast is stored in the interval table once, the same
+for every month. The residuals of a chunk of products are padded with nan into
+one array and the quantiles of every product are found at once.
+"""
+
+"""
+Import Declarations
+"""
+import numpy as np
+import sqlite3
+
+from forsteri.interface import cache
+from forsteri.interface import data as idata
+from forsteri.process import backtest as pb
+from forsteri.process import job as pj
+from forsteri.process import model as pm
+
+"""
+Constant Declarations
+"""
+# The quantiles of the interval.
+QUANTILES = [0.1, 0.9]
+
+# The fewest past errors of a method used in place of the history.
+MINIMUM = 12
+
+# The number of products whose quantiles are found at once.
+CHUNK = 2000
+
+"""
+Main Functions
+"""
+def runIntervals(quantiles=QUANTILES, progress=None):
+    """
+    Find the prediction interval of every method for every product and store
+    it.
+
+    Args:
+      quantiles (list of float, optional): The quantiles of the interval.
+      progress (function, optional): Called as progress(percent, message),
+        returning false to stop between methods.
+
+    Returns:
+      bool: True if every interval was stored, false if stopped.
+    """
+
+    # Open a connection to the data database.
+    connection = sqlite3.connect(idata.MASTER)
+
+    # Find the forecast methods and those with errors.
+    cursor = connection.cursor()
+    cursor.execute("""PRAGMA table_info(forecast)""")
+    columns = [row[1] for row in cursor.fetchall()]
+    cursor.close()
+    methods = [x for x in columns if x not in ["date", "product"] and not\
+        x.endswith("_error")]
+
+    # Find the one step ahead errors of every product from its history.
+    (products, first, panel) = pm.loadPanel(["finished_goods_monthly"],
+        connection=connection)
+    history = panel[0]
+    if history.shape[1] > 12:
+        fallback = history[:, 12 :] - pb.seasonal(history)[:, 0 : -12]
+    else:
+        fallback = np.full((len(products), 0), np.nan)
+    if not pj.report(progress, 10, "History read, finding quantiles."):
+        connection.close()
+        return False
+
+    # Find the quantiles of each method.
+    for (index, method) in enumerate(methods):
+        # Use the past errors of products with enough of them.
+        if method + "_error" in columns:
+            errors = getErrors(method, connection)
+        else:
+            errors = {}
+        pools = [errors[product] if len(errors.get(product, [])) >=\
+            MINIMUM else fallback[i] for (i, product) in enumerate(products)]
+
+        # Find the offsets of the products with residuals.
+        offsets = empirical(pools, quantiles)
+        idata.setIntervals(method, dict([(product, dict(zip(quantiles,
+            [float(x) for x in offsets[i]]))) for (i, product) in\
+            enumerate(products) if not np.any(np.isnan(offsets[i]))]),
+            connection)
+
+        if not pj.report(progress, 10 + 90.0 * (index + 1) / len(methods),
+            "Found the interval of " + method + "."):
+            connection.close()
+            return False
+
+    # Commit and close the connection, dropping the cached views of products.
+    connection.commit()
+    connection.close()
+    cache.invalidate()
+
+    pj.report(progress, 100, "Intervals complete.")
+
+    return True
+
+def empirical(pools, quantiles):
+    """
+    Find the empirical quantiles of the residuals of every product at once.
+
+    Args:
+      pools (list of list of float): The residuals of each product, nan
+        where there is none.
+      quantiles (list of float): The quantiles.
+
+    Returns:
+      numpy.array: The quantiles with a row for each product, nan for
+        products without residuals.
+    """
+
+    offsets = np.full((len(pools), len(quantiles)), np.nan)
+    for start in range(0, len(pools), CHUNK):
+        # Pad the residuals of the chunk into one array.
+        chunk = [np.asarray(pool, dtype=float) for pool in\
+            pools[start : start + CHUNK]]
+        counts = np.array([np.count_nonzero(~np.isnan(pool)) for pool in\
+            chunk])
+        if counts.max() == 0:
+            continue
+        padded = np.full((len(chunk), max([len(pool) for pool in chunk])),
+            np.nan)
+        for (row, pool) in enumerate(chunk):
+            padded[row, 0 : len(pool)] = pool
+
+        # Find the quantiles of the products with residuals.
+        rows = np.nonzero(counts)[0]
+        offsets[start + rows] = np.nanpercentile(padded[rows],
+            [100 * x for x in quantiles], axis=1).T
+
+    return offsets
+
+"""
+Helper Functions
+"""
+def toQuantiles(coverage):
+    """
+    Find the quantiles of an interval centred on the median.
+
+    Args:
+      coverage (str): The share of outcomes the interval covers, such as
+        80%.
+
+    Returns:
+      list of float: The lower and upper quantile.
+    """
+
+    share = float(coverage.strip().rstrip('%')) / 100
+
+    return [round((1 - share) / 2, 4), round((1 + share) / 2, 4)]
+
+def getErrors(method, connection):
+    """
+    Get the past errors of a method for every product.
+
+    Returns:
+      dict of {str: list of float}: The errors of each product.
+    """
+
+    cursor = connection.cursor()
+    cursor.execute("""SELECT product, {m}_error FROM forecast WHERE {m}_error
+IS NOT NULL""".format(m=method))
+    errors = {}
+    for (product, error) in cursor.fetchall():
+        errors.setdefault(product, []).append(error)
+    cursor.close()
+
+    return errors
@@ -0,0 +1,465 @@
+"""
+Job Manager Module
+
+Copyright (c) 2014, 2015 Andrew Hawkins
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+Long running functions report progress through a callback given as the
+progress keyword argument. The callback is called as progress(percent,
+message) and returns false once the job has been cancelled, at which point the
+function should stop at the next safe point and return false.
+"""
+
+# Import python modules.
+import datetime as dt
+import threading as td
+import time
+
+# Import forsteri modules.
+from forsteri.interface import sql as isql
+
+# The states of a job.
+QUEUED = "Queued"
+RUNNING = "Running"
+DONE = "Done"
+FAILED = "Failed"
+CANCELLED = "Cancelled"
+
+# The states of a job that has finished.
+FINISHED = [DONE, FAILED, CANCELLED]
+
+# The order jobs that feed each other are run in.
+CHAIN = ["Import", "Systematize", "Profiles", "Tune Models",
+    "Select Drivers", "Run Models", "Update Errors", "Intervals"]
+
+class Job(object):
+    """
+    A unit of work run by a job manager.
+    """
+
+    def __init__(self, name, target, args=(), kwargs=None, after=None,
+        resources=None, progress=True):
+        """
+        Initialize the job.
+
+        Args:
+          name (str): The name of the job.
+          target (function): The function run by the job.
+          args (tuple of object, optional): The arguments to the function.
+          kwargs (dict of {str: object}, optional): The keyword arguments to
+            the function.
+          after (list of Job, optional): The jobs that must finish first.
+          resources (list of str, optional): The names of the resources the
+            job needs to itself, such as a database it writes to.
+          progress (bool, optional): True if the function takes a progress
+            callback, false otherwise.
+
+        Returns:
+          Job
+        """
+
+        # Define the inputs.
+        self.name = name
+        self.target = target
+        self.args = args
+        self.kwargs = kwargs or {}
+        self.after = after or []
+        self.resources = resources or []
+        self.progress = progress
+
+        # Initialize the state.
+        self.id = None
+        self.state = QUEUED
+        self.percent = 0
+        self.message = ''
+        self.result = None
+        self.error = None
+        self.started = None
+        self.finished = None
+
+        # Create the cancel and finish events.
+        self.cancelled = td.Event()
+        self.done = td.Event()
+
+        # The manager the job was submitted to.
+        self.manager = None
+
+    def update(self, percent, message=''):
+        """
+        The progress callback given to the function of the job.
+
+        Args:
+          percent (float): The percent of the job complete.
+          message (str, optional): A description of the current step.
+
+        Returns:
+          bool: False if the job has been cancelled, true otherwise.
+        """
+
+        self.percent = percent
+        self.message = message
+        if self.manager is not None:
+            self.manager.notify(self)
+
+        return not self.cancelled.is_set()
+
+    def cancel(self):
+        """
+        Ask the job to stop. A queued job never starts and a running job stops
+        the next time it reports progress.
+        """
+
+        self.cancelled.set()
+        if self.manager is not None:
+            self.manager.wake()
+
+        return True
+
+    def isFinished(self):
+        """
+        """
+
+        return self.state in FINISHED
+
+    def seconds(self):
+        """
+        Get the seconds the job has run for.
+        """
+
+        if self.started is None:
+            return None
+        if self.finished is None:
+            return time.time() - self.started
+
+        return self.finished - self.started
+
+    def wait(self, timeout=None):
+        """
+        Wait for the job to finish.
+
+        Returns:
+          bool: True if the job finished, false if the wait timed out.
+        """
+
+        return self.done.wait(timeout)
+
+class JobManager(object):
+    """
+    A queue of jobs run by a pool of worker threads. A job waits for the jobs
+    it depends on and for its resources to be free, so jobs writing to the
+    same database never overlap. Each finished job is added to the job
+    history.
+    """
+
+    def __init__(self, workers=2, record=True):
+        """
+        Initialize the manager.
+
+        Args:
+          workers (int, optional): The number of worker threads.
+          record (bool, optional): True if finished jobs are added to the job
+            history, false otherwise.
+
+        Returns:
+          JobManager
+        """
+
+        # Define the inputs.
+        self.workers = workers
+        self.record = record
+
+        # Create the submitted and pending jobs and the resources in use.
+        self.jobs = []
+        self.pending = []
+        self.busy = set()
+
+        # Create the functions told about every change to a job.
+        self.listeners = []
+
+        # Create the condition guarding the queue and the worker threads.
+        self.condition = td.Condition()
+        self.threads = []
+        self.stopped = False
+
+    """
+    Manipulate Functions
+    """
+    def submit(self, name, target, args=(), kwargs=None, after=None,
+        resources=None, progress=True):
+        """
+        Add a job to the queue, starting the workers if needed.
+
+        Args:
+          See Job.
+
+        Returns:
+          Job: The job submitted.
+        """
+
+        # Create the job.
+        job = Job(name, target, args, kwargs, after, resources, progress)
+        job.manager = self
+
+        # Add it to the queue and wake a worker.
+        with self.condition:
+            self.stopped = False
+            job.id = len(self.jobs) + 1
+            self.jobs.append(job)
+            self.pending.append(job)
+            self.start()
+            self.condition.notify_all()
+
+        self.notify(job)
+
+        return job
+
+    def before(self, name):
+        """
+        Get the unfinished jobs that come before a job in the chain, which a
+        new job of that name should wait for.
+
+        Args:
+          name (str): The name of the new job.
+
+        Returns:
+          list of Job: The jobs to wait for.
+        """
+
+        # Find the names earlier in the chain.
+        if name in CHAIN:
+            names = CHAIN[0 : CHAIN.index(name)]
+        else:
+            names = CHAIN
+
+        return [job for job in self.unfinished() if job.name in names]
+
+    def unfinished(self):
+        """
+        """
+
+        with self.condition:
+            return [job for job in self.jobs if not job.isFinished()]
+
+    def listen(self, function):
+        """
+        Call a function with the job whenever a job changes. The function is
+        called from the worker threads.
+        """
+
+        self.listeners.append(function)
+
+    def unlisten(self, function):
+        """
+        """
+
+        if function in self.listeners:
+            self.listeners.remove(function)
+
+    def notify(self, job):
+        """
+        """
+
+        for function in list(self.listeners):
+            function(job)
+
+    def wake(self):
+        """
+        """
+
+        with self.condition:
+            self.condition.notify_all()
+
+    def stop(self):
+        """
+        Stop the workers once their current jobs finish.
+        """
+
+        with self.condition:
+            self.stopped = True
+            self.condition.notify_all()
+
+        return True
+
+    """
+    Helper Functions
+    """
+    def start(self):
+        """
+        Start any missing worker threads, the lock must be held.
+        """
+
+        self.threads = [thread for thread in self.threads if\
+            thread.is_alive()]
+        while len(self.threads) < self.workers:
+            thread = td.Thread(target=self.work)
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def work(self):
+        """
+        Run jobs until stopped.
+        """
+
+        while True:
+            # Wait for a job that is ready or for jobs to drop.
+            with self.condition:
+                (job, dropped) = self.next()
+                while job is None and len(dropped) == 0 and\
+                    not self.stopped:
+                    self.condition.wait()
+                    (job, dropped) = self.next()
+
+            # Record the dropped jobs once the lock is released.
+            for x in dropped:
+                self.publish(x)
+            if job is None:
+                if len(dropped) > 0:
+                    continue
+                return
+
+            # Run the job then free its resources.
+            self.run(job)
+            with self.condition:
+                self.busy.difference_update(job.resources)
+                self.condition.notify_all()
+
+    def next(self):
+        """
+        Take the first pending job that is ready to run, finishing any that
+        were cancelled, the lock must be held.
+
+        Returns:
+          tuple of (Job, list of Job): The job to run, None if no job is
+            ready, and the jobs finished without running, which are left to
+            be published once the lock is released.
+        """
+
+        dropped = []
+        for job in list(self.pending):
+            # Drop cancelled jobs and jobs whose dependencies did not finish.
+            if job.cancelled.is_set() or any([x.state in [FAILED, CANCELLED]\
+                for x in job.after]):
+                self.pending.remove(job)
+                if not job.cancelled.is_set():
+                    job.message = "A job it depends on did not finish."
+                self.finish(job, CANCELLED)
+                dropped.append(job)
+                continue
+
+            # Take the job if its dependencies are done and resources free.
+            if all([x.state == DONE for x in job.after]) and\
+                self.busy.isdisjoint(job.resources):
+                self.pending.remove(job)
+                self.busy.update(job.resources)
+                job.state = RUNNING
+                job.started = time.time()
+
+                return job, dropped
+
+        return None, dropped
+
+    def run(self, job):
+        """
+        Run a job, recording its result or error.
+        """
+
+        self.notify(job)
+
+        # Give the function the progress callback if it takes one.
+        kwargs = dict(job.kwargs)
+        if job.progress:
+            kwargs["progress"] = job.update
+
+        # Run the function.
+        try:
+            job.result = job.target(*job.args, **kwargs)
+            if job.cancelled.is_set():
+                state = CANCELLED
+            else:
+                state = DONE
+        except Exception as error:
+            job.error = error
+            job.message = str(error)
+            state = FAILED
+
+        with self.condition:
+            self.finish(job, state)
+        self.publish(job)
+
+    def finish(self, job, state):
+        """
+        Mark a job as finished, the lock must be held.
+        """
+
+        job.state = state
+        job.finished = time.time()
+        if state == DONE:
+            job.percent = 100
+
+    def publish(self, job):
+        """
+        Add a finished job to the job history and tell the listeners, without
+        holding the lock.
+        """
+
+        # Add the job to the history without letting a failure stop the
+        # worker.
+        if self.record:
+            try:
+                isql.addJobHistory({"name": job.name, "state": job.state,
+                    "started": toText(job.started),
+                    "finished": toText(job.finished),
+                    "seconds": job.seconds(), "message": job.message})
+            except Exception:
+                pass
+
+        job.done.set()
+        self.notify(job)
+
+"""
+Helper Functions
+"""
+def report(progress, percent, message=''):
+    """
+    Report progress through a callback that may be None.
+
+    Args:
+      progress (function): The progress callback, or None.
+      percent (float): The percent complete.
+      message (str, optional): A description of the current step.
+
+    Returns:
+      bool: False if the job has been cancelled, true otherwise.
+    """
+
+    if progress is None:
+        return True
+
+    return progress(percent, message)
+
+def toText(stamp):
+    """
+    """
+
+    if stamp is None:
+        return None
+
+    return dt.datetime.fromtimestamp(stamp).strftime("%Y-%m-%d %H:%M:%S")
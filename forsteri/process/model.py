@@ -32,98 +32,178 @@ import datetime as dt
 import numpy as np
 import sqlite3
 import threading as td
-import wx
 
+from forsteri.interface import cache
 from forsteri.interface import data as idata
+from forsteri.interface import rollup as irollup
 from forsteri.interface import sql as isql
+from forsteri.process import job as pj
 
 """
 Constant Declarations
 """
+# The weighting factor of the exponential moving average of a product that
+# has not been tuned.
+ALPHA = 0.7
 
+# The parameter of the multiple linear regression holding its ridge penalty,
+# stored with a parameter named by each driver chosen for the product.
+PENALTY = "penalty"
 
-"""
-Main Functions
-"""
-def runAllErrors():
-    """
-    """
-
-    # Create the progress dialog box.
-    progress_dlg = wx.ProgressDialog("Running Errors",
-        "Opening database connection.")
-
-    # Open a connection to the data database.
-    connection = sqlite3.connect(idata.MASTER)
+# The orders of the autoregressive and moving average parts of the ARMA model,
+# and of the long autoregression its first residuals are found from.
+AR_ORDER = 2
+MA_ORDER = 1
+LONG_ORDER = 8
 
-    progress_dlg.Update(10, "Connection initialized, running MLR errors.")
+# The number of times the ARMA coefficients are refit to their own residuals.
+REFINE = 2
 
-    # Find the MLR errors.
-    idata.updateError("mlr", connection)
+# The fewest months of history the ARMA model is fit to.
+ARMA_MINIMUM = 24
 
-    progress_dlg.Update(40, "MLR errors complete, running EMA errors.")
+# The smoothing factors of the level, trend, and season searched by the
+# Holt-Winters model.
+HW_ALPHAS = [0.1, 0.3, 0.5, 0.7, 0.9]
+HW_BETAS = [0.01, 0.1, 0.3]
+HW_GAMMAS = [0.05, 0.2, 0.5]
 
-    # Find the EMA errors.
-    idata.updateError("ema", connection)
+# The parameters of the Holt-Winters model stored for each product.
+HW_PARAMETERS = ["alpha", "beta", "gamma", "multiplicative"]
 
-    progress_dlg.Update(70, "EMA errors complete, running Naive errors.")
+# The fewest months of history the Holt-Winters model is fit to, the first
+# two years giving its starting trend and season and the second year on
+# giving its one step ahead error.
+HW_MINIMUM = 24
 
-    # Find the Naive errors.
-    idata.updateError("naive", connection)
+# The number of products smoothed in a single pass.
+CHUNK = 2000
 
-    progress_dlg.Update(99, "Naive errors complete, commiting changes.")
+# The most products read by binding them in a single statement, more are
+# read by reading every product.
+BIND = 900
 
-    # Commit and close the connection.
-    connection.commit()
-    connection.close()
+# The percentiles of the launch curves of the analogs of a new item.
+PERCENTILES = [90, 75, 50, 25, 10]
 
-    progress_dlg.Update(100, "Error process complete.")
-    progress_dlg.Destroy()
+"""
+Main Functions
+"""
+def runAllErrors(progress=None):
+    """
+    Find the errors of every model, then choose the method of each product
+    whose errors changed.
 
-    return True
+    Args:
+      progress (function, optional): Called as progress(percent, message),
+        returning false to stop between models.
 
-def runAll(products=None):
-    """
+    Returns:
+      bool: True if every error was found, false if stopped.
     """
 
-    # Create the progress dialog box.
-    progress_dlg = wx.ProgressDialog("Running Models",
-        "Opening database connection.")
-
     # Open a connection to the data database.
     connection = sqlite3.connect(idata.MASTER)
 
-    progress_dlg.Update(5, "Connection initialized, gathering products.")
+    # Iterate over the models finding the errors of each.
+    keepGoing = pj.report(progress, 10,
+        "Connection initialized, running MLR errors.")
+    steps = [("mlr", 40, "MLR errors complete, running EMA errors."),
+        ("ema", 60, "EMA errors complete, running ARMA errors."),
+        ("arma", 75, "ARMA errors complete, running HW errors."),
+        ("hw", 90, "HW errors complete, running Naive errors."),
+        ("naive", 99, "Naive errors complete, commiting changes.")]
+    changed = set()
+    for (method, percent, message) in steps:
+        if not keepGoing:
+            break
+        isql.addColumn("forecast", method, "REAL", connection)
+        isql.addColumn("forecast", method + "_error", "REAL", connection)
+        changed.update(idata.updateError(method, connection))
+        keepGoing = pj.report(progress, percent, message)
+
+    # Choose the method of the products whose errors changed.
+    if keepGoing:
+        idata.refreshSelection(sorted(changed), connection)
+
+    # Commit and close the connection, dropping the cached views of products.
+    connection.commit()
+    connection.close()
+    cache.invalidate()
 
-    # Get all products if none are given.
-    if products is None:
-        products = isql.getProductNames()
+    pj.report(progress, 100, "Error process complete.")
 
-    progress_dlg.Update(10, "Products gathered, running EMA model.")
+    return keepGoing
 
-    # Run the EMA model.
-    runEMA(products, connection)
+def runAll(products=None, progress=None, reconcile=None, base=None):
+    """
+    Run every model for the products.
 
-    progress_dlg.Update(40, "EMA model complete, running MLR model.")
+    Args:
+      products (list of str, optional): The products to forecast, all if
+        None.
+      progress (function, optional): Called as progress(percent, message),
+        returning false to stop between models.
+      reconcile (str, optional): The way to reconcile the forecasts with the
+        hierarchy afterward, one of reconcile.METHODS, or None to skip it.
+      base (str, optional): The method whose forecasts are reconciled, None
+        for the method selected for each product.
 
-    # Run the MLR model.
-    runMLR(products, connection)
+    Returns:
+      bool: True if every model was run, false if stopped.
+    """
 
-    progress_dlg.Update(70, "MLR model complete, running Nieve model.")
+    # Open a connection to the data database.
+    connection = sqlite3.connect(idata.MASTER)
 
-    # Run the Naive model.
-    runNaive(products, connection)
+    pj.report(progress, 5, "Connection initialized, gathering products.")
 
-    progress_dlg.Update(99, "All models complete, commiting changes.")
+    # Get all products if none are given, rolling up every title after.
+    changed = products
+    if products is None:
+        products = isql.getProductNames()
 
-    # Commit and close the connection.
+    # Iterate over the models running each.
+    keepGoing = pj.report(progress, 10,
+        "Products gathered, running EMA model.")
+    steps = [(runEMA, "ema", 30, "EMA model complete, running MLR model."),
+        (runMLR, "mlr", 60, "MLR model complete, running ARMA model."),
+        (runARMA, "arma", 75, "ARMA model complete, running HW model."),
+        (runHW, "hw", 90, "HW model complete, running Nieve model."),
+        (runNaive, "naive", 99, "All models complete, commiting changes.")]
+    for (model, method, percent, message) in steps:
+        if not keepGoing:
+            break
+        model(products, connection)
+        keepGoing = pj.report(progress, percent, message)
+
+    # Commit the connection.
     connection.commit()
+    cache.invalidate()
+
+    # Reconcile the forecasts of every product with the hierarchy.
+    methods = [step[1] for step in steps]
+    if keepGoing and reconcile:
+        from forsteri.process import reconcile as pr
+        pj.report(progress, 99, "Reconciling the forecasts.")
+        pr.runReconcile(reconcile, base)
+        cache.invalidate()
+        methods.append(pr.RECONCILED)
+        changed = None
+
+    # Rebuild the hierarchy totals of the forecasts.
+    if keepGoing:
+        pj.report(progress, 99, "Rolling up the forecasts.")
+        irollup.refreshRollup([irollup.FORECAST + x for x in methods],
+            changed, connection=connection)
+        connection.commit()
+
+    # Close the connection.
     connection.close()
 
-    progress_dlg.Update(100, "Model process complete.")
-    progress_dlg.Destroy()
+    pj.report(progress, 100, "Model process complete.")
 
-    return True
+    return keepGoing
 
 def runEMA(products=None, connection=None):
     """
@@ -140,10 +220,13 @@ def runEMA(products=None, connection=None):
     if products is None:
         products = isql.getProductNames()
 
+    # Get the tuned weighting factors.
+    alphas = idata.getParameters("ema", "alpha", connection)
+
     # Iterate over each product.
     for product in products:
         # Get the data for the product.
-        data = idata.getData(product, "finished_goods", connection)
+        data = idata.getData(product, "finished_goods_monthly", connection)
 
         # If no data is held for a product skip it.
         if len(data) == 0:
@@ -153,7 +236,7 @@ def runEMA(products=None, connection=None):
         data = overlap(data)
 
         # Find the averages for each month.
-        average = eMA(data, alpha=0.7)
+        average = eMA(data, alpha=alphas.get(product, ALPHA))
 
         # Convert nan to NULL.
         average = ["NULL" if np.isnan(x) else x for x in average]
@@ -165,13 +248,15 @@ def runEMA(products=None, connection=None):
     if flag:
         connection.commit()
         connection.close()
+        cache.invalidate()
 
     return True
 
 def runMLR(products=None, connection=None):
     """
-    Run the multiple linear regression model for the given products with all
-    available variables.
+    Run the multiple linear regression model for the given products with the
+    drivers and penalty chosen for each, or with all available variables and
+    no penalty for a product with none chosen.
     """
 
     # Open the master database if it is not supplied.
@@ -184,10 +269,24 @@ def runMLR(products=None, connection=None):
     if products is None:
         products = isql.getProductNames()
 
+    # Get the chosen drivers and penalties, and the variables that still
+    # exist since a driver may have been removed since it was chosen.
+    tuned = idata.getModelParameters("mlr", connection)
+    existing = set(idata.getVariables(connection))
+
     # Iterate over each product.
     for product in products:
+        # Read only the chosen drivers of a product that has them.
+        parameters = tuned.get(product, {})
+        if PENALTY in parameters:
+            variables = ["finished_goods_monthly"] + sorted([x for x in\
+                parameters if x[-8:] == "_monthly" and x in existing])
+        else:
+            variables = None
+        penalty = parameters.get(PENALTY, 0.0)
+
         # Get the data for the current product.
-        (header, data) = idata.getAllData(product)
+        (header, data) = idata.getAllData(product, variables, connection)
 
         # If there is no data for a product, skip to the next product.
         if data is None:
@@ -204,7 +303,8 @@ def runMLR(products=None, connection=None):
         for i in range(0, 12):
             try:
                 # Determine the coefficient values
-                (beta, fit) = mLR(dataNew[i][:, 0], dataNew[i][:, 1:])
+                (beta, fit) = mLR(dataNew[i][:, 0], dataNew[i][:, 1:],
+                    penalty)
 
                 # Determine the values to use for each variable.
                 vals = np.concatenate((np.array([1]), eMA(dataNew[i][:, 1:],
@@ -226,6 +326,89 @@ def runMLR(products=None, connection=None):
     if flag:
         connection.commit()
         connection.close()
+        cache.invalidate()
+
+    return True
+
+def runARMA(products=None, connection=None):
+    """
+    Run the autoregressive moving average model for the given products, all
+    of them fit at once from their monthly history.
+    """
+
+    # Open the master database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(idata.MASTER)
+        flag = True
+
+    # Get all products if none are given.
+    if products is None:
+        products = isql.getProductNames()
+
+    # Read the monthly history of every product at once.
+    (products, first, panel) = loadPanel(["finished_goods_monthly"],
+        products, connection)
+
+    # Fit the model to every product and forecast each month.
+    forecast = aRMA(panel[0], first)
+
+    # Add the forecasts of the products with enough history to the database.
+    isql.addColumn("forecast", "arma", "REAL", connection)
+    idata.updateForecasts("arma", dict([(product, [None if np.isnan(x) else\
+        float(x) for x in forecast[i]]) for (i, product) in\
+        enumerate(products) if not np.all(np.isnan(forecast[i]))]),
+        connection)
+
+    # Close the connection.
+    if flag:
+        connection.commit()
+        connection.close()
+        cache.invalidate()
+
+    return True
+
+def runHW(products=None, connection=None):
+    """
+    Run the Holt-Winters model for the given products, all of them smoothed
+    at once from their monthly history, and keep the parameters chosen for
+    each.
+    """
+
+    # Open the master database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(idata.MASTER)
+        flag = True
+
+    # Get all products if none are given.
+    if products is None:
+        products = isql.getProductNames()
+
+    # Read the monthly history of every product at once.
+    (products, first, panel) = loadPanel(["finished_goods_monthly"],
+        products, connection)
+
+    # Fit the model to every product and forecast each month.
+    (forecast, parameters) = hW(panel[0], first)
+    fitted = [i for i in range(0, len(products)) if not\
+        np.all(np.isnan(forecast[i]))]
+
+    # Store the parameters chosen for each product.
+    for (column, parameter) in enumerate(HW_PARAMETERS):
+        idata.setParameters("hw", parameter, dict([(products[i],
+            float(parameters[i, column])) for i in fitted]), connection)
+
+    # Add the forecasts of the products with enough history to the database.
+    isql.addColumn("forecast", "hw", "REAL", connection)
+    idata.updateForecasts("hw", dict([(products[i], [None if np.isnan(x) else\
+        float(x) for x in forecast[i]]) for i in fitted]), connection)
+
+    # Close the connection.
+    if flag:
+        connection.commit()
+        connection.close()
+        cache.invalidate()
 
     return True
 
@@ -276,6 +459,7 @@ def runNaive(products=None, connection=None):
     if flag:
         connection.commit()
         connection.close()
+        cache.invalidate()
 
     return True
 
@@ -333,8 +517,46 @@ array"))
 
     return average
 
-def mLR(dep, ind):
+def eMAVector(data, alpha=0.7):
     """
+    Find the exponential moving average along the first axis of an array, so
+    many series are averaged at once. Missing values are skipped as in eMA.
+
+    Args:
+      data (numpy.array): An array with the observations along the first
+        axis, such as years by nodes by months.
+      alpha (float or numpy.array, optional): The weighting factor, or an
+        array of them broadcast against a single observation.
+
+    Returns:
+      numpy.array: The averages, nan where a series has no values.
+    """
+
+    # Start with no average.
+    average = np.full(np.broadcast(data[0], alpha).shape, np.nan)
+
+    # Update the average with each observation that is not missing.
+    for row in data:
+        update = (1 - alpha) * average + alpha * row
+        average = np.where(np.isnan(average), row,
+            np.where(np.isnan(row), average, update))
+
+    return average
+
+def mLR(dep, ind, penalty=0.0):
+    """
+    Find the least squares coefficients of a regression with a bias, ridge
+    regularized if a penalty is given. The penalty applies to the variables
+    standardized to a mean of zero and a deviation of one, never the bias.
+
+    Args:
+      dep (numpy.array): The dependent variable.
+      ind (numpy.array): The independent variables, a column for each.
+      penalty (float, optional): The ridge penalty.
+
+    Returns:
+      tuple of (numpy.array, numpy.array): The coefficients of the bias and
+        each variable, and the fit of the data.
     """
 
     # Add a bias column to the independent variables.
@@ -343,16 +565,566 @@ def mLR(dep, ind):
     indB[:, 1:] = ind
 
     # Determine the weighting coefficients.
-    beta = np.dot(np.dot(np.linalg.pinv(np.dot(indB.T, indB)), indB.T), dep)
+    if penalty == 0:
+        beta = np.dot(np.dot(np.linalg.pinv(np.dot(indB.T, indB)), indB.T),
+            dep)
+    else:
+        # Standardize the variables and penalize all but the bias.
+        mean = np.mean(ind, axis=0)
+        scale = np.std(ind, axis=0)
+        scale[scale == 0] = 1
+        indS = np.ones((rows, cols + 1))
+        indS[:, 1:] = (ind - mean) / scale
+        ridge = penalty * np.eye(cols + 1)
+        ridge[0, 0] = 0
+        beta = np.dot(np.dot(np.linalg.pinv(np.dot(indS.T, indS) + ridge),
+            indS.T), dep)
+
+        # Return the coefficients to the units of the variables.
+        beta[1:] = beta[1:] / scale
+        beta[0] -= np.dot(mean, beta[1:])
 
     # Determine the historical fit of data.
     fit = np.dot(indB, beta)
 
     return beta, fit
 
+def aRMA(history, first):
+    """
+    Fit the ARMA model to the monthly history of many products at once and
+    forecast the next occurence of each month. The mean of each month is
+    removed from the history first and added back to the forecasts, and gaps
+    within the history are taken to be that mean.
+
+    Args:
+      history (numpy.array): The history with a row for each product and a
+        column for each month, nan where there is none.
+      first (int): The month of the first column counted from year zero,
+        which must be a January.
+
+    Returns:
+      numpy.array: The forecasts with a row for each product and a column
+        for each month starting with January, nan for products with too
+        little history.
+    """
+
+    # Start with no forecasts.
+    (count, months) = history.shape
+    forecast = np.full((count, 12), np.nan)
+
+    # Find the span of each product from its first value to its last, and
+    # the products with enough history to fit.
+    seen = ~np.isnan(history)
+    (start, end) = findSpans(history)
+    column = np.arange(months)
+    span = (column >= start[:, np.newaxis]) & (column <= end[:, np.newaxis])
+    fit = np.any(seen, axis=1) & (end - start + 1 >= ARMA_MINIMUM)
+    if not np.any(fit):
+        return forecast
+
+    # Find the mean of each month, the mean of all months where there is
+    # none.
+    values = np.nan_to_num(history)
+    season = np.zeros((count, 12))
+    number = np.zeros((count, 12))
+    for month in range(0, 12):
+        season[:, month] = values[:, month : : 12].sum(axis=1)
+        number[:, month] = seen[:, month : : 12].sum(axis=1)
+    overall = season.sum(axis=1) / np.maximum(number.sum(axis=1), 1)
+    season = np.where(number > 0, season / np.maximum(number, 1),
+        overall[:, np.newaxis])
+
+    # Remove the mean of each month within the span of products that fit.
+    series = np.where(span & fit[:, np.newaxis], np.where(seen, history -\
+        season[:, column % 12], 0), np.nan)
+
+    # Fit the coefficients and find the residuals.
+    (phi, theta) = fitARMA(series)
+    resid = residARMA(series, phi, theta)
+
+    # Find the steps from the last month of each product to the next
+    # occurence of each month.
+    steps = findSteps(end, first)
+
+    # Forecast far enough ahead for every month then add back the means.
+    path = predictARMA(series, resid, end, phi, theta, int(steps.max()))
+    forecast = path[np.arange(count)[:, np.newaxis], steps - 1] + season
+    forecast[~fit] = np.nan
+
+    return forecast
+
+def fitARMA(series):
+    """
+    Fit the ARMA coefficients of many series at once by the Hannan-Rissanen
+    method. A long autoregression gives first residuals, the series is
+    regressed on its own lags and the lags of the residuals, and the
+    regression is repeated a few times with the residuals of the fit. Fits
+    that are not stationary fall back to the Yule-Walker autoregression.
+
+    Args:
+      series (numpy.array): The series with a row for each product, mean
+        zero and nan outside the span of each.
+
+    Returns:
+      tuple of (numpy.array, numpy.array): The autoregressive and moving
+        average coefficients with a row for each product.
+    """
+
+    # Find the autocovariances of each series.
+    valid = ~np.isnan(series)
+    values = np.nan_to_num(series)
+    months = series.shape[1]
+    number = np.maximum(valid.sum(axis=1), 1)
+    gamma = np.array([(values[:, lag :] * values[:, 0 : months - lag]).\
+        sum(axis=1) for lag in range(0, LONG_ORDER + 1)]).T /\
+        number[:, np.newaxis]
+
+    # Find the residuals of the long autoregression.
+    coefficients = yuleWalker(gamma, LONG_ORDER)
+    resid = series - np.einsum("ptl,pl->pt", lagged(series, LONG_ORDER),
+        coefficients)
+
+    # Regress on the lags, refitting to the residuals of each fit.
+    (phi, theta) = regressARMA(series, resid)
+    for iteration in range(0, REFINE):
+        resid = residARMA(series, phi, theta)
+        (phi, theta) = regressARMA(series, resid)
+
+    # Fall back to the autoregression where the fit is not stationary.
+    companion = np.zeros((len(phi), AR_ORDER, AR_ORDER))
+    companion[:, 0, :] = phi
+    companion[:, np.arange(1, AR_ORDER), np.arange(0, AR_ORDER - 1)] = 1
+    stable = np.abs(np.linalg.eigvals(companion)).max(axis=1) < 1
+    phi = np.where(stable[:, np.newaxis], phi, yuleWalker(gamma, AR_ORDER))
+    theta = np.where(stable[:, np.newaxis], theta, 0)
+
+    return phi, theta
+
+def regressARMA(series, resid):
+    """
+    Regress each series on its own lags and the lags of its residuals, using
+    the months where all of them are known, keeping the moving average part
+    invertible.
+
+    Returns:
+      tuple of (numpy.array, numpy.array): The autoregressive and moving
+        average coefficients with a row for each product.
+    """
+
+    # Stack the lags and keep the months where every one is known.
+    lags = np.concatenate((lagged(series, AR_ORDER), lagged(resid,
+        MA_ORDER)), axis=2)
+    valid = ~np.isnan(series) & np.all(~np.isnan(lags), axis=2)
+    lags = np.where(valid[:, :, np.newaxis], lags, 0)
+    dep = np.where(valid, series, 0)
+
+    # Solve the normal equations of every product.
+    square = np.einsum("pti,ptj->pij", lags, lags)
+    beta = np.einsum("pij,ptj,pt->pi", np.linalg.pinv(square), lags, dep)
+
+    # Keep the moving average part invertible.
+    return beta[:, 0 : AR_ORDER], np.clip(beta[:, AR_ORDER :], -0.99, 0.99)
+
+def residARMA(series, phi, theta):
+    """
+    Find the residuals of the ARMA model of many series at once, taking the
+    values and residuals before the start of each series to be zero.
+
+    Returns:
+      numpy.array: The residuals, nan outside the span of each series.
+    """
+
+    valid = ~np.isnan(series)
+    values = np.nan_to_num(series)
+    resid = np.zeros(series.shape)
+    for month in range(0, series.shape[1]):
+        fit = np.zeros(len(series))
+        for lag in range(1, min(AR_ORDER, month) + 1):
+            fit += phi[:, lag - 1] * values[:, month - lag]
+        for lag in range(1, min(MA_ORDER, month) + 1):
+            fit += theta[:, lag - 1] * resid[:, month - lag]
+        resid[:, month] = np.where(valid[:, month], values[:, month] - fit,
+            0)
+
+    return np.where(valid, resid, np.nan)
+
+def predictARMA(series, resid, end, phi, theta, steps):
+    """
+    Forecast many series at once from their last month, taking future
+    residuals to be zero.
+
+    Returns:
+      numpy.array: The forecasts with a row for each product and a column
+        for each step ahead.
+    """
+
+    # Gather the most recent values and residuals, newest first.
+    rows = np.arange(len(series))
+    recent = np.array([np.where(end - lag >= 0, np.nan_to_num(series[rows,
+        end - lag]), 0) for lag in range(0, AR_ORDER)]).T
+    shocks = np.array([np.where(end - lag >= 0, np.nan_to_num(resid[rows,
+        end - lag]), 0) for lag in range(0, MA_ORDER)]).T
+
+    # Step forward, shifting each forecast into the recent values.
+    path = np.zeros((len(series), steps))
+    for step in range(0, steps):
+        path[:, step] = (phi * recent).sum(axis=1) + (theta * shocks).\
+            sum(axis=1)
+        recent = np.concatenate((path[:, step : step + 1], recent[:, 0 : -1]),
+            axis=1)
+        shocks = np.concatenate((np.zeros((len(series), 1)), shocks[:,
+            0 : -1]), axis=1)
+
+    return path
+
+def hW(history, first):
+    """
+    Fit the Holt-Winters model to the monthly history of many products at
+    once and forecast the next occurence of each month. Every combination
+    of the smoothing factors is run with additive and with multiplicative
+    seasonality, and each product keeps the one with the least one step
+    ahead error. Multiplicative seasonality is only tried for products
+    whose history is all positive.
+
+    Args:
+      history (numpy.array): The history with a row for each product and a
+        column for each month, nan where there is none.
+      first (int): The month of the first column counted from year zero,
+        which must be a January.
+
+    Returns:
+      tuple of (numpy.array, numpy.array): The forecasts with a row for each
+        product and a column for each month starting with January, and the
+        parameters chosen with a row for each product and a column for each
+        of HW_PARAMETERS, nan for products with too little history.
+    """
+
+    # Start with no forecasts.
+    count = len(history)
+    forecast = np.full((count, 12), np.nan)
+    parameters = np.full((count, len(HW_PARAMETERS)), np.nan)
+
+    # Find the products with enough history to fit.
+    (start, end) = findSpans(history)
+    fit = np.nonzero(np.any(~np.isnan(history), axis=1) & (end - start + 1 >=\
+        HW_MINIMUM))[0]
+
+    # Find the steps from the last month of each product to the next
+    # occurence of each month.
+    steps = findSteps(end, first)
+
+    # Every combination of the smoothing factors.
+    grid = np.array([(alpha, beta, gamma) for alpha in HW_ALPHAS for beta\
+        in HW_BETAS for gamma in HW_GAMMAS])
+
+    # Smooth each chunk of products with both kinds of seasonality.
+    for offset in range(0, len(fit), CHUNK):
+        rows = fit[offset : offset + CHUNK]
+        columns = np.arange(len(rows))
+        states = [smoothHW(history[rows], start[rows], end[rows], grid,
+            multiplicative) for multiplicative in [False, True]]
+        (error, level, trend, season) = [np.concatenate(state) for state in\
+            zip(*states)]
+
+        # Choose the combination and kind with the least error, the
+        # multiplicative combinations following the additive.
+        best = np.argmin(error, axis=0)
+        kind = best // len(grid)
+        level = level[best, columns]
+        trend = trend[best, columns]
+        season = season[best, columns]
+
+        # Forecast each month from the final state.
+        ahead = level[:, np.newaxis] + steps[rows] * trend[:, np.newaxis]
+        forecast[rows] = np.where(kind[:, np.newaxis] == 1, ahead * season,
+            ahead + season)
+        parameters[rows, 0 : 3] = grid[best % len(grid)]
+        parameters[rows, 3] = kind
+
+    return forecast, parameters
+
+def smoothHW(history, start, end, grid, multiplicative):
+    """
+    Run the Holt-Winters recursions of many products for every combination
+    of the smoothing factors at once. The trend and season start from the
+    first two years of each product and the level from the end of the first
+    year, and all three are updated from the second year on, carrying the
+    level forward by the trend over missing months.
+
+    Args:
+      history (numpy.array): The history with a row for each product.
+      start (numpy.array): The first month of each product.
+      end (numpy.array): The last month of each product.
+      grid (numpy.array): The smoothing factors of the level, trend, and
+        season with a row for each combination.
+      multiplicative (bool): True for multiplicative seasonality, false for
+        additive.
+
+    Returns:
+      tuple of (numpy.array, numpy.array, numpy.array, numpy.array): The
+        mean squared one step ahead error, final level, and final trend by
+        combination and product, and the final season by combination,
+        product, and month starting with January. The error is infinite
+        where the kind of seasonality does not fit.
+    """
+
+    # The factors of each combination.
+    (count, months) = history.shape
+    (alpha, beta, gamma) = [grid[:, i : i + 1] for i in range(0, 3)]
+    rows = np.arange(count)[:, np.newaxis]
+
+    # Find the mean of each of the first two years.
+    years = [history[rows, start[:, np.newaxis] + np.arange(12) + 12 * year]\
+        for year in range(0, 2)]
+    means = [np.nansum(year, axis=1) / np.maximum(np.sum(~np.isnan(year),
+        axis=1), 1) for year in years]
+    means[1] = np.where(np.all(np.isnan(years[1]), axis=1), means[0],
+        means[1])
+
+    # Start the trend from the change between the years and the level at the
+    # end of the first year.
+    trend = (means[1] - means[0]) / 12.0
+    level = means[0] + 5.5 * trend
+
+    # Start the season from each month of the two years against the trend.
+    season = np.zeros((count, 12))
+    number = np.zeros((count, 12))
+    for year in range(0, 2):
+        base = means[0][:, np.newaxis] + (np.arange(12) - 5.5 + 12 * year) *\
+            trend[:, np.newaxis]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            index = years[year] / base if multiplicative else years[year] -\
+                base
+        calendar = (start[:, np.newaxis] + np.arange(12)) % 12
+        season[rows, calendar] += np.nan_to_num(index)
+        number[rows, calendar] += ~np.isnan(index)
+    season = np.where(number > 0, season / np.maximum(number, 1),
+        1.0 if multiplicative else 0.0)
+
+    # Copy the state for every combination.
+    level = np.tile(level, (len(grid), 1))
+    trend = np.tile(trend, (len(grid), 1))
+    season = np.tile(season, (len(grid), 1, 1))
+    total = np.zeros((len(grid), count))
+    errors = np.zeros(count)
+
+    # Update the state with each month after the first year.
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        for column in range(int(start.min()) + 12, months):
+            active = (column >= start + 12) & (column <= end)
+            if not np.any(active):
+                continue
+            value = history[:, column]
+            observed = active & ~np.isnan(value)
+            index = season[:, :, column % 12]
+
+            # Add the one step ahead error.
+            if multiplicative:
+                error = value - (level + trend) * index
+            else:
+                error = value - (level + trend + index)
+            total += np.where(observed, error, 0) ** 2
+            errors += observed
+
+            # Find the new level, trend, and season.
+            if multiplicative:
+                new = alpha * value / index + (1 - alpha) * (level + trend)
+                newIndex = gamma * value / new + (1 - gamma) * index
+            else:
+                new = alpha * (value - index) + (1 - alpha) * (level + trend)
+                newIndex = gamma * (value - new) + (1 - gamma) * index
+            new = np.where(observed, new, level + trend)
+            trend = np.where(observed, beta * (new - level) + (1 - beta) *\
+                trend, trend)
+            season[:, :, column % 12] = np.where(observed, newIndex, index)
+            level = np.where(active, new, level)
+
+        # Find the mean error, infinite where the seasonality does not fit.
+        error = total / np.maximum(errors, 1)
+        error[~np.isfinite(error)] = np.inf
+        if multiplicative:
+            positive = np.all(np.isnan(history) | (history > 0), axis=1)
+            error[:, ~positive] = np.inf
+
+    return error, level, trend, season
+
+def launchCurves(analogs, percentiles=PERCENTILES):
+    """
+    Find the percentiles of the launch curves of some analogs, each month
+    after launch over every analog with a value that month.
+
+    Args:
+      analogs (list of tuple): The analogs as given by launch.getAnalogs.
+      percentiles (list of float, optional): The percentiles to find.
+
+    Returns:
+      tuple of (numpy.array, numpy.array, numpy.array): The values of each
+        analog by month, nan where there is none, the percentiles of each
+        month with a row for each percentile, and the mean of each month,
+        nan for months no analog has.
+    """
+
+    # Unscale the curves of every analog at once.
+    curves = np.array([row[3 :] for row in analogs], dtype=float)
+    scales = np.array([row[2] for row in analogs], dtype=float)
+    values = curves * scales[:, np.newaxis]
+
+    # Find the statistics of the months some analog has.
+    held = np.any(~np.isnan(values), axis=0)
+    bands = np.full((len(percentiles), values.shape[1]), np.nan)
+    mean = np.full(values.shape[1], np.nan)
+    if np.any(held):
+        bands[:, held] = np.nanpercentile(values[:, held], percentiles,
+            axis=0)
+        mean[held] = np.nanmean(values[:, held], axis=0)
+
+    return values, bands, mean
+
 """
 Helper Functions
 """
+def findSpans(history):
+    """
+    Find the first and last month with a value of each product.
+
+    Returns:
+      tuple of (numpy.array, numpy.array): The first and last column of each
+        row, both zero for rows with no value.
+    """
+
+    seen = ~np.isnan(history)
+    start = np.argmax(seen, axis=1)
+    end = history.shape[1] - 1 - np.argmax(seen[:, ::-1], axis=1)
+
+    return start, end
+
+def findSteps(end, first):
+    """
+    Find the steps ahead from the last month of each product to the next
+    occurence of each month, the months a forecast is made for.
+
+    Args:
+      end (numpy.array): The last column of each product.
+      first (int): The month of the first column counted from year zero.
+
+    Returns:
+      numpy.array: The steps with a row for each product and a column for
+        each month starting with January, at least one.
+    """
+
+    targets = np.array([date.year * 12 + date.month - 1 for date in\
+        idata.forecastDates()]) - first
+
+    return np.maximum(targets[np.newaxis, :] - end[:, np.newaxis], 1)
+
+def yuleWalker(gamma, order):
+    """
+    Solve the Yule-Walker equations of many series at once.
+
+    Args:
+      gamma (numpy.array): The autocovariances with a row for each series
+        and a column for each lag from zero.
+      order (int): The order of the autoregression.
+
+    Returns:
+      numpy.array: The coefficients with a row for each series.
+    """
+
+    # Build the Toeplitz matrix of each series, kept slightly away from
+    # singular for series that are constant.
+    lag = np.abs(np.subtract.outer(np.arange(order), np.arange(order)))
+    square = gamma[:, lag] + np.eye(order) * (1e-8 * gamma[:, 0 : 1,
+        np.newaxis] + 1e-12)
+
+    return np.linalg.solve(square, gamma[:, 1 : order + 1, np.newaxis])[:,
+        :, 0]
+
+def lagged(series, order):
+    """
+    Stack the lags of many series.
+
+    Returns:
+      numpy.array: The lags by series, month, and lag from one, nan before
+        the start.
+    """
+
+    lags = np.full(series.shape + (order,), np.nan)
+    for lag in range(1, order + 1):
+        lags[:, lag :, lag - 1] = series[:, 0 : series.shape[1] - lag]
+
+    return lags
+
+def loadPanel(variables, products=None, connection=None):
+    """
+    Read monthly variables of many products into a single array, one query
+    for each variable.
+
+    Args:
+      variables (list of str): The SQL names of the monthly variables.
+      products (list of str, optional): The products to read, every product
+        of the first variable if None.
+      connection (sqlite3.Connection, optional): A connection to the data
+        database.
+
+    Returns:
+      tuple of (list of str, int, numpy.array): The products, the month of
+        the first column counted from year zero, which is always a January,
+        and the values by variable, product, and month with nan where there
+        is none.
+    """
+
+    # Open the master database if it is not supplied.
+    flag = False
+    if connection is None:
+        connection = sqlite3.connect(idata.MASTER)
+        flag = True
+
+    # Read every value of each variable, only of the products if there are few
+    # enough to bind in a single statement.
+    cursor = connection.cursor()
+    rows = []
+    for variable in variables:
+        select = """SELECT product, date, value FROM {v} WHERE value IS NOT
+NULL""".format(v=variable)
+        if products is None or len(products) > BIND:
+            cursor.execute(select)
+            rows.append(cursor.fetchall())
+            continue
+        cursor.execute(select + " AND product IN ({m})".format(
+            m=", ".join(['?'] * len(products))), products)
+        rows.append(cursor.fetchall())
+    cursor.close()
+
+    # Close the connection.
+    if flag:
+        connection.close()
+
+    # Find the products from the first variable if none are given.
+    if products is None:
+        products = sorted(set([row[0] for row in rows[0]]))
+    index = dict([(x, i) for (i, x) in enumerate(products)])
+
+    # Find the months covered, starting from a January.
+    months = [[int(row[1][0 : 4]) * 12 + int(row[1][5 : 7]) - 1 for row in\
+        variable] for variable in rows]
+    every = [month for variable in months for month in variable]
+    if len(every) == 0:
+        return products, 0, np.full((len(variables), len(products), 0),
+            np.nan)
+    first = min(every) - min(every) % 12
+    last = max(every)
+
+    # Fill in the array.
+    panel = np.full((len(variables), len(products), last - first + 1),
+        np.nan)
+    for (i, variable) in enumerate(rows):
+        keep = [j for (j, row) in enumerate(variable) if row[0] in index]
+        panel[i, [index[variable[j][0]] for j in keep],
+            [months[i][j] - first for j in keep]] = [variable[j][2] for j in\
+            keep]
+
+    return products, first, panel
+
 def overlap(data):
     """
     data is in the form [(date1, value1), (date2, value2), ...]
@@ -0,0 +1,375 @@
+"""
+Forecast Reconciliation Module
+
+Copyright (c) 2014, 2015 Andrew Hawkins
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+The products are summed into a total and into each title of the account,
+class, category, and subcategory tiers. The summing structure is kept sparse
+as the index of the title each product belongs to in each tier, so sums and
+their transposes are a scatter or a gather over every product at once. The
+reconciled product forecasts are stored as the reconciled forecast method and
+every total of them is coherent by construction.
+"""
+
+"""
+Import Declarations
+"""
+import numpy as np
+import sqlite3
+
+from forsteri.interface import cache
+from forsteri.interface import data as idata
+from forsteri.interface import sql as isql
+from forsteri.process import job as pj
+from forsteri.process import model as pm
+
+"""
+Constant Declarations
+"""
+# The tiers of the hierarchy the products are summed into.
+TIERS = ["account", "class", "category", "subcategory"]
+
+# The ways of reconciling.
+METHODS = ["bottom up", "top down", "least squares"]
+
+# The forecast method the reconciled forecasts are stored as.
+RECONCILED = "reconciled"
+
+# The months of history the top down proportions are found from.
+HISTORY = 24
+
+"""
+Summing Structure
+"""
+class Structure(object):
+    """
+    The summing structure of the products, a total node and a node for each
+    title of each tier.
+    """
+
+    def __init__(self, rows):
+        """
+        Build the structure from the information table.
+
+        Args:
+          rows (list of list of str): The rows of the information table as
+            given by isql.getAllData.
+
+        Returns:
+          Structure
+        """
+
+        # The products and the position of each.
+        self.products = [row[0] for row in rows]
+        self.index = dict([(x, i) for (i, x) in enumerate(self.products)])
+
+        # The index of the title of each product in each tier, -1 for none,
+        # with the total as a tier of one title every product is in.
+        self.blocks = [("total", [''], np.zeros(len(rows), dtype=int))]
+        for tier in TIERS:
+            column = isql.ATTRIBUTES.index(tier)
+            values = [row[column] or '' for row in rows]
+            titles = sorted(set(values).difference(['']))
+            position = dict([(x, i) for (i, x) in enumerate(titles)])
+            codes = np.array([position.get(x, -1) for x in values], dtype=int)
+            self.blocks.append((tier, titles, codes))
+
+        # The first node of each block and the number of aggregate nodes.
+        self.offsets = []
+        self.size = 0
+        for (tier, titles, codes) in self.blocks:
+            self.offsets.append(self.size)
+            self.size += len(titles)
+
+    def aggregate(self, values):
+        """
+        Sum product values into every aggregate node, the transpose of the
+        summing structure applied to the values.
+
+        Args:
+          values (numpy.array): An array with a row for each product.
+
+        Returns:
+          numpy.array: An array with a row for each aggregate node.
+        """
+
+        total = np.zeros((self.size,) + values.shape[1:])
+        for ((tier, titles, codes), offset) in zip(self.blocks,
+            self.offsets):
+            valid = codes >= 0
+            np.add.at(total, offset + codes[valid], values[valid])
+
+        return total
+
+    def spread(self, values):
+        """
+        Add the values of the aggregate nodes each product is in, the summing
+        structure applied to the values.
+
+        Args:
+          values (numpy.array): An array with a row for each aggregate node.
+
+        Returns:
+          numpy.array: An array with a row for each product.
+        """
+
+        total = np.zeros((len(self.products),) + values.shape[1:])
+        for ((tier, titles, codes), offset) in zip(self.blocks,
+            self.offsets):
+            valid = codes >= 0
+            total[valid] += values[offset + codes[valid]]
+
+        return total
+
+    def overlaps(self):
+        """
+        Count the products shared by each pair of aggregate nodes.
+
+        Returns:
+          numpy.array: The square array of counts.
+        """
+
+        counts = np.zeros((self.size, self.size))
+        for ((tier1, titles1, codes1), offset1) in zip(self.blocks,
+            self.offsets):
+            for ((tier2, titles2, codes2), offset2) in zip(self.blocks,
+                self.offsets):
+                valid = (codes1 >= 0) & (codes2 >= 0)
+                np.add.at(counts, (offset1 + codes1[valid],
+                    offset2 + codes2[valid]), 1)
+
+        return counts
+
+"""
+Main Functions
+"""
+def runReconcile(method="least squares", base="ema", progress=None):
+    """
+    Forecast the aggregate nodes, reconcile them with the product forecasts
+    of a method, and store the result as the reconciled method.
+
+    Args:
+      method (str, optional): One of METHODS.
+      base (str, optional): The forecast method of the products, None for
+        the method selected for each. The aggregate nodes are forecast with
+        the naive method if it is naive and the exponential moving average
+        otherwise.
+      progress (function, optional): Called as progress(percent, message),
+        returning false to stop.
+
+    Returns:
+      bool: True if the forecasts were reconciled, false if stopped.
+    """
+
+    # Check the method.
+    if method not in METHODS:
+        raise ValueError("unknown reconciliation method " + str(method))
+
+    # Build the summing structure from the information table.
+    structure = Structure(isql.getAllData())
+    if not pj.report(progress, 10, "Structure built, reading data."):
+        return False
+
+    # Open a connection to the data database.
+    connection = sqlite3.connect(idata.MASTER)
+
+    # Read the product forecasts and history.
+    forecast = getForecasts(structure, base, connection)
+    history = getHistory(structure, connection)
+    if not pj.report(progress, 40, "Data read, reconciling."):
+        connection.close()
+        return False
+
+    # Reconcile the product forecasts.
+    if method == "bottom up":
+        final = np.nan_to_num(forecast)
+    elif method == "top down":
+        final = topDown(structure, history, base)
+    else:
+        final = leastSquares(structure, forecast, history, base)
+
+    if not pj.report(progress, 80, "Reconciled, storing the forecasts."):
+        connection.close()
+        return False
+
+    # Store the forecasts of the products that have any.
+    isql.addColumn("forecast", RECONCILED, "REAL", connection)
+    has = ~np.all(np.isnan(forecast), axis=1) | np.any(history != 0, axis=1)
+    idata.updateForecasts(RECONCILED, dict([(product, [float(x) for x in\
+        final[i]]) for (i, product) in enumerate(structure.products) if\
+        has[i]]), connection)
+
+    # Commit and close the connection, dropping the cached views of products.
+    connection.commit()
+    connection.close()
+    cache.invalidate()
+
+    pj.report(progress, 100, "Reconciliation complete.")
+
+    return True
+
+def topDown(structure, history, base):
+    """
+    Split the forecast of the total between the products in proportion to
+    their recent history.
+
+    Returns:
+      numpy.array: The product forecasts by month.
+    """
+
+    # Forecast the total.
+    total = forecastNodes(structure.aggregate(history)[0 : 1], base)[0]
+
+    # Find each product's share of the recent history.
+    recent = history[:, -HISTORY:].sum(axis=1)
+    if recent.sum() == 0:
+        shares = np.zeros(len(recent))
+    else:
+        shares = recent / recent.sum()
+
+    return np.outer(shares, np.nan_to_num(total))
+
+def leastSquares(structure, forecast, history, base):
+    """
+    Find the coherent forecasts closest to the product and aggregate
+    forecasts in the least squares sense, S (S'S)^-1 S' y. The summing
+    structure S stacks the aggregate structure U on the identity, so S'S is
+    I + U U' and is inverted through the much smaller I + U'U.
+
+    Returns:
+      numpy.array: The product forecasts by month.
+    """
+
+    # Forecast every aggregate node.
+    nodes = np.nan_to_num(forecastNodes(structure.aggregate(history), base))
+
+    # Find S' y, the product forecasts plus their nodes' forecasts.
+    right = np.nan_to_num(forecast) + structure.spread(nodes)
+
+    # Apply (I + U U')^-1 = I - U (I + U'U)^-1 U'.
+    inner = np.eye(structure.size) + structure.overlaps()
+    correction = np.linalg.solve(inner, structure.aggregate(right))
+
+    return right - structure.spread(correction)
+
+"""
+Helper Functions
+"""
+def getForecasts(structure, method, connection):
+    """
+    Get the forecasts of a method for every product, or of the method
+    selected for each product if None, the exponential moving average for
+    products with none selected.
+
+    Returns:
+      numpy.array: The forecasts with a row for each product and a column
+        for each month starting with January, nan where there is none.
+    """
+
+    # Create the array of forecasts.
+    forecast = np.full((len(structure.products), 12), np.nan)
+
+    # Find the value read, choosing the column of each product's method if
+    # there is no single method.
+    cursor = connection.cursor()
+    (value, join) = ("f." + str(method), "")
+    if method is None:
+        idata.createSelection(connection)
+        cursor.execute("""SELECT DISTINCT method FROM selection""")
+        value = "".join([" WHEN s.method='{m}' THEN f.{m}".format(m=row[0])\
+            for row in cursor.fetchall() if row[0] != RECONCILED])
+        value = "CASE" + value + " ELSE f.ema END" if value else "f.ema"
+        join = " LEFT JOIN selection AS s ON s.product=f.product"
+
+    # Fill in the values of every product at once.
+    cursor.execute("""SELECT f.product, f.date, {v} FROM forecast AS f{j}
+WHERE {v} IS NOT NULL""".format(v=value, j=join))
+    for (product, date, value) in cursor.fetchall():
+        if product in structure.index:
+            forecast[structure.index[product], int(date[5 : 7]) - 1] = value
+    cursor.close()
+
+    return forecast
+
+def getHistory(structure, connection):
+    """
+    Get the monthly finished goods of every product.
+
+    Returns:
+      numpy.array: The history with a row for each product and a column for
+        each month from the January of the first year, zero where there is
+        none.
+    """
+
+    # Read every value.
+    cursor = connection.cursor()
+    cursor.execute("""SELECT product, date, value FROM finished_goods_monthly
+WHERE value IS NOT NULL""")
+    rows = [row for row in cursor.fetchall() if row[0] in structure.index]
+    cursor.close()
+
+    # With no history there is a single year of zeros.
+    if len(rows) == 0:
+        return np.zeros((len(structure.products), 12))
+
+    # Find the column of each value.
+    months = [int(row[1][0 : 4]) * 12 + int(row[1][5 : 7]) - 1 for row in\
+        rows]
+    first = min(months) - min(months) % 12
+    last = max(months)
+
+    # Fill in the array.
+    history = np.zeros((len(structure.products), last - first + 1))
+    history[[structure.index[row[0]] for row in rows],
+        [month - first for month in months]] = [row[2] for row in rows]
+
+    return history
+
+def forecastNodes(history, base):
+    """
+    Forecast the history of every node at once.
+
+    Args:
+      history (numpy.array): The history with a row for each node.
+      base (str): The forecast method of the products.
+
+    Returns:
+      numpy.array: The forecasts with a row for each node and a column for
+        each month starting with January.
+    """
+
+    # The naive forecast is the last value of each month.
+    if base == "naive":
+        recent = history[:, -12:]
+        months = np.arange(history.shape[1] - recent.shape[1],
+            history.shape[1]) % 12
+        forecast = np.full((history.shape[0], 12), np.nan)
+        forecast[:, months] = recent
+
+        return forecast
+
+    # Otherwise average each month over the years, as the EMA model does.
+    years = int(np.ceil(history.shape[1] / 12.0))
+    padded = np.full((history.shape[0], years * 12), np.nan)
+    padded[:, 0 : history.shape[1]] = history
+
+    return pm.eMAVector(padded.reshape(history.shape[0], years, 12).\
+        transpose(1, 0, 2), alpha=0.7)
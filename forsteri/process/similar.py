@@ -0,0 +1,366 @@
+"""
+Similar Product Module
+
+Copyright (c) 2014, 2015 Andrew Hawkins
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+
+Each product with finished goods has a demand profile, the scale of its
+recent history and the share of it in each month of the year. The profiles
+are stored in the data database, rebuilt only for the products whose history
+changed, and held in memory as a single float32 matrix so the nearest
+neighbours of many products are found with one matrix product.
+"""
+
+"""
+Import Declarations
+"""
+import numpy as np
+import sqlite3
+import threading as td
+
+from forsteri.interface import cache
+from forsteri.interface import data as idata
+from forsteri.process import job as pj
+from forsteri.process import model as pm
+
+"""
+Constant Declarations
+"""
+# The months of recent history a profile is found from.
+RECENT = 36
+
+# The weight of the scale, the base ten logarithm of the mean, against the
+# monthly shares.
+SCALE_WEIGHT = 0.5
+
+# The number of similar products found.
+K = 10
+
+# The number of products profiled or queried in a single pass.
+CHUNK = 2000
+
+"""
+Profile Index
+"""
+class ProfileIndex(object):
+    """
+    The profiles of every product held as a matrix with a row of features for
+    each product, the monthly shares less one followed by the weighted scale.
+    The index is shared between the interface and worker threads.
+    """
+
+    def __init__(self):
+        """
+        Initialize an empty index that is read when first queried.
+
+        Returns:
+          ProfileIndex
+        """
+
+        self.products = None
+        self.position = {}
+        self.matrix = np.zeros((0, 13), dtype=np.float32)
+        self.norms = np.zeros(0, dtype=np.float32)
+
+        self.lock = td.Lock()
+
+    def load(self, connection=None):
+        """
+        Read every profile into the index.
+        """
+
+        with self.lock:
+            self.set(idata.getProfiles(connection=connection))
+
+        return True
+
+    def update(self, profiles, removed):
+        """
+        Replace the profiles of some products and remove others, if the index
+        has been read.
+
+        Args:
+          profiles (list of tuple): The profiles as given by getProfiles.
+          removed (list of str): The products whose profiles are removed.
+
+        Returns:
+          bool: True if successful, false otherwise.
+        """
+
+        with self.lock:
+            if self.products is None:
+                return True
+
+            # Replace the rows of products already held.
+            changed = dict([(row[0], row) for row in profiles])
+            rows = [self.position[x] for x in changed if x in self.position]
+            if len(rows) > 0:
+                self.matrix[rows] = toFeatures([changed[self.products[i]] for\
+                    i in rows])
+                self.norms[rows] = (self.matrix[rows] ** 2).sum(axis=1)
+
+            # Rebuild the matrix if products are added or removed.
+            new = sorted([x for x in changed if x not in self.position])
+            gone = set(removed).intersection(self.position)
+            if len(new) > 0 or len(gone) > 0:
+                keep = [i for (i, x) in enumerate(self.products) if x not in\
+                    gone]
+                self.products = [self.products[i] for i in keep] + new
+                self.position = dict([(x, i) for (i, x) in\
+                    enumerate(self.products)])
+                self.matrix = np.vstack([self.matrix[keep],
+                    toFeatures([changed[x] for x in new])])
+                self.norms = (self.matrix ** 2).sum(axis=1)
+
+        return True
+
+    def query(self, products, k=K, connection=None):
+        """
+        Find the products with the nearest profiles to each of some products.
+
+        Args:
+          products (list of str): The products to find neighbours of.
+          k (int, optional): The number of neighbours found.
+          connection (sqlite3.Connection, optional): A connection to the data
+            database, used if the index has not been read.
+
+        Returns:
+          dict of {str: list of str}: The neighbours of each product with a
+            profile, nearest first.
+        """
+
+        # Read the index the first time it is queried.
+        if self.products is None:
+            self.load(connection)
+
+        with self.lock:
+            rows = [self.position[x] for x in products if x in\
+                self.position]
+            k = min(k, len(self.products) - 1)
+            neighbours = {}
+            if k <= 0:
+                return dict([(self.products[i], []) for i in rows])
+
+            # Find the squared distances of each chunk at once.
+            for start in range(0, len(rows), CHUNK):
+                chunk = rows[start : start + CHUNK]
+                distance = self.norms[chunk, np.newaxis] + self.norms -\
+                    2 * self.matrix[chunk].dot(self.matrix.T)
+                distance[np.arange(len(chunk)), chunk] = np.inf
+
+                # Take the nearest k and sort them.
+                nearest = np.argpartition(distance, k - 1, axis=1)[:, 0 : k]
+                order = np.argsort(distance[np.arange(len(chunk))[:,\
+                    np.newaxis], nearest], axis=1)
+                nearest = nearest[np.arange(len(chunk))[:, np.newaxis],
+                    order]
+                for (i, row) in enumerate(chunk):
+                    neighbours[self.products[row]] = [self.products[j] for\
+                        j in nearest[i]]
+
+        return neighbours
+
+    """
+    Helper Functions
+    """
+    def set(self, profiles):
+        """
+        Replace the whole index, the lock must be held.
+        """
+
+        self.products = [row[0] for row in profiles]
+        self.position = dict([(x, i) for (i, x) in enumerate(self.products)])
+        self.matrix = toFeatures(profiles)
+        self.norms = (self.matrix ** 2).sum(axis=1)
+
+# The index of the profiles of every product.
+INDEX = ProfileIndex()
+
+"""
+Main Functions
+"""
+def runProfiles(progress=None):
+    """
+    Rebuild the profiles of the products whose finished goods changed since
+    they were last profiled, and remove those of products with none left.
+
+    Args:
+      progress (function, optional): Called as progress(percent, message),
+        returning false to stop between chunks of products.
+
+    Returns:
+      bool: True if the profiles were rebuilt, false if stopped.
+    """
+
+    # Open a connection to the data database.
+    connection = sqlite3.connect(idata.MASTER)
+
+    # Compare the signature of each history with the one profiled.
+    signatures = getSignatures(connection)
+    held = dict([(row[0], row[1]) for row in idata.getProfiles(
+        connection=connection)])
+    changed = sorted([x for x in signatures if held.get(x) != signatures[x]])
+    removed = sorted(set(held).difference(signatures))
+    if not pj.report(progress, 10, "{n} histories changed.".format(
+        n=len(changed))):
+        connection.close()
+        return False
+
+    # Read the history of the changed products.
+    (changed, first, panel) = pm.loadPanel(["finished_goods_monthly"],
+        changed, connection)
+
+    # Profile each chunk of the changed products.
+    for start in range(0, len(changed), CHUNK):
+        chunk = changed[start : start + CHUNK]
+        (scale, shares) = profile(panel[0, start : start + CHUNK], first)
+        profiles = [(x, signatures[x], float(scale[i])) + tuple([float(y) for\
+            y in shares[i]]) for (i, x) in enumerate(chunk)]
+        idata.setProfiles(profiles, connection=connection)
+        connection.commit()
+        INDEX.update(profiles, [])
+        if not pj.report(progress, 10 + 85.0 * (start + len(chunk)) /\
+            len(changed), "Profiled {n} products.".format(n=start +\
+            len(chunk))):
+            connection.close()
+            return False
+
+    # Remove the profiles of products with no history.
+    idata.setProfiles([], removed, connection)
+    connection.commit()
+    connection.close()
+    INDEX.update([], removed)
+
+    # Drop the views showing the old similar products.
+    if len(changed) > 0 or len(removed) > 0:
+        cache.invalidate()
+
+    pj.report(progress, 100, "Profiles complete.")
+
+    return True
+
+def findSimilar(product, k=K, connection=None):
+    """
+    Find the products whose demand is most like a product's.
+
+    Args:
+      product (str): The name of the product.
+      k (int, optional): The number of products found.
+      connection (sqlite3.Connection, optional): A connection to the data
+        database.
+
+    Returns:
+      list of str: The similar products, nearest first, empty if the product
+        has no profile.
+    """
+
+    return INDEX.query([product], k, connection).get(product, [])
+
+def profile(history, first):
+    """
+    Find the profiles of many products from the last RECENT months of each.
+
+    Args:
+      history (numpy.array): The history with a row for each product.
+      first (int): The month of the first column counted from year zero.
+
+    Returns:
+      tuple of (numpy.array, numpy.array): The mean of each product and the
+        mean of each month of the year divided by it, one for a month with no
+        value or a product with no demand.
+    """
+
+    # Take the recent months of each product, ending at its last value.
+    (start, end) = pm.findSpans(history)
+    columns = end[:, np.newaxis] - RECENT + 1 + np.arange(RECENT)
+    rows = np.arange(history.shape[0])[:, np.newaxis]
+    recent = np.where(columns >= 0, history[rows, np.maximum(columns, 0)],
+        np.nan)
+    seen = ~np.isnan(recent)
+
+    # Sum the values and count them by month of the year.
+    months = (first + columns) % 12
+    totals = np.zeros((history.shape[0], 12))
+    counts = np.zeros((history.shape[0], 12))
+    np.add.at(totals, (np.broadcast_to(rows, months.shape), months),
+        np.where(seen, recent, 0))
+    np.add.at(counts, (np.broadcast_to(rows, months.shape), months), seen)
+
+    # Divide the monthly means by the overall mean.
+    scale = totals.sum(axis=1) / np.maximum(counts.sum(axis=1), 1)
+    means = totals / np.maximum(counts, 1)
+    shares = np.where((counts > 0) & (scale[:, np.newaxis] > 0),
+        means / np.where(scale > 0, scale, 1)[:, np.newaxis], 1)
+
+    return scale, shares
+
+"""
+Helper Functions
+"""
+def toFeatures(profiles):
+    """
+    Convert profiles to the rows of the index.
+
+    Returns:
+      numpy.array: The float32 features with a row for each profile.
+    """
+
+    if len(profiles) == 0:
+        return np.zeros((0, 13), dtype=np.float32)
+
+    values = np.array([row[2 :] for row in profiles], dtype=float)
+    features = np.empty(values.shape, dtype=np.float32)
+    features[:, 0 : 12] = values[:, 1 :] - 1
+    features[:, 12] = SCALE_WEIGHT * np.log10(1 + np.maximum(values[:, 0], 0))
+
+    return features
+
+def getSignatures(connection):
+    """
+    Get a signature of the finished goods of every product, which changes
+    whenever its history does. Besides the count, range, and totals of the
+    values, the values are totaled weighted by their month and its square, so
+    values moving between months change the signature too.
+
+    Returns:
+      dict of {str: str}: The signature of each product.
+    """
+
+    # There are no signatures without finished goods.
+    cursor = connection.cursor()
+    cursor.execute("""SELECT COUNT(*) FROM sqlite_master WHERE type='table' AND
+name='finished_goods_monthly'""")
+    if cursor.fetchone()[0] == 0:
+        cursor.close()
+        return {}
+
+    # Summarize every history at once, numbering the months from 2000.
+    month = """((CAST(strftime('%Y', date) AS INTEGER) - 2000) * 12 +
+CAST(strftime('%m', date) AS INTEGER))"""
+    cursor.execute("""SELECT product, COUNT(value) || ' ' || MIN(date) || ' '
+|| MAX(date) || ' ' || TOTAL(value) || ' ' || TOTAL(value * value) || ' ' ||
+TOTAL(value * {m}) || ' ' || TOTAL(value * {m} * {m}) FROM
+finished_goods_monthly WHERE value IS NOT NULL GROUP BY product""".format(
+        m=month))
+    signatures = dict(cursor.fetchall())
+    cursor.close()
+
+    return signatures
@@ -0,0 +1,354 @@
+"""
+Timing Module
+
+Copyright (c) 2014, 2015 Andrew Hawkins
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+# Import python modules.
+import json
+import os
+import sys
+import time
+
+try:
+    import __builtin__ as builtins
+except ImportError:
+    import builtins
+
+# Import forsteri modules.
+from forsteri.interface import sql as isql
+
+class StageTimer(object):
+    """
+    Record the wall time, rows processed, throughput, and peak memory of each
+    stage of a process such as an import. The peak memory of a process only
+    ever rises, so each stage records how far it raised the peak as well as
+    the peak itself.
+
+    Usage:
+      timer = StageTimer()
+      with timer.stage("match") as stage:
+          match()
+          stage.rows = 100
+    """
+
+    def __init__(self):
+        """
+        """
+
+        # Initialize the list of finished stages.
+        self.stages = []
+
+        # The id of the import the timings belong to, if any.
+        self.importID = None
+
+        # The peak memory when the last stage ended.
+        self.peak = peakMemory()
+
+    def stage(self, name):
+        """
+        Create a stage to be timed with a with statement.
+
+        Args:
+          name (str): The name of the stage.
+
+        Returns:
+          Stage
+        """
+
+        return Stage(self, name)
+
+    def record(self, name, start, end, rows=None, before=None):
+        """
+        Add a stage timed outside a with statement, such as one that begins
+        and ends in different functions.
+
+        Args:
+          name (str): The name of the stage.
+          start (float): The time the stage began, as given by time.time.
+          end (float): The time the stage ended, as given by time.time.
+          rows (int, optional): The number of rows processed.
+          before (int, optional): The peak memory when the stage began, as
+            given by peakMemory, the peak when the last stage ended if None.
+
+        Returns:
+          dict: The stage added.
+        """
+
+        # Find the wall time and throughput.
+        seconds = end - start
+        if rows is None or seconds == 0:
+            rate = None
+        else:
+            rate = rows / seconds
+
+        # Find how far the stage raised the peak memory.
+        if before is None:
+            before = self.peak
+        self.peak = peakMemory()
+        if before is None or self.peak is None:
+            growth = None
+        else:
+            growth = self.peak - before
+
+        # Add the stage.
+        self.stages.append({"stage": name, "seconds": seconds, "rows": rows,
+            "rate": rate, "peak": self.peak, "growth": growth})
+
+        return self.stages[-1]
+
+    def total(self):
+        """
+        """
+
+        return sum([stage["seconds"] for stage in self.stages])
+
+    def toJSON(self):
+        """
+        """
+
+        return json.dumps(self.stages)
+
+    def save(self, connection=None):
+        """
+        Store the timings on the import they belong to.
+
+        Returns:
+          bool: True if successful, false otherwise.
+        """
+
+        if self.importID is None:
+            return False
+
+        return isql.setImportTimings(self.importID, self.toJSON(), connection)
+
+    def report(self):
+        """
+        Format the timings as a table of text.
+
+        Returns:
+          list of str: The lines of the table.
+        """
+
+        return formatStages(self.stages)
+
+class Stage(object):
+    """
+    A single timed stage, used as a context manager.
+    """
+
+    def __init__(self, timer, name):
+        """
+        """
+
+        self.timer = timer
+        self.name = name
+        self.rows = None
+
+    def __enter__(self):
+        """
+        """
+
+        self.start = time.time()
+        self.before = peakMemory()
+
+        return self
+
+    def __exit__(self, kind, value, traceback):
+        """
+        """
+
+        # Add the stage to the timer.
+        self.timer.record(self.name, self.start, time.time(), self.rows,
+            self.before)
+
+        return False
+
+class ImportTimer(object):
+    """
+    Record the time spent in each import that loads new modules while
+    started, including the modules it imports in turn.
+
+    Usage:
+      imports = ImportTimer()
+      imports.start()
+      import wx
+      imports.stop()
+    """
+
+    def __init__(self):
+        """
+        """
+
+        # Initialize the list of imports and the import function replaced.
+        self.imports = []
+        self.original = None
+
+    def start(self):
+        """
+        """
+
+        # Replace the import function unless it already is replaced.
+        if builtins.__import__ != self.load:
+            self.original = builtins.__import__
+            builtins.__import__ = self.load
+
+        return True
+
+    def stop(self):
+        """
+        Restore the import function. The original is kept, since imports in
+        other threads may still be inside load and call it.
+        """
+
+        if builtins.__import__ == self.load:
+            builtins.__import__ = self.original
+
+        return True
+
+    def load(self, name, *args, **kwargs):
+        """
+        Import a module, recording the time taken if new modules were loaded.
+        """
+
+        count = len(sys.modules)
+        start = time.time()
+        try:
+            return self.original(name, *args, **kwargs)
+        finally:
+            if len(sys.modules) > count:
+                # Name a relative import by what it imports.
+                if name == '':
+                    if len(args) > 2:
+                        fromlist = args[2]
+                    else:
+                        fromlist = kwargs.get("fromlist")
+                    name = '.' + ", ".join(fromlist or [])
+                self.imports.append({"module": name,
+                    "seconds": time.time() - start,
+                    "modules": len(sys.modules) - count})
+
+    def report(self, count=15):
+        """
+        Format the slowest imports as a table of text.
+
+        Args:
+          count (int, optional): The number of imports shown.
+
+        Returns:
+          list of str: The lines of the table.
+        """
+
+        imports = sorted(self.imports, key=lambda x: -x["seconds"])[0 : count]
+
+        lines = ["{:<36}{:>10}{:>10}".format("Import", "Seconds", "Modules")]
+        for entry in imports:
+            lines.append("{:<36}{:>10}{:>10}".format(entry["module"][0 : 35],
+                "{:.3f}".format(entry["seconds"]), entry["modules"]))
+
+        return lines
+
+"""
+Helper Functions
+"""
+def peakMemory():
+    """
+    Find the peak resident memory of the process so far.
+
+    Returns:
+      int: The peak memory in bytes, None if it cannot be determined.
+    """
+
+    # Use the resource module where it exists.
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        if os.uname()[0] == "Darwin":
+            return peak
+        return peak * 1024
+    except ImportError:
+        pass
+
+    # Otherwise ask Windows for the peak working set.
+    try:
+        import ctypes
+        from ctypes import wintypes
+
+        class Counters(ctypes.Structure):
+            _fields_ = [("cb", wintypes.DWORD),
+                ("PageFaultCount", wintypes.DWORD),
+                ("PeakWorkingSetSize", ctypes.c_size_t),
+                ("WorkingSetSize", ctypes.c_size_t),
+                ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+                ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                ("PagefileUsage", ctypes.c_size_t),
+                ("PeakPagefileUsage", ctypes.c_size_t)]
+
+        counters = Counters()
+        counters.cb = ctypes.sizeof(counters)
+        ctypes.windll.psapi.GetProcessMemoryInfo(
+            ctypes.windll.kernel32.GetCurrentProcess(),
+            ctypes.byref(counters), counters.cb)
+
+        return counters.PeakWorkingSetSize
+    except (ImportError, AttributeError, OSError):
+        return None
+
+def formatStages(stages):
+    """
+    Format a list of stage timings as a table of text.
+
+    Args:
+      stages (list of dict): The stages as recorded by a StageTimer.
+
+    Returns:
+      list of str: The lines of the table.
+    """
+
+    lines = ["{:<16}{:>10}{:>12}{:>12}{:>10}{:>10}".format("Stage",
+        "Seconds", "Rows", "Rows/s", "Peak +MB", "Peak MB")]
+    for stage in stages:
+        lines.append("{:<16}{:>10}{:>12}{:>12}{:>10}{:>10}".format(
+            stage["stage"], "{:.3f}".format(stage["seconds"]),
+            formatValue(stage["rows"], "{:d}"), formatValue(stage["rate"],
+            "{:.0f}"), formatMemory(stage.get("growth")),
+            formatMemory(stage["peak"])))
+
+    return lines
+
+def formatMemory(value):
+    """
+    Format a number of bytes as megabytes.
+    """
+
+    return formatValue(None if value is None else value / 1048576.0,
+        "{:.1f}")
+
+def formatValue(value, form):
+    """
+    """
+
+    if value is None:
+        return '-'
+
+    return form.format(value)
@@ -0,0 +1,146 @@
+"""
+Model Tuning Module
+
+Copyright (c) 2014, 2015 Andrew Hawkins
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+
+
+The weighting factor of the exponential moving average is chosen for each
+product from a grid by the one step ahead error of each month over the years,
+the error the model makes forecasting a year from the years before it. The
+history of every product is read at once, and the grid is an extra axis on
+top of the products, so a chunk of products is averaged for every weighting
+factor in a single pass over the years. The best factor of each product is
+stored in the parameter table, where the model reads it.
+"""
+
+"""
+Import Declarations
+"""
+import numpy as np
+import sqlite3
+
+from forsteri.interface import data as idata
+from forsteri.process import job as pj
+from forsteri.process import model as pm
+
+"""
+Constant Declarations
+"""
+# The weighting factors searched.
+ALPHAS = [x / 20.0 for x in range(1, 20)]
+
+# The number of products averaged in a single pass.
+CHUNK = 5000
+
+"""
+Main Functions
+"""
+def runTune(products=None, alphas=ALPHAS, progress=None):
+    """
+    Find the best weighting factor of the exponential moving average of each
+    product and store it.
+
+    Args:
+      products (list of str, optional): The products to tune, all if None.
+      alphas (list of float, optional): The weighting factors searched.
+      progress (function, optional): Called as progress(percent, message),
+        returning false to stop between chunks of products.
+
+    Returns:
+      bool: True if the factors were stored, false if stopped.
+    """
+
+    # Open a connection to the data database.
+    connection = sqlite3.connect(idata.MASTER)
+
+    # Read the history of every product, the same data the model averages.
+    (products, first, panel) = pm.loadPanel(["finished_goods_monthly"],
+        products, connection)
+    if not pj.report(progress, 10, "Data read, searching."):
+        connection.close()
+        return False
+
+    # Arrange the history by year, product, and month.
+    years = int(np.ceil(panel.shape[2] / 12.0))
+    history = np.full((len(products), years * 12), np.nan)
+    history[:, 0 : panel.shape[2]] = panel[0]
+    history = history.reshape(len(products), years, 12).transpose(1, 0, 2)
+
+    # Search each chunk of products.
+    best = {}
+    grid = np.array(alphas, dtype=float)
+    for start in range(0, len(products), CHUNK):
+        (error, count) = searchEMA(history[:, start : start + CHUNK], grid)
+
+        # Keep the factor with the least error of products with any error.
+        choice = grid[np.argmin(error, axis=0)]
+        for index in np.nonzero(count)[0]:
+            best[products[start + index]] = float(choice[index])
+
+        if not pj.report(progress, 10 + 80.0 * min(start + CHUNK,
+            len(products)) / len(products), "Searched " + str(min(start +\
+            CHUNK, len(products))) + " products."):
+            connection.close()
+            return False
+
+    # Store the factors.
+    idata.setParameters("ema", "alpha", best, connection)
+
+    # Commit and close the connection.
+    connection.commit()
+    connection.close()
+
+    pj.report(progress, 100, "Tuning complete.")
+
+    return True
+
+def searchEMA(history, grid):
+    """
+    Find the one step ahead error of the exponential moving average of each
+    month over the years for every weighting factor and product at once.
+
+    Args:
+      history (numpy.array): The history by year, product, and month.
+      grid (numpy.array): The weighting factors.
+
+    Returns:
+      tuple of (numpy.array, numpy.array): The mean squared error by factor
+        and product, and the number of errors of each product.
+    """
+
+    # Start with no average for any factor.
+    alpha = grid[:, np.newaxis, np.newaxis]
+    average = np.full((len(grid),) + history.shape[1:], np.nan)
+    total = np.zeros((len(grid), history.shape[1]))
+    count = np.zeros(history.shape[1])
+
+    # Forecast each year from the average of the years before it, then add
+    # the year to the average as the model does.
+    for row in history:
+        error = row - average
+        valid = ~np.isnan(error[0])
+        total += (np.where(valid, error, 0) ** 2).sum(axis=2)
+        count += valid.sum(axis=1)
+
+        average = np.where(np.isnan(average), row, np.where(np.isnan(row),
+            average, (1 - alpha) * average + alpha * row))
+
+    return total / np.maximum(count, 1), count
@@ -0,0 +1,390 @@
+"""
+Watch Folder Module
+
+Copyright (c) 2014, 2015 Andrew Hawkins
+
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+# Import python modules.
+import datetime as dt
+import os
+import sqlite3
+import threading as td
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+# Import forsteri modules.
+from forsteri.interface import archive
+from forsteri.interface import cache
+from forsteri.interface import data as idata
+from forsteri.interface import rollup as irollup
+from forsteri.interface import sql as isql
+from forsteri.process import bring
+from forsteri.process import file as pf
+from forsteri.process import job as pj
+from forsteri.process import similar as ps
+
+# The default drop directory.
+DROP = os.path.join(idata.DATA, "drop")
+
+# The file extensions that are picked up.
+EXTENSIONS = [".csv", ".txt"]
+
+class Watcher(object):
+    """
+    A background service that watches a drop directory and imports any new or
+    changed files. Files in a subdirectory are imported as timeseries of the
+    variable named by the subdirectory.
+    """
+
+    def __init__(self, directory=DROP, interval=60, overwrite=False,
+        shift=False, jobs=None):
+        """
+        Initialize the watcher.
+
+        Args:
+          directory (str, optional): The drop directory to watch.
+          interval (int, optional): The number of seconds between scans.
+          overwrite (bool, optional): True if imported values replace values
+            already in the database, false otherwise.
+          shift (bool, optional): True if week dates are to be shifted.
+          jobs (forsteri.process.job.JobManager, optional): The job manager
+            each import is run by, so it never overlaps other jobs writing
+            to the databases. Without one the imports are run directly.
+
+        Returns:
+          Watcher
+        """
+
+        # Define the inputs.
+        self.directory = directory
+        self.interval = interval
+        self.overwrite = overwrite
+        self.shift = shift
+        self.jobs = jobs
+
+        # Create the queue of files waiting to be imported.
+        self.queue = queue.Queue()
+
+        # Create the record of (modified time, size) for each file found.
+        self.pending = {}
+        self.stamps = {}
+
+        # Create the stop event and threads.
+        self.stopped = td.Event()
+        self.threads = []
+
+    def start(self):
+        """
+        Start scanning and importing in background threads. Each run has its
+        own queue and stop event, so a previous run still finishing its file
+        never takes the work of the new one.
+        """
+
+        # If the threads are already running there is nothing to do.
+        if self.isRunning():
+            return False
+
+        # Wait for the scan of a previous run to finish.
+        for thread in self.threads[:1]:
+            thread.join()
+
+        # Create the queue and stop event of this run, handing over any files
+        # a previous run left waiting.
+        previous = self.queue
+        self.queue = queue.Queue()
+        self.stopped = td.Event()
+        while True:
+            try:
+                location = previous.get_nowait()
+            except queue.Empty:
+                break
+            if location is not None:
+                self.queue.put(location)
+
+        # Create the scan and import threads.
+        self.threads = [td.Thread(target=self.run, args=(self.stopped,)),
+            td.Thread(target=self.work, args=(self.queue, self.stopped))]
+
+        # Start the threads without keeping the application open.
+        for thread in self.threads:
+            thread.daemon = True
+            thread.start()
+
+        return True
+
+    def stop(self):
+        """
+        Stop the background threads after the current file.
+        """
+
+        self.stopped.set()
+        self.queue.put(None)
+
+        return True
+
+    def isRunning(self):
+        """
+        """
+
+        return not self.stopped.is_set() and len(self.threads) > 0
+
+    def run(self, stopped):
+        """
+        Scan the drop directory until stopped.
+
+        Args:
+          stopped (threading.Event): The stop event of the run.
+        """
+
+        while not stopped.is_set():
+            self.scan()
+            stopped.wait(self.interval)
+
+    def work(self, files, stopped):
+        """
+        Import queued files until stopped.
+
+        Args:
+          files (Queue.Queue): The queue of files of the run.
+          stopped (threading.Event): The stop event of the run.
+        """
+
+        while not stopped.is_set():
+            location = files.get()
+            if location is None:
+                break
+            try:
+                self.importFile(location)
+            except Exception as error:
+                self.log("Failed to import " + location + ": " + str(error))
+
+    def scan(self):
+        """
+        Find new or changed files in the drop directory and queue them. A file
+        is only queued once its size and modified time have not changed for a
+        full interval, so files still being copied are left alone.
+
+        Returns:
+          list of str: The locations of the files queued.
+        """
+
+        # If there is no drop directory there is nothing to do.
+        if not os.path.isdir(self.directory):
+            return []
+
+        # Find the files in the directory and its variable subdirectories.
+        locations = []
+        for name in sorted(os.listdir(self.directory)):
+            path = os.path.join(self.directory, name)
+            if os.path.isdir(path):
+                locations.extend([os.path.join(path, x) for x in\
+                    sorted(os.listdir(path))])
+            else:
+                locations.append(path)
+
+        # Iterate over the files and queue any that have settled.
+        queued = []
+        for location in locations:
+            if os.path.splitext(location)[1].lower() not in EXTENSIONS:
+                continue
+
+            try:
+                info = os.stat(location)
+            except OSError:
+                continue
+            stamp = (info.st_mtime, info.st_size)
+
+            # Skip files that have already been queued in this state.
+            if self.stamps.get(location) == stamp:
+                continue
+
+            # Wait for a second scan with the same state.
+            if self.pending.get(location) != stamp:
+                self.pending[location] = stamp
+                continue
+
+            del self.pending[location]
+            self.stamps[location] = stamp
+            self.queue.put(location)
+            queued.append(location)
+
+        return queued
+
+    def importFile(self, location):
+        """
+        Import a single file using the saved header aliases and date templates,
+        then systematize only the variables that were touched. With a job
+        manager the import, systematizing, and profiling are each a job
+        holding the databases they write to.
+
+        Args:
+          location (str): The location of the file on the disk.
+
+        Returns:
+          bool: True if the file was imported, false otherwise.
+        """
+
+        # Without a job manager run each step directly.
+        if self.jobs is None:
+            variables = self.writeFile(location)
+            if variables is None:
+                return False
+            idata.systematizeVariables(sorted(variables))
+            if "finished_goods" in variables:
+                ps.runProfiles()
+
+            return True
+
+        # Otherwise import in a job and wait for it to finish.
+        job = self.jobs.submit("Import", self.writeFile, args=(location,),
+            after=self.jobs.before("Import"), resources=["data", "master"],
+            progress=False)
+        job.wait()
+        if job.state != pj.DONE:
+            self.log("Failed to import " + location + ": " + job.message)
+            return False
+        if job.result is None:
+            return False
+
+        # Then systematize the variables touched and reprofile.
+        self.jobs.submit("Systematize", idata.systematizeVariables,
+            args=(sorted(job.result),), after=self.jobs.before("Systematize"),
+            resources=["data"], progress=False)
+        if "finished_goods" in job.result:
+            self.jobs.submit("Profiles", ps.runProfiles,
+                after=self.jobs.before("Profiles"), resources=["data"])
+
+        return True
+
+    def writeFile(self, location):
+        """
+        Write a single file to the database and record its import.
+
+        Args:
+          location (str): The location of the file on the disk.
+
+        Returns:
+          set of str: The variables written to, None if the file was skipped.
+        """
+
+        # Skip the file if the same content has been imported before.
+        digest = bring.fingerprint(location)
+        if isql.getImportByHash(digest) is not None:
+            self.log("Skipped " + location + ", already imported.")
+            return None
+
+        # Determine the variable from the subdirectory, if any.
+        variable = None
+        parent = os.path.dirname(location)
+        if os.path.normpath(parent) != os.path.normpath(self.directory):
+            variable = idata.fromSQLName(os.path.basename(parent))
+
+        # Try each saved date template until one reads the file.
+        dataFile = None
+        for template in getDateTemplates():
+            try:
+                dataFile = pf.File(location, template, self.shift,
+                    variable=variable)
+                break
+            except (AssertionError, ValueError, IndexError):
+                continue
+
+        # If no template worked the file cannot be imported unattended.
+        if dataFile is None:
+            self.log("Skipped " + location + ", no date template applies.")
+            return None
+
+        # Write the data and record the import in a single transaction, with
+        # the master database attached, so a failed write records nothing.
+        record = bring.newRecord(location, dataFile.date_template, digest,
+            bring.readRows(location))
+        connection = sqlite3.connect(idata.MASTER)
+        irollup.attachMaster(connection)
+        try:
+            variables = dataFile.write(self.overwrite, connection=connection)
+            importID = bring.recordImport(record, connection, dataFile.timer)
+            connection.commit()
+        finally:
+            connection.close()
+        cache.invalidate()
+
+        # Archive the decomposed data once the import is committed.
+        archive.writeArchive(importID, record["rows"])
+        dataFile.timer.save()
+
+        self.log("Imported " + location + " into " +\
+            ", ".join(sorted(variables)) + ".")
+
+        # Log the time spent in each stage.
+        for line in dataFile.timer.report():
+            self.log(line)
+
+        return variables
+
+    def log(self, message):
+        """
+        """
+
+        print(dt.datetime.now().strftime("%Y-%m-%d %H:%M:%S ") + message)
+
+"""
+Helper Functions
+"""
+def getDateTemplates():
+    """
+    Get the date templates saved as aliases of the Date variable.
+
+    Returns:
+      list of str: The date templates.
+    """
+
+    return [date[1:] for date in isql.getForVariable("Date") if date[0] == '$']
+
+def main(directory=DROP, interval=60):
+    """
+    Watch the drop directory in the foreground until interrupted.
+    """
+
+    watcher = Watcher(directory, interval)
+    watcher.log("Watching " + directory + ".")
+
+    # Scan and import in this thread.
+    try:
+        while True:
+            watcher.scan()
+            while not watcher.queue.empty():
+                location = watcher.queue.get()
+                try:
+                    watcher.importFile(location)
+                except Exception as error:
+                    watcher.log("Failed to import " + location + ": " +\
+                        str(error))
+            watcher.stopped.wait(interval)
+    except KeyboardInterrupt:
+        watcher.log("Stopped watching " + directory + ".")
+
+    return True
+
+if __name__ == "__main__":
+    main()